@@ -0,0 +1,313 @@
+"""Measure how fast MDA frames are ingested: written to disk and shown in the viewer.
+
+Usage::
+
+    python benchmarks/bench_acquisition.py --size 512 2048 --dtype u2 --fps 0 100 \
+        --layout t=50 t=10,z=10,c=2 --json new.json --compare old.json
+
+Runs headless (offscreen Qt platform) with the demo configuration in
+`tests/test_config.cfg`.  For every combination of frame size, dtype, target fps (0:
+as fast as possible) and axis layout, synthetic frames are fed from a producer thread
+(like the MDA runner's) to the `_NapariMDAHandler` of a `CoreViewerLink`, and the
+following is reported:
+
+- sustained frames/s: frames written / time from the first frame in to the last one
+  written,
+- frame-to-disk latency percentiles: from `frameReady` to the frame being written,
+- frame-to-screen latency percentiles: from `frameReady` to the viewer jumping to it,
+- dropped display frames: frames the viewer never jumped to (coalesced updates),
+- peak RSS of the process, so far (it never goes down between cases).
+
+`--meta key=json` adds NMM options to every sequence (e.g. `--meta storage='"memmap"'`,
+or `--meta writer='"process"'` to compare the writer process with the writer thread).
+`--json` stores the results with version info, and `--compare` prints the ratio of
+every metric to a previous JSON file.  Requires Micro-Manager device adapters.
+"""
+
+from __future__ import annotations
+
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import threading
+import time
+from importlib.metadata import version
+from pathlib import Path
+
+import napari
+import numpy as np
+import useq
+from pymmcore_plus import CMMCorePlus
+from qtpy.QtWidgets import QApplication
+
+from napari_micromanager._core_link import CoreViewerLink
+from napari_micromanager._mda_handler import _FrameRouter
+from napari_micromanager._util import NMM_METADATA_KEY
+
+CONFIG = Path(__file__).parent.parent / "tests" / "test_config.cfg"
+PIXEL_TYPES = {"u1": "8bit", "u2": "16bit", "u4": "32bit"}
+PACKAGES = ("napari-micromanager", "napari", "pymmcore-plus", "useq-schema", "zarr")
+# metrics compared by --compare, and whether higher is better
+METRICS = {
+    "frames_per_s": True,
+    "disk_p50_ms": False,
+    "disk_p99_ms": False,
+    "screen_p50_ms": False,
+    "screen_p99_ms": False,
+    "dropped_display": False,
+    "peak_rss_MB": False,
+}
+
+
+def _parse_layout(text: str) -> dict[str, int]:
+    """Parse an axis layout such as "t=10,z=5,c=2"."""
+    layout = {}
+    for item in text.split(","):
+        axis, _, size = item.partition("=")
+        if axis not in "tpgcz" or not size.isdigit() or int(size) < 1:
+            raise argparse.ArgumentTypeError(f"invalid layout item {item!r}")
+        layout[axis] = int(size)
+    return layout
+
+
+def _parse_meta(text: str) -> tuple[str, object]:
+    key, _, value = text.partition("=")
+    return key, json.loads(value)
+
+
+def _sequence(layout: dict[str, int], meta: dict) -> useq.MDASequence:
+    kwargs: dict = {}
+    if "t" in layout:
+        kwargs["time_plan"] = {"interval": 0, "loops": layout["t"]}
+    if "z" in layout:
+        kwargs["z_plan"] = {"range": layout["z"] - 1, "step": 1}
+    if "c" in layout:
+        kwargs["channels"] = ["DAPI", "FITC", "Cy5", "Rhodamine"][: layout["c"]]
+    if "p" in layout:
+        kwargs["stage_positions"] = [(i * 100, 0, 0) for i in range(layout["p"])]
+    if "g" in layout:
+        kwargs["grid_plan"] = {"rows": layout["g"], "columns": 1}
+    return useq.MDASequence(
+        axis_order="tpgcz", metadata={NMM_METADATA_KEY: meta}, **kwargs
+    )
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _percentiles(values: list[float], prefix: str) -> dict[str, float | None]:
+    qs = (50, 90, 99)
+    if not values:
+        return {f"{prefix}_p{q}_ms": None for q in qs}
+    ms = np.percentile(np.asarray(values) * 1000, qs)
+    return {f"{prefix}_p{q}_ms": float(v) for q, v in zip(qs, ms)}
+
+
+def _bench(
+    core: CMMCorePlus,
+    app: QApplication,
+    layout: str,
+    meta: dict,
+    size: int,
+    dtype: str,
+    fps: float,
+) -> dict:
+    camera = core.getCameraDevice()
+    core.setProperty(camera, "PixelType", PIXEL_TYPES[dtype])
+    core.setProperty(camera, "OnCameraCCDXSize", size)
+    core.setProperty(camera, "OnCameraCCDYSize", size)
+    sequence = _sequence(_parse_layout(layout), meta)
+    events = list(sequence)
+    rng = np.random.default_rng(0)
+    high = min(np.iinfo(dtype).max, 4095)
+    frames = [rng.integers(0, high, (size, size), dtype=dtype) for _ in range(4)]
+
+    viewer = napari.Viewer(show=False)
+    link = CoreViewerLink(viewer, core)
+    handler = link._mda_handler
+
+    # time at which each frame was put, keyed like the viewer updates
+    put_times: dict[tuple[str, tuple[int, ...]], float] = {}
+    disk: list[float] = []
+    screen: list[float] = []
+    writer_route = _FrameRouter(sequence).route
+    process_frames = handler._process_frames
+    on_written = handler._on_written
+    update_viewer_dims = handler._update_viewer_dims
+
+    def _process_frames(batch: list) -> list:
+        results = process_frames(batch)
+        now = time.perf_counter()
+        for _, event in batch:
+            _, idx, name = writer_route(event)
+            disk.append(now - put_times[(name, idx)])
+        return results
+
+    def _on_written(results: list) -> list:
+        # the writes of the writer process
+        now = time.perf_counter()
+        for result in results:
+            _, name, idxs, _ = result.tag
+            disk.extend(now - put_times[(name, idx)] for idx in idxs)
+        return on_written(results)
+
+    def _update_viewer_dims(args: tuple) -> None:
+        update_viewer_dims(args)
+        if (put := put_times.get(args)) is not None:
+            screen.append(time.perf_counter() - put)
+
+    # patched before the sequence starts, as the writer connects to them
+    handler._process_frames = _process_frames
+    handler._on_written = _on_written
+    handler._update_viewer_dims = _update_viewer_dims
+
+    def _produce() -> None:
+        route = _FrameRouter(sequence).route
+        start = time.perf_counter()
+        for i, event in enumerate(events):
+            if fps and (wait := start + i / fps - time.perf_counter()) > 0:
+                time.sleep(wait)
+            _, idx, name = route(event)
+            put_times[(name, idx)] = time.perf_counter()
+            handler._on_mda_frame(frames[i % len(frames)], event)
+
+    handler._on_mda_started(sequence)
+    producer = threading.Thread(target=_produce)
+    t0 = time.perf_counter()
+    producer.start()
+    while producer.is_alive():
+        app.processEvents()
+        time.sleep(0.001)
+    handler._on_mda_finished(sequence)
+    # the writer thread writes the last frames after that
+    deadline = time.perf_counter() + 60
+    while (
+        handler.writer_stats().frames < len(events) and time.perf_counter() < deadline
+    ):
+        app.processEvents()
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - t0
+    # deliver the last viewer updates of the writer
+    deadline = time.perf_counter() + 5
+    while handler._writing and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+
+    written = handler.writer_stats().frames
+    display = handler.display_stats()
+    result = {
+        "layout": layout,
+        "meta": meta,
+        "size": size,
+        "dtype": dtype,
+        "fps": fps,
+        "frames": written,
+        "frames_per_s": written / elapsed,
+        **_percentiles(disk, "disk"),
+        **_percentiles(screen, "screen"),
+        "dropped_display": display.acquired - display.displayed,
+        "peak_queue_depth": handler.queue_stats().peak_depth,
+        "peak_rss_MB": _peak_rss_mb(),
+    }
+    link.cleanup()
+    viewer.close()
+    return result
+
+
+def _case_key(res: dict) -> tuple:
+    meta = json.dumps(res["meta"], sort_keys=True)
+    return res["layout"], meta, res["size"], res["dtype"], res["fps"]
+
+
+def _compare(results: list[dict], old_path: Path) -> None:
+    old = {_case_key(res): res for res in json.loads(old_path.read_text())["results"]}
+    print(f"\nnew / old ({old_path}; >1 is better for frames/s, worse for the rest)")
+    for res in results:
+        if (prev := old.get(_case_key(res))) is None:
+            continue
+        ratios = []
+        for metric in METRICS:
+            new_v, old_v = res.get(metric), prev.get(metric)
+            ratio = f"{new_v / old_v:5.2f}" if new_v is not None and old_v else "  -  "
+            ratios.append(f"{metric} {ratio}")
+        print(f"{_label(res)}  " + "  ".join(ratios))
+
+
+def _label(res: dict) -> str:
+    fps = res["fps"] or "max"
+    return f"{res['layout']:<16} {res['size']:>5}px {res['dtype']} fps={fps:<5}"
+
+
+def _fmt(value: float | None) -> str:
+    return "    -" if value is None else f"{value:7.1f}"
+
+
+def main() -> None:
+    """Run every size/dtype/fps/layout combination and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, nargs="+", default=[512, 2048])
+    parser.add_argument("--dtype", nargs="+", default=["u2"], choices=PIXEL_TYPES)
+    parser.add_argument(
+        "--fps", type=float, nargs="+", default=[0], help="target rates (0: max)"
+    )
+    parser.add_argument(
+        "--layout", nargs="+", default=["t=50", "t=5,z=10,c=2"], help="e.g. t=5,z=10"
+    )
+    parser.add_argument(
+        "--meta", type=_parse_meta, action="append", default=[], help="key=json"
+    )
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    parser.add_argument("--compare", type=Path, help="results of a previous run")
+    args = parser.parse_args()
+    for layout in args.layout:
+        _parse_layout(layout)
+    meta = dict(args.meta)
+
+    app = QApplication.instance() or QApplication([])
+    core = CMMCorePlus()
+    core.loadSystemConfiguration(str(CONFIG))
+
+    results = []
+    print(
+        f"{'case':<43} {'frames/s':>8} {'disk p50':>8} {'p99':>7} "
+        f"{'screen p50':>10} {'p99':>7} {'dropped':>7} {'RSS MB':>7}"
+    )
+    for layout, size, dtype, fps in itertools.product(
+        args.layout, args.size, args.dtype, args.fps
+    ):
+        res = _bench(core, app, layout, meta, size, dtype, fps)
+        results.append(res)
+        print(
+            f"{_label(res)} {res['frames_per_s']:8.1f} {_fmt(res['disk_p50_ms'])} "
+            f"{_fmt(res['disk_p99_ms'])} {_fmt(res['screen_p50_ms']):>10} "
+            f"{_fmt(res['screen_p99_ms'])} {res['dropped_display']:7d} "
+            f"{_fmt(res['peak_rss_MB'])}"
+        )
+
+    if args.compare:
+        _compare(results, args.compare)
+    if args.json:
+        env = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "versions": {pkg: version(pkg) for pkg in PACKAGES},
+        }
+        args.json.write_text(json.dumps({**env, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare write and slice-read throughput of the MDA chunk layout policies.
+
+Usage::
+
+    python benchmarks/bench_chunking.py --t 20 --z 10 --size 2048
+
+For every policy in `napari_micromanager._storage.CHUNK_POLICIES` a temporary array of
+shape `(t, z, size, size)` is created with the same helpers the MDA handler uses, and
+the following is measured:
+
+- write MB/s when frames are written one at a time,
+- write MB/s when each Z stack is written as one slab (as the batching writer does),
+- the mean latency of reading a random single frame (a napari 2D slice),
+- the number of files on disk.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from napari_micromanager._storage import (
+    CHUNK_POLICIES,
+    ZARR_V3,
+    chunk_layout,
+    create_array,
+)
+
+
+def _bench_policy(policy: str, t: int, z: int, size: int, n_reads: int) -> dict:
+    shape = [t, z]
+    yx = [size, size]
+    rng = np.random.default_rng(0)
+    # camera-like data: noise on a constant background
+    frame = (rng.poisson(100, yx) + 500).astype("u2")
+    stack = np.broadcast_to(frame, (z, *yx))
+    mbytes = t * z * frame.nbytes / 1e6
+    chunks, shards = chunk_layout(policy, "tz", shape, yx)  # type: ignore[arg-type]
+
+    result: dict = {"policy": policy, "chunks": chunks, "shards": shards}
+    with tempfile.TemporaryDirectory() as tmp:
+        arr = create_array(f"{tmp}/frames", shape + yx, "u2", chunks, shards)
+        t0 = time.perf_counter()
+        for ti in range(t):
+            for zi in range(z):
+                arr[ti, zi] = frame
+        result["write_frame_MBps"] = mbytes / (time.perf_counter() - t0)
+
+        arr = create_array(f"{tmp}/stacks", shape + yx, "u2", chunks, shards)
+        t0 = time.perf_counter()
+        for ti in range(t):
+            arr[ti] = stack
+        result["write_stack_MBps"] = mbytes / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        for _ in range(n_reads):
+            arr[random.randrange(t), random.randrange(z)]  # noqa: S311
+        result["read_frame_ms"] = (time.perf_counter() - t0) / n_reads * 1000
+        result["n_files"] = sum(p.is_file() for p in Path(tmp, "stacks").rglob("*"))
+    return result
+
+
+def main() -> None:
+    """Run the benchmark for every policy and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--t", type=int, default=10, help="number of timepoints")
+    parser.add_argument("--z", type=int, default=10, help="number of Z planes")
+    parser.add_argument("--size", type=int, default=1024, help="frame width/height")
+    parser.add_argument("--reads", type=int, default=50, help="random frame reads")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    for policy in CHUNK_POLICIES:
+        if policy == "sharded" and not ZARR_V3:
+            print(f"{policy:<8} skipped (requires zarr>=3)")
+            continue
+        res = _bench_policy(policy, args.t, args.z, args.size, args.reads)
+        results.append(res)
+        print(
+            f"{policy:<8} write/frame {res['write_frame_MBps']:8.1f} MB/s  "
+            f"write/stack {res['write_stack_MBps']:8.1f} MB/s  "
+            f"read frame {res['read_frame_ms']:7.2f} ms  "
+            f"files {res['n_files']:6d}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure the main-thread cost of a live preview update.
+
+Usage::
+
+    python benchmarks/bench_preview.py --size 2048 --frames 200
+
+Times `CoreViewerLink._update_viewer` when the preview buffer is reused (the live
+mode path: same shape and dtype, copied in place) against the path that assigns a
+new array to the preview layer and re-applies its scale on every frame (what happens
+when the buffer can't be reused), and reports the Python memory allocated per frame.
+Requires Micro-Manager device adapters (the demo configuration is loaded).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+import napari
+import numpy as np
+from pymmcore_plus import CMMCorePlus
+
+from napari_micromanager._core_link import CoreViewerLink
+
+
+def _bench(link: CoreViewerLink, frames: list[np.ndarray], reuse: bool) -> dict:
+    link._update_viewer(frames[0])
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for frame in frames:
+        if not reuse:
+            # force the allocating path: new buffer, scale re-applied
+            link._preview_buffer = None
+            link._preview_pixel_size = None
+        link._update_viewer(frame)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "reuse": reuse,
+        "update_ms": elapsed / len(frames) * 1000,
+        "peak_alloc_MB": peak / 1e6,
+    }
+
+
+def main() -> None:
+    """Run both update paths and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=2048, help="frame width/height")
+    parser.add_argument("--frames", type=int, default=100, help="number of updates")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    core = CMMCorePlus()
+    core.loadSystemConfiguration()
+    viewer = napari.Viewer(show=False)
+    link = CoreViewerLink(viewer, core)
+    # pretend live mode is on, so the view isn't reset on every frame
+    link._live_timer_id = -1
+
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 4096, (args.size, args.size), dtype="u2") for _ in range(4)
+    ] * (args.frames // 4)
+
+    results = [_bench(link, frames, reuse) for reuse in (False, True)]
+    for res in results:
+        label = "reused buffer" if res["reuse"] else "new array"
+        print(
+            f"{label:<14} {res['update_ms']:7.2f} ms/frame  "
+            f"peak alloc {res['peak_alloc_MB']:8.1f} MB"
+        )
+    link._live_timer_id = None
+    link.cleanup()
+    viewer.close()
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measure the per-frame overhead of routing MDA events to their array and layer.
+
+Usage::
+
+    python benchmarks/bench_routing.py --repeat 20
+
+Compares `_id_idx_layer` (which re-derives everything from the event's sequence for
+every frame) with the `_FrameRouter` built once per sequence by the MDA handler, for
+a plain sequence, a sequence with split channels, and one with sub-sequences.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import useq
+
+from napari_micromanager._mda_handler import _FrameRouter, _id_idx_layer
+from napari_micromanager._util import NMM_METADATA_KEY
+
+SPLIT = {NMM_METADATA_KEY: {"split_channels": True}}
+SEQUENCES = {
+    "plain": useq.MDASequence(
+        time_plan={"loops": 10, "interval": 0},
+        channels=["DAPI", "FITC"],
+        z_plan={"range": 9, "step": 1},
+    ),
+    "split channels": useq.MDASequence(
+        time_plan={"loops": 10, "interval": 0},
+        channels=["DAPI", "FITC"],
+        z_plan={"range": 9, "step": 1},
+        metadata=SPLIT,
+    ),
+    "sub-sequences": useq.MDASequence(
+        time_plan={"loops": 5, "interval": 0},
+        channels=["DAPI", "FITC"],
+        stage_positions=[
+            {"x": 0, "y": 0},
+            {"x": 1, "y": 1, "sequence": {"grid_plan": {"rows": 3, "columns": 3}}},
+        ],
+        metadata=SPLIT,
+    ),
+}
+
+
+def _time_per_event(func, events: list, repeat: int) -> float:  # type: ignore[no-untyped-def]
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for event in events:
+            func(event)
+    return (time.perf_counter() - t0) / (repeat * len(events)) * 1e6
+
+
+def main() -> None:
+    """Time both routing functions on every sequence and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="passes over events")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    for name, seq in SEQUENCES.items():
+        events = list(seq)
+        router = _FrameRouter(seq)
+        res = {
+            "sequence": name,
+            "events": len(events),
+            "id_idx_layer_us": _time_per_event(_id_idx_layer, events, args.repeat),
+            "router_us": _time_per_event(router.route, events, args.repeat),
+        }
+        results.append(res)
+        print(
+            f"{name:<15} {res['events']:5d} events  "
+            f"_id_idx_layer {res['id_idx_layer_us']:7.2f} us/frame  "
+            f"_FrameRouter {res['router_us']:7.2f} us/frame"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare frame write and slice-read latency of the MDA storage backends.
+
+Usage::
+
+    python benchmarks/bench_storage.py --t 20 --z 10 --size 2048
+
+For every backend in `napari_micromanager._storage.STORAGE_BACKENDS` a temporary
+array of shape `(t, z, size, size)` is created with the same helpers the MDA handler
+uses ("zarr" with one chunk per frame and the default compressor, "memmap" as a
+preallocated `.npy` file), and the following is measured:
+
+- the mean and 99th percentile latency of writing a single frame,
+- the mean latency of reading a random single frame (a napari 2D slice),
+- the mean latency of reading a random YZ slice across all planes of a timepoint.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from napari_micromanager._storage import (
+    STORAGE_BACKENDS,
+    STORE_EXTENSIONS,
+    chunk_layout,
+    create_array,
+    create_memmap,
+)
+
+
+def _bench_backend(backend: str, t: int, z: int, size: int, n_reads: int) -> dict:
+    shape = [t, z, size, size]
+    rng = np.random.default_rng(0)
+    # camera-like data: noise on a constant background
+    frame = (rng.poisson(100, (size, size)) + 500).astype("u2")
+
+    result: dict = {"backend": backend}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, f"data{STORE_EXTENSIONS[backend]}")  # type: ignore[index]
+        if backend == "memmap":
+            arr = create_memmap(path, shape, "u2")
+        else:
+            chunks, _ = chunk_layout("frame", "tz", shape[:2], shape[2:])
+            arr = create_array(str(path), shape, "u2", chunks)
+
+        latencies = []
+        for ti in range(t):
+            for zi in range(z):
+                t0 = time.perf_counter()
+                arr[ti, zi] = frame
+                latencies.append(time.perf_counter() - t0)
+        result["write_frame_ms"] = np.mean(latencies) * 1000
+        result["write_frame_p99_ms"] = np.percentile(latencies, 99) * 1000
+
+        t0 = time.perf_counter()
+        for _ in range(n_reads):
+            np.asarray(arr[random.randrange(t), random.randrange(z)])  # noqa: S311
+        result["read_frame_ms"] = (time.perf_counter() - t0) / n_reads * 1000
+
+        t0 = time.perf_counter()
+        for _ in range(n_reads):
+            np.asarray(arr[random.randrange(t), :, :, random.randrange(size)])  # noqa: S311
+        result["read_yz_ms"] = (time.perf_counter() - t0) / n_reads * 1000
+    return result
+
+
+def main() -> None:
+    """Run the benchmark for every backend and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--t", type=int, default=10, help="number of timepoints")
+    parser.add_argument("--z", type=int, default=10, help="number of Z planes")
+    parser.add_argument("--size", type=int, default=1024, help="frame width/height")
+    parser.add_argument("--reads", type=int, default=50, help="random slice reads")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    for backend in STORAGE_BACKENDS:
+        res = _bench_backend(backend, args.t, args.z, args.size, args.reads)
+        results.append(res)
+        print(
+            f"{backend:<7} write frame {res['write_frame_ms']:7.2f} ms "
+            f"(p99 {res['write_frame_p99_ms']:7.2f} ms)  "
+            f"read frame {res['read_frame_ms']:7.2f} ms  "
+            f"read yz {res['read_yz_ms']:7.2f} ms"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
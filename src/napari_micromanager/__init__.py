@@ -1,6 +1,7 @@
 """Napari-based GUI for MicroManager."""
 
 from importlib.metadata import PackageNotFoundError, version
+from typing import TYPE_CHECKING
 
 try:
     __version__ = version("napari-micromanager")
@@ -12,6 +13,16 @@ except PackageNotFoundError:
 # https://github.com/micro-manager/pymmcore/issues/119
 import pymmcore  # noqa: F401
 
-from .main_window import MainWindow
+if TYPE_CHECKING:
+    from .main_window import MainWindow
 
 __all__ = ["MainWindow", "__version__"]
+
+
+def __getattr__(name: str) -> object:
+    # imported on first use, as importing napari is slow
+    if name == "MainWindow":
+        from .main_window import MainWindow
+
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,16 +4,79 @@ from __future__ import annotations
 
 import argparse
 import sys
+import time
+from contextlib import contextmanager
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterator, Sequence
+
+    from napari_micromanager._config_loading import ConfigLoadReport
+
+
+class _StartupProfile:
+    """Duration of the startup phases, and number of modules each one imported."""
+
+    def __init__(self) -> None:
+        self.phases: list[tuple[str, float, int]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        n_modules = len(sys.modules)
+        t0 = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - t0
+        self.phases.append((name, elapsed, len(sys.modules) - n_modules))
+
+    def report(self) -> str:
+        """Return the timings as a table."""
+        lines = [f"{'startup phase':<28} {'seconds':>8} {'new modules':>12}"]
+        for name, elapsed, n_modules in self.phases:
+            lines.append(f"{name:<28} {elapsed:8.3f} {n_modules:12d}")
+        total = sum(elapsed for _, elapsed, _ in self.phases)
+        lines.append(f"{'total':<28} {total:8.3f}")
+        lines.append("(run with `python -X importtime` for per-module import times)")
+        return "\n".join(lines)
+
+
+def _print_config_report(report: ConfigLoadReport) -> None:
+    print(report.summary())
+    for label, elapsed in report.devices.items():
+        print(f"  {label:<26} {elapsed:8.3f}")
+
+
+def _run(args: Sequence[str]) -> None:
+    """Run a saved MDA sequence to disk, without a viewer."""
+    parser = argparse.ArgumentParser(
+        prog="napari_micromanager run",
+        description="Acquire a saved MDA sequence to disk, without a viewer.",
+    )
+    parser.add_argument("--config", required=True, help="Config file to load")
+    parser.add_argument(
+        "--sequence", required=True, help="MDA sequence to run (yaml or json)"
+    )
+    parser.add_argument(
+        "--out", required=True, help="Directory where the data is written"
+    )
+    parsed_args = parser.parse_args(args)
+
+    from napari_micromanager._headless import run_headless
+
+    report = run_headless(parsed_args.config, parsed_args.sequence, parsed_args.out)
+    print(report.summary())
 
 
 def main(args: Sequence[str] | None = None) -> None:
-    """Create a napari viewer and add the MicroManager plugin to it."""
+    """Create a napari viewer and add the MicroManager plugin to it.
+
+    With ``run`` as first argument, run an MDA sequence without a viewer instead
+    (``python -m napari_micromanager run --help``).
+    """
     if args is None:
         args = sys.argv[1:]
+    if args and args[0] == "run":
+        _run(args[1:])
+        return
 
     parser = argparse.ArgumentParser(description="Enter string")
     parser.add_argument(
@@ -24,17 +87,38 @@ def main(args: Sequence[str] | None = None) -> None:
         help="Config file to load",
         nargs="?",
     )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print how long each startup phase (imports, widgets) took",
+    )
     parsed_args = parser.parse_args(args)
 
-    import napari
+    profile = _StartupProfile()
+    with profile.phase("import napari"):
+        import napari
+
+    with profile.phase("import MainWindow"):
+        from napari_micromanager.main_window import MainWindow
 
-    from napari_micromanager.main_window import MainWindow
+    with profile.phase("create viewer"):
+        viewer = napari.Viewer()
+    with profile.phase("create MainWindow"):
+        win = MainWindow(viewer, config=parsed_args.config)
+    if parsed_args.profile_startup:
+        # the configuration is loaded in a worker thread, after the window shows up
+        win.configLoaded.connect(_print_config_report)
+    with profile.phase("add dock widget"):
+        dw = viewer.window.add_dock_widget(win, name="MicroManager", area="top")
+        if hasattr(dw, "_close_btn"):
+            dw._close_btn = False
+    if parsed_args.profile_startup:
+        from qtpy.QtWidgets import QApplication
 
-    viewer = napari.Viewer()
-    win = MainWindow(viewer, config=parsed_args.config)
-    dw = viewer.window.add_dock_widget(win, name="MicroManager", area="top")
-    if hasattr(dw, "_close_btn"):
-        dw._close_btn = False
+        # the toolbar widgets are built when the dock widget is first shown
+        with profile.phase("show toolbars"):
+            QApplication.processEvents()
+        print(profile.report())
     napari.run()
 
 
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pymmcore_plus import CMMCorePlus
+
+# number of devices listed by `ConfigLoadReport.summary`
+SLOWEST_DEVICES = 3
+
+# "Will/Did initialize device <label>" lines of the core log
+_INIT_LINE = re.compile(
+    r"^(?P<time>\S+) tid\d+ \[\w+,Core\] (?P<step>Will|Did) initialize device "
+    r"(?P<label>.+)$",
+    re.MULTILINE,
+)
+
+
+@dataclass
+class ConfigLoadReport:
+    """How long loading a system configuration took.
+
+    Attributes
+    ----------
+    path : Path
+        The configuration file.
+    total : float
+        Time (s) it took to load the configuration.
+    devices : dict[str, float]
+        Time (s) it took to initialize each device, slowest first.  Read from the
+        core log, so empty if the core doesn't log to a file.
+    """
+
+    path: Path
+    total: float
+    devices: dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        """Return a one-line description of the load time."""
+        text = f"Loaded {self.path.name} in {self.total:.2f} s"
+        if self.devices:
+            slowest = list(self.devices.items())[:SLOWEST_DEVICES]
+            devices = ", ".join(f"{label} {t:.2f} s" for label, t in slowest)
+            text += f" (slowest devices: {devices})"
+        return text
+
+
+def resolve_config_path(core: CMMCorePlus, config: str | Path) -> Path:
+    """Return the path of the configuration file `config`.
+
+    Like `CMMCorePlus.loadSystemConfiguration`, relative paths that don't exist are
+    also looked up in the device adapter directories.  Raises FileNotFoundError if
+    the file doesn't exist, so that this can be checked before loading it in a
+    worker thread.
+    """
+    path = Path(config).expanduser()
+    if not path.exists() and not path.is_absolute():
+        for directory in core.getDeviceAdapterSearchPaths():
+            if (candidate := Path(directory, path)).exists():
+                return candidate
+    if not path.exists():
+        raise FileNotFoundError(f"Path does not exist: {path}")
+    return path
+
+
+def load_config(core: CMMCorePlus, path: Path) -> ConfigLoadReport:
+    """Load the system configuration `path` and return how long it took.
+
+    This blocks until every device is initialized: call it from a worker thread.
+    """
+    log_file = core.getPrimaryLogFile()
+    log_start = _file_size(log_file)
+    t0 = time.perf_counter()
+    core.loadSystemConfiguration(str(path))
+    total = time.perf_counter() - t0
+    devices: dict[str, float] = {}
+    if log_start is not None:
+        with open(log_file, errors="replace") as f:
+            f.seek(log_start)
+            devices = device_init_times(f.read(), core.getLoadedDevices())
+    return ConfigLoadReport(path, total, devices)
+
+
+def device_init_times(log: str, labels: tuple[str, ...] = ()) -> dict[str, float]:
+    """Return the time (s) each device took to initialize, slowest first.
+
+    `log` is the text the core logged while loading a configuration.  Only the
+    devices in `labels` are kept, if given (the log file may be shared with other
+    cores).
+    """
+    started: dict[str, datetime] = {}
+    times: dict[str, float] = {}
+    for match in _INIT_LINE.finditer(log):
+        label = match["label"].strip()
+        if labels and label not in labels:
+            continue
+        when = datetime.fromisoformat(match["time"])
+        if match["step"] == "Will":
+            started[label] = when
+        elif label in started:
+            times[label] = (when - started.pop(label)).total_seconds()
+    return dict(sorted(times.items(), key=lambda item: item[1], reverse=True))
+
+
+def _file_size(path: str) -> int | None:
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
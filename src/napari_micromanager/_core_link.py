@@ -1,24 +1,51 @@
 from __future__ import annotations
 
-import contextlib
-from typing import TYPE_CHECKING, Callable
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable
 
 import napari
 import napari.layers
+import numpy as np
 from pymmcore_plus import CMMCorePlus
-from qtpy.QtCore import QObject, Qt, QTimerEvent
+from qtpy.QtCore import QObject, Qt, QTimerEvent, Signal  # type: ignore[attr-defined]
 from superqt.utils import ensure_main_thread
 
+from ._display import (
+    DECIMATION_MODES,
+    DEFAULT_LIVE_FPS,
+    LiveClock,
+    decimate,
+    decimation_factor,
+    decimation_transform,
+)
 from ._mda_handler import _NapariMDAHandler
+from ._pipeline_health import PipelineSample
+from ._util import connect_all, disconnect_all
 
 if TYPE_CHECKING:
     import napari.viewer
-    import numpy as np
-    from pymmcore_plus.core.events._protocol import PSignalInstance
+    from psygnal import SignalInstance
+    from pymmcore_plus.core.events._protocol import PSignal
+
+    from ._display import Decimation, LiveStats
 
 
 class CoreViewerLink(QObject):
-    """QObject linking events in a napari viewer to events in a CMMCorePlus instance."""
+    """QObject linking events in a napari viewer to events in a CMMCorePlus instance.
+
+    In live mode, the newest camera frame is shown by a timer running at `live_fps`
+    (adapted to the render time), whatever the exposure time.  `liveStatsChanged`
+    is emitted with a `LiveStats` about once per second while live mode runs, and
+    with None when it stops.
+
+    With `live_decimation` set to "mean" or "stride", live frames that are larger
+    than what the canvas can show at the current zoom are reduced (in a worker
+    thread) before display, and the preview layer is scaled so that coordinates are
+    unchanged.  Full resolution comes back when zooming in.
+    """
+
+    liveStatsChanged = Signal(object)
 
     def __init__(
         self,
@@ -31,29 +58,114 @@ class CoreViewerLink(QObject):
         self.viewer = viewer
         self._mda_handler = _NapariMDAHandler(self._mmc, viewer)
         self._live_timer_id: int | None = None
+        self._live_clock = LiveClock(DEFAULT_LIVE_FPS)
+        self._interval = 0
+        # the array shown by the preview layer, updated in place while its shape and
+        # dtype don't change
+        self._preview_buffer: np.ndarray | None = None
+        # pixel size (um) applied to the preview layer, None when it must be re-read
+        self._preview_pixel_size: float | None = None
+        self._live_decimation: Decimation = "off"
+        # decimation factor of the frame currently in the preview layer
+        self._preview_factor = 1
+        # prepares decimated live frames off the main thread, one at a time
+        self._decimator: ThreadPoolExecutor | None = None
+        self._decimated_frame: Future | None = None
 
         # Add all core connections to this list.  This makes it easy to disconnect
         # from core when this widget is closed.
-        self._connections: list[tuple[PSignalInstance, Callable]] = [
+        self._connections: list[tuple[PSignal | SignalInstance, Callable]] = [
             (self._mmc.events.imageSnapped, self._image_snapped),
             (self._mmc.events.imageSnapped, self._stop_live),
             (self._mmc.events.continuousSequenceAcquisitionStarted, self._start_live),
             (self._mmc.events.sequenceAcquisitionStopped, self._stop_live),
             (self._mmc.events.exposureChanged, self._restart_live),
             (self._mmc.events.configSet, self._restart_live),
+            (self._mmc.events.pixelSizeChanged, self._invalidate_pixel_size),
+            (self._mmc.events.pixelSizeAffineChanged, self._invalidate_pixel_size),
+            (self._mmc.events.configSet, self._invalidate_pixel_size),
+            (self._mmc.events.systemConfigurationLoaded, self._invalidate_pixel_size),
         ]
-        for signal, slot in self._connections:
-            signal.connect(slot)
+        connect_all(self._connections)
 
     def cleanup(self) -> None:
-        for signal, slot in self._connections:
-            with contextlib.suppress(TypeError, RuntimeError):
-                signal.disconnect(slot)
+        disconnect_all(self._connections)
+        if self._decimator is not None:
+            self._decimator.shutdown(wait=False)
         # Clean up temporary files we opened.
         self._mda_handler._cleanup()
 
+    @property
+    def live_fps(self) -> float:
+        """Target frame rate (Hz) of the live mode display."""
+        return self._live_clock.target_fps
+
+    @live_fps.setter
+    def live_fps(self, fps: float) -> None:
+        self._live_clock = LiveClock(fps)
+        if self._live_timer_id is not None:
+            self._stop_live()
+            self._start_live()
+
+    @property
+    def live_decimation(self) -> Decimation:
+        """Display decimation of live frames: "off", "mean" or "stride"."""
+        return self._live_decimation
+
+    @live_decimation.setter
+    def live_decimation(self, mode: Decimation) -> None:
+        if mode not in DECIMATION_MODES:
+            raise ValueError(
+                f"live_decimation must be one of {DECIMATION_MODES}, not {mode!r}"
+            )
+        self._live_decimation = mode
+
+    def live_stats(self) -> LiveStats:
+        """Return the frame rates and counters of the current (or last) live mode."""
+        return self._live_clock.stats()
+
+    def pipeline_sample(self) -> PipelineSample:
+        """Return the current counters of the acquisition pipeline.
+
+        Cheap enough to be sampled periodically (see `PipelineHealth`).
+        """
+        handler = self._mda_handler
+        queue = handler.queue_stats()
+        live = self._live_timer_id is not None
+        return PipelineSample(
+            time=time.perf_counter(),
+            mda_running=handler._mda_running,
+            frames_acquired=queue.put_count,
+            bytes_written=handler.writer_stats().nbytes,
+            frames_displayed=handler.display_stats().displayed,
+            queue_depth=queue.depth,
+            oldest_put=queue.oldest_put,
+            live_display_fps=self._live_clock.stats().display_fps if live else None,
+            storage_dir=handler.storage_dir(),
+        )
+
     def timerEvent(self, a0: QTimerEvent | None) -> None:
-        self._update_viewer()
+        clock = self._live_clock
+        if self._decimated_frame is not None and not self._decimated_frame.done():
+            # the previous frame is still being decimated
+            return
+        if clock.tick(self._mmc.getRemainingImageCount()):
+            if (factor := self._decimation_factor()) > 1:
+                if self._decimator is None:
+                    self._decimator = ThreadPoolExecutor(1, "nmm_live_decimation")
+                self._decimated_frame = self._decimator.submit(
+                    self._decimate_last_image, factor, self._live_decimation
+                )
+            else:
+                t0 = time.perf_counter()
+                self._update_viewer()
+                clock.rendered(time.perf_counter() - t0)
+        if (stats := clock.update_stats()) is not None:
+            self.liveStatsChanged.emit(stats)
+            # follow the render time
+            if self._live_timer_id is not None and stats.interval_ms != self._interval:
+                self.killTimer(self._live_timer_id)
+                self._start_timer()
 
     def _image_snapped(self) -> None:
         # If we are in the middle of an MDA, don't update the preview viewer.
@@ -61,22 +173,56 @@ class CoreViewerLink(QObject):
             self._update_viewer(self._mmc.getImage())
 
     def _start_live(self) -> None:
-        interval = int(self._mmc.getExposure())
-        self._live_timer_id = self.startTimer(interval, Qt.TimerType.PreciseTimer)
+        self._live_clock.reset()
+        self._start_timer()
+
+    def _start_timer(self) -> None:
+        self._interval = self._live_clock.interval_ms
+        self._live_timer_id = self.startTimer(self._interval, Qt.TimerType.PreciseTimer)
 
     def _stop_live(self) -> None:
         if self._live_timer_id is not None:
             self.killTimer(self._live_timer_id)
             self._live_timer_id = None
+            self.liveStatsChanged.emit(None)
 
     def _restart_live(self, camera: str, exposure: float) -> None:
         if self._live_timer_id:
             self._mmc.stopSequenceAcquisition()
             self._mmc.startContinuousSequenceAcquisition()
 
-    @ensure_main_thread  # type: ignore [misc]
-    def _update_viewer(self, data: np.ndarray | None = None) -> None:
-        """Update viewer with the latest image from the circular buffer."""
+    def _invalidate_pixel_size(self, *_: Any) -> None:
+        self._preview_pixel_size = None
+
+    def _decimation_factor(self) -> int:
+        """Return the live decimation factor for the current zoom and canvas."""
+        if self._live_decimation == "off" or "preview" not in self.viewer.layers:
+            return 1
+        # screen pixels per camera pixel (the zoom is in screen pixels per um)
+        pixel_size = self._preview_pixel_size or 1.0
+        return decimation_factor(self.viewer.camera.zoom * pixel_size)
+
+    def _decimate_last_image(self, factor: int, mode: Decimation) -> None:
+        """Decimate the newest camera frame and show it (called in a worker)."""
+        try:
+            image = self._mmc.getLastImage()
+        except (RuntimeError, IndexError):
+            return
+        rgb = image.ndim == 3
+        self._show_decimated(decimate(image, factor, mode, rgb), factor)
+
+    @ensure_main_thread
+    def _show_decimated(self, data: np.ndarray, factor: int) -> None:
+        t0 = time.perf_counter()
+        self._update_viewer(data, factor)
+        self._live_clock.rendered(time.perf_counter() - t0)
+
+    @ensure_main_thread
+    def _update_viewer(self, data: np.ndarray | None = None, factor: int = 1) -> None:
+        """Update viewer with the latest image from the circular buffer.
+
+        `factor` is the decimation factor of `data` (see `live_decimation`).
+        """
         if data is None:
             if self._mmc.getRemainingImageCount() == 0:
                 return
@@ -85,19 +231,40 @@ class CoreViewerLink(QObject):
             except (RuntimeError, IndexError):
                 # circular buffer empty
                 return
+        buffer = self._preview_buffer
         try:
             preview_layer = self.viewer.layers["preview"]
-            preview_layer.data = data
         except KeyError:
-            preview_layer = self.viewer.add_image(data, name="preview")
-
-        preview_layer.metadata["mode"] = "preview"
-
-        if (pix_size := self._mmc.getPixelSizeUm()) != 0:
-            preview_layer.scale = (pix_size, pix_size)
+            buffer = self._preview_buffer = data.copy()
+            preview_layer = self.viewer.add_image(buffer, name="preview")
+            preview_layer.metadata["mode"] = "preview"
+            self._preview_pixel_size = None
         else:
-            # return to default
-            preview_layer.scale = [1.0, 1.0]
+            if (
+                buffer is not None
+                and preview_layer.data is buffer
+                and buffer.shape == data.shape
+                and buffer.dtype == data.dtype
+            ):
+                # same camera ROI, binning and bit depth: copy in place
+                np.copyto(buffer, data)
+                preview_layer.refresh()
+            else:
+                buffer = self._preview_buffer = data.copy()
+                preview_layer.data = buffer
+                preview_layer.metadata["mode"] = "preview"
+
+        # only re-read the pixel size (and rescale) when the core state changed
+        if self._preview_pixel_size is None or factor != self._preview_factor:
+            if self._preview_pixel_size is None:
+                self._preview_pixel_size = self._mmc.getPixelSizeUm()
+            # 0 means not calibrated: return to default
+            scale, translate = decimation_transform(
+                factor, self._live_decimation, self._preview_pixel_size or 1.0
+            )
+            preview_layer.scale = (scale, scale)
+            preview_layer.translate = (translate, translate)
+            self._preview_factor = factor
 
         if self._live_timer_id is None:
             self.viewer.reset_view()
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal, cast
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+# (layer name, index to show or None to only make the layer visible)
+DisplayUpdate = tuple["str | None", "tuple[int, ...] | None"]
+
+# default maximum rate (Hz) at which the viewer jumps to the latest frame during an
+# MDA.  Overridden with the "display_rate" key of the NMM metadata (0: no limit).
+DEFAULT_DISPLAY_RATE = 30.0
+
+
+@dataclass
+class DisplayStats:
+    """Counters of a `DisplayGovernor`.
+
+    Attributes
+    ----------
+    acquired : int
+        Number of frames acquired (filled in by the MDA handler).
+    submitted : int
+        Number of "jump to frame" updates submitted by the writer.
+    displayed : int
+        Number of "jump to frame" updates sent to the viewer.
+    coalesced : int
+        Number of updates replaced by a newer one before they were sent.
+    """
+
+    acquired: int = 0
+    submitted: int = 0
+    displayed: int = 0
+    coalesced: int = 0
+
+
+def get_display_rate(meta: dict) -> float:
+    """Return the validated "display_rate" option from NMM metadata."""
+    rate = meta.get("display_rate", DEFAULT_DISPLAY_RATE)
+    if isinstance(rate, bool) or not isinstance(rate, (int, float)) or rate < 0:
+        raise ValueError(f"display_rate must be a non-negative number, not {rate!r}")
+    return float(rate)
+
+
+class DisplayGovernor:
+    """Coalesce the viewer updates of the MDA writer to at most `max_rate` per second.
+
+    The writer `submit`s one update per written frame (or slab), and sends the ones
+    returned by `pop_due` to the viewer.  Only the latest "jump to frame" update is
+    kept while waiting for the next display slot; the first update of each layer (which
+    makes it visible) is always due immediately.  Only the display is throttled: the
+    frames themselves are all written.
+
+    Parameters
+    ----------
+    max_rate : float
+        Maximum number of "jump to frame" updates per second.  `0` means no limit.
+    clock : Callable[[], float]
+        Monotonic clock, in seconds.
+    """
+
+    def __init__(
+        self, max_rate: float, clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        self._interval = 1 / max_rate if max_rate else 0.0
+        self._clock = clock
+        self._last_sent = float("-inf")
+        self._pending: DisplayUpdate | None = None
+        self._new_layers: list[DisplayUpdate] = []
+        self._seen_layers: set[str | None] = set()
+        self._stats = DisplayStats()
+
+    def submit(self, update: DisplayUpdate) -> None:
+        """Add an update from the writer."""
+        layer_name, idx = update
+        if layer_name not in self._seen_layers:
+            self._seen_layers.add(layer_name)
+            self._new_layers.append((layer_name, None))
+        if idx is None:
+            return
+        self._stats.submitted += 1
+        if self._pending is not None:
+            self._stats.coalesced += 1
+        self._pending = update
+
+    def due_in(self) -> float | None:
+        """Return the time (s) until the pending update is due, None if there's none."""
+        if self._new_layers:
+            return 0.0
+        if self._pending is None:
+            return None
+        return max(0.0, self._last_sent + self._interval - self._clock())
+
+    def pop_due(self) -> list[DisplayUpdate]:
+        """Return (and forget) the updates that can be sent to the viewer now."""
+        updates, self._new_layers = self._new_layers, []
+        if self._pending is not None and self.due_in() == 0:
+            updates.append(self._pending)
+            self._pending = None
+            self._last_sent = self._clock()
+            self._stats.displayed += 1
+        return updates
+
+    def flush(self) -> list[DisplayUpdate]:
+        """Return all the remaining updates, due or not."""
+        self._last_sent = float("-inf")
+        return self.pop_due()
+
+    def stats(self) -> DisplayStats:
+        """Return a copy of the counters."""
+        return DisplayStats(**vars(self._stats))
+
+
+# default target frame rate (Hz) of the live mode display.  The timer that shows the
+# newest camera frame runs at this rate, independently of the exposure time, unless
+# rendering a frame takes longer (see `LiveClock`).
+DEFAULT_LIVE_FPS = 30.0
+# the display interval is kept at least this many times the mean render time
+LIVE_RENDER_HEADROOM = 2.0
+# period (s) over which the live frame rates are measured
+LIVE_STATS_PERIOD = 1.0
+
+
+@dataclass
+class LiveStats:
+    """Frame rates and counters of the live mode display.
+
+    Attributes
+    ----------
+    camera_fps : float
+        Rate at which the camera produced frames over the last period.
+    display_fps : float
+        Rate at which frames were shown over the last period.
+    displayed : int
+        Number of frames shown since live mode started.
+    skipped : int
+        Number of camera frames that were never shown (a newer one was available).
+    render_ms : float
+        Mean time (ms) it takes to show a frame.
+    interval_ms : int
+        Current interval (ms) of the display timer.
+    """
+
+    camera_fps: float = 0.0
+    display_fps: float = 0.0
+    displayed: int = 0
+    skipped: int = 0
+    render_ms: float = 0.0
+    interval_ms: int = 0
+
+
+class LiveClock:
+    """Bookkeeping of the live mode display timer.
+
+    At each `tick` of the display timer the number of frames waiting in the camera
+    buffer tells whether a new frame arrived (and how many were skipped).  The timer
+    interval targets `target_fps`, but is stretched if rendering is too slow for it.
+
+    Parameters
+    ----------
+    target_fps : float
+        Target display rate (Hz).
+    clock : Callable[[], float]
+        Monotonic clock, in seconds.
+    """
+
+    def __init__(
+        self, target_fps: float, clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        if isinstance(target_fps, bool) or target_fps <= 0:
+            raise ValueError(f"target_fps must be a positive number, not {target_fps}")
+        self.target_fps = float(target_fps)
+        self._clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the counters (when live mode starts)."""
+        self._last_remaining = 0
+        self._render_s = 0.0
+        self._stats = LiveStats(interval_ms=self.interval_ms)
+        self._period_start = self._clock()
+        self._period_camera = 0
+        self._period_displayed = 0
+
+    @property
+    def interval_ms(self) -> int:
+        """Interval (ms) at which the display timer should run."""
+        interval = max(1 / self.target_fps, LIVE_RENDER_HEADROOM * self._render_s)
+        return max(1, round(interval * 1000))
+
+    def tick(self, remaining: int) -> bool:
+        """Account for a timer tick; return True if there is a new frame to show.
+
+        `remaining` is the number of images in the camera buffer.  It only grows while
+        live mode runs, unless the buffer was cleared (e.g. on overflow).
+        """
+        new = remaining - self._last_remaining
+        if new < 0:
+            new = remaining
+        self._last_remaining = remaining
+        self._period_camera += new
+        if new:
+            self._stats.skipped += new - 1
+        return new > 0
+
+    def rendered(self, seconds: float) -> None:
+        """Record that a frame was shown, and how long it took."""
+        self._stats.displayed += 1
+        self._period_displayed += 1
+        # exponential moving average of the render time
+        if self._render_s:
+            self._render_s += 0.2 * (seconds - self._render_s)
+        else:
+            self._render_s = seconds
+
+    def update_stats(self) -> LiveStats | None:
+        """Return new stats if a full period passed since the last ones, else None."""
+        now = self._clock()
+        elapsed = now - self._period_start
+        if elapsed < LIVE_STATS_PERIOD:
+            return None
+        self._stats.camera_fps = self._period_camera / elapsed
+        self._stats.display_fps = self._period_displayed / elapsed
+        self._stats.render_ms = self._render_s * 1000
+        self._stats.interval_ms = self.interval_ms
+        self._period_start = now
+        self._period_camera = self._period_displayed = 0
+        return self.stats()
+
+    def stats(self) -> LiveStats:
+        """Return a copy of the current stats."""
+        return LiveStats(**vars(self._stats))
+
+
+# display decimation of the live preview (`CoreViewerLink.live_decimation`):
+# "off" shows full resolution frames, "mean" averages blocks of pixels, and "stride"
+# keeps one pixel per block (faster, but aliased).
+Decimation = Literal["off", "mean", "stride"]
+DECIMATION_MODES: tuple[Decimation, ...] = ("off", "mean", "stride")
+
+
+def decimation_factor(screen_px_per_pixel: float) -> int:
+    """Return the decimation factor for a frame shown at `screen_px_per_pixel`.
+
+    This is the largest power of 2 that still leaves at least one frame pixel per
+    screen pixel, i.e. 1 (no decimation) when zoomed in enough to see all pixels.
+    """
+    if screen_px_per_pixel <= 0 or screen_px_per_pixel >= 1:
+        return 1
+    return int(2 ** math.floor(math.log2(1 / screen_px_per_pixel)))
+
+
+def decimate(
+    image: np.ndarray, factor: int, mode: Decimation = "mean", rgb: bool = False
+) -> np.ndarray:
+    """Return `image` reduced `factor` times along Y and X.
+
+    With "mean", each output pixel is the mean of a `factor` x `factor` block (the
+    incomplete blocks at the bottom and right edges are dropped).  With "stride", it
+    is the top-left pixel of the block.  The last axis is the color axis if `rgb`.
+    """
+    if factor == 1 or mode == "off":
+        return image
+    if mode == "stride":
+        return image[::factor, ::factor]
+    h, w = (n // factor * factor for n in image.shape[:2])
+    blocks = image[:h, :w].reshape(h // factor, factor, w // factor, factor, -1)
+    mean = blocks.mean(axis=(1, 3), dtype=np.float32).astype(image.dtype)
+    return cast("np.ndarray", mean if rgb else mean[..., 0])
+
+
+def decimation_transform(
+    factor: int, mode: Decimation, pixel_size: float
+) -> tuple[float, float]:
+    """Return the `(scale, translate)` placing a decimated frame over the full one.
+
+    A "mean" pixel covers a whole block, so it is shifted to the center of the block.
+    """
+    translate = (factor - 1) / 2 * pixel_size if mode == "mean" else 0.0
+    return factor * pixel_size, translate
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import contextlib
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, cast
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from useq import MDAEvent
+
+OverflowPolicy = Literal["spill", "unbounded"]
+OVERFLOW_POLICIES: tuple[OverflowPolicy, ...] = ("spill", "unbounded")
+
+
+@dataclass
+class FrameQueueStats:
+    """Snapshot of the counters kept by a `FrameQueue`.
+
+    Attributes
+    ----------
+    depth : int
+        Number of frames currently waiting in the queue (in memory or spilled).
+    peak_depth : int
+        Largest depth observed since the queue was created.
+    put_count : int
+        Number of frames added to the queue.
+    get_count : int
+        Number of frames removed from the queue.
+    spilled : int
+        Number of frames that were spilled to disk ("spill" policy), or that were
+        kept in memory beyond `maxsize` ("unbounded" policy).
+    total_wait : float
+        Sum of the time (s) that every retrieved frame spent in the queue.
+    max_wait : float
+        Longest time (s) that a single frame spent in the queue.
+    first_put : float
+        `time.perf_counter()` when the first frame was added (0 if none).
+    last_put : float
+        `time.perf_counter()` when the last frame was added (0 if none).
+    oldest_put : float
+        `time.perf_counter()` when the oldest waiting frame was added (0 if none).
+    """
+
+    depth: int = 0
+    peak_depth: int = 0
+    put_count: int = 0
+    get_count: int = 0
+    spilled: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    first_put: float = 0.0
+    last_put: float = 0.0
+    oldest_put: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Average time (s) that a retrieved frame spent in the queue."""
+        return self.total_wait / self.get_count if self.get_count else 0.0
+
+    @property
+    def put_rate(self) -> float:
+        """Average rate (frames/s) at which frames were added, 0 if unknown."""
+        elapsed = self.last_put - self.first_put
+        return (self.put_count - 1) / elapsed if elapsed > 0 else 0.0
+
+
+class _Item:
+    """A frame waiting in a `FrameQueue`."""
+
+    __slots__ = ("data", "event", "number", "spill", "t_put", "taken")
+
+    def __init__(
+        self, t_put: float, data: np.ndarray, event: MDAEvent, number: int
+    ) -> None:
+        self.t_put = t_put
+        # the image, or the path of the spilled image
+        self.data: np.ndarray | Path = data
+        self.event = event
+        self.number = number
+        # True if the image is (to be) spilled: it doesn't count in memory
+        self.spill = False
+        # True once retrieved from the queue
+        self.taken = False
+
+
+class FrameQueue:
+    """FIFO queue of `(image, event)` pairs feeding the MDA writer thread.
+
+    Frames are returned in the order they were added.  The consumer blocks in `wait`
+    on a `threading.Condition` and is woken as soon as a frame is available (or the
+    queue is closed), so there is no polling interval.  `put` never blocks: it is
+    called on the Qt main thread, where backpressure would freeze the GUI rather than
+    throttle the camera.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of frames kept in memory.  `0` means no limit.
+    overflow : {"spill", "unbounded"}
+        What to do with frames that arrive while `maxsize` frames are already waiting.
+        "spill" writes them to a temporary `.npy` file, which is read back (and
+        deleted) when the frame is retrieved, so memory use stays bounded.  The files
+        are written by a spill thread (newest frames first, as they are retrieved
+        last), so `put` doesn't wait on the disk: a frame retrieved before it was
+        spilled is returned from memory.  "unbounded" keeps them in memory anyway and
+        only counts them in `FrameQueueStats.spilled`.
+    """
+
+    def __init__(self, maxsize: int = 0, overflow: OverflowPolicy = "spill") -> None:
+        if isinstance(maxsize, bool) or not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError(f"maxsize must be a non-negative integer, not {maxsize!r}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {OVERFLOW_POLICIES}, not {overflow!r}"
+            )
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._items: deque[_Item] = deque()
+        self._in_memory = 0
+        self._spill_dir: Path | None = None
+        # frames waiting for the spill thread, which stops when the queue is cleaned up
+        self._to_spill: list[_Item] = []
+        self._spill_thread: threading.Thread | None = None
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = FrameQueueStats()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        """Return True if `close` has been called."""
+        return self._closed
+
+    def close(self) -> None:
+        """Signal that no more frames are expected.
+
+        Frames already in the queue can still be retrieved, after which `wait` returns
+        False instead of blocking.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def put(self, image: np.ndarray, event: MDAEvent) -> None:
+        """Add a frame to the end of the queue, applying the overflow policy."""
+        with self._cond:
+            now = time.perf_counter()
+            item = _Item(now, image, event, self._stats.put_count)
+            if self.maxsize and self._in_memory >= self.maxsize:
+                self._stats.spilled += 1
+                if self.overflow == "spill":
+                    item.spill = True
+                    self._to_spill.append(item)
+                    self._start_spill_thread()
+            if not item.spill:
+                self._in_memory += 1
+            self._items.append(item)
+            if not self._stats.put_count:
+                self._stats.first_put = now
+            self._stats.last_put = now
+            self._stats.put_count += 1
+            self._stats.peak_depth = max(self._stats.peak_depth, len(self._items))
+            self._cond.notify_all()
+
+    def wait(self, timeout: float | None = None, count: int = 1) -> bool:
+        """Block until at least `count` frames are available.
+
+        Returns True if any frame is available when the wait ends, i.e. False if the
+        queue is closed and empty, or if `timeout` (in seconds) expired with the queue
+        still empty.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: len(self._items) >= count or self._closed, timeout
+            )
+            return bool(self._items)
+
+    def wait_closed(self) -> None:
+        """Block until `close` is called."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed)
+
+    def get_nowait(self) -> tuple[np.ndarray, MDAEvent] | None:
+        """Remove and return the oldest frame, or None if the queue is empty."""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            item.taken = True
+            if not item.spill:
+                self._in_memory -= 1
+            data = item.data
+            wait = time.perf_counter() - item.t_put
+            self._stats.get_count += 1
+            self._stats.total_wait += wait
+            self._stats.max_wait = max(self._stats.max_wait, wait)
+        if isinstance(data, Path):
+            image = np.load(data)
+            data.unlink()
+            return image, item.event
+        return data, item.event
+
+    def get_many(self, max_items: int) -> list[tuple[np.ndarray, MDAEvent]]:
+        """Remove and return up to `max_items` of the oldest frames (non-blocking)."""
+        frames: list[tuple[np.ndarray, MDAEvent]] = []
+        while len(frames) < max_items and (frame := self.get_nowait()) is not None:
+            frames.append(frame)
+        return frames
+
+    def stats(self) -> FrameQueueStats:
+        """Return a snapshot of the queue counters."""
+        with self._cond:
+            oldest = self._items[0].t_put if self._items else 0.0
+            return replace(self._stats, depth=len(self._items), oldest_put=oldest)
+
+    def cleanup(self) -> None:
+        """Delete frames that were spilled to disk and never retrieved.
+
+        Also stops the spill thread (after the file it is writing, if any).
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._spill_thread
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            self._items.clear()
+            self._to_spill.clear()
+            self._in_memory = 0
+            if self._spill_dir is not None:
+                with contextlib.suppress(OSError):
+                    shutil.rmtree(self._spill_dir)
+                self._spill_dir = None
+
+    def _start_spill_thread(self) -> None:
+        """Start the spill thread if needed (called with the lock held)."""
+        if self._spill_thread is None and not self._stopped:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="nmm_spill_"))
+            self._spill_thread = threading.Thread(
+                target=self._spill_frames, name="nmm_spill", daemon=True
+            )
+            self._spill_thread.start()
+
+    def _spill_frames(self) -> None:
+        """Body of the spill thread: write the frames to spill to `.npy` files."""
+        spill_dir = cast("Path", self._spill_dir)
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._to_spill or self._stopped)
+                if self._stopped:
+                    return
+                item = self._to_spill.pop()
+                if item.taken:
+                    continue
+                image = cast("np.ndarray", item.data)
+            path = spill_dir / f"{item.number:08d}.npy"
+            np.save(path, image)
+            with self._cond:
+                if item.taken or self._stopped:
+                    # retrieved from memory in the meantime
+                    path.unlink()
+                else:
+                    item.data = path
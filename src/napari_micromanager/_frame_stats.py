@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# number of histogram bins kept per frame, spread evenly over the camera range
+FRAME_STATS_BINS = 64
+# percentiles kept per frame (the first and last set the initial contrast limits of
+# MDA layers)
+FRAME_STATS_PERCENTILES = (1.0, 99.0)
+# histograms and percentiles are computed from at most this many pixels of each
+# frame (a regular grid of them); min and max always use every pixel
+FRAME_STATS_SAMPLE = 2**18
+
+
+class FrameStats:
+    """Per-frame statistics of an MDA array, filled in as frames are written.
+
+    Holds, for each frame index of an array of `index_shape` frames, the min, max,
+    `FRAME_STATS_PERCENTILES` and a `FRAME_STATS_BINS` histogram of the frame.  The
+    stats of a frame are looked up in O(1) with `minmax`, `percentiles` and
+    `histogram`, which return None for frames that were not written yet.
+
+    The histogram bins cover the values of `bit_depth` bits (e.g. 0-4095 for a
+    12-bit camera, whose frames are stored as uint16); higher values are counted
+    in the last bin.
+
+    Parameters
+    ----------
+    index_shape : Sequence[int]
+        Shape of the index axes of the array (i.e. without Y, X and color).
+    dtype : str
+        Unsigned integer dtype of the frames.
+    bit_depth : int
+        Number of bits used by the camera (`CMMCorePlus.getImageBitDepth()`).  0, or
+        more bits than `dtype` has, bins over the full dtype range.
+    """
+
+    def __init__(
+        self, index_shape: Sequence[int], dtype: str, bit_depth: int = 0
+    ) -> None:
+        self.dtype = np.dtype(dtype)
+        if self.dtype.kind != "u":
+            raise ValueError(f"dtype must be an unsigned integer, not {dtype!r}")
+        dtype_bits = 8 * self.dtype.itemsize
+        self.bit_depth = bit_depth if 0 < bit_depth <= dtype_bits else dtype_bits
+        shape = self.index_shape = tuple(index_shape)
+        self._valid = np.zeros(shape, bool)
+        self._minmax = np.zeros((*shape, 2), self.dtype)
+        self._percentiles = np.zeros((*shape, len(FRAME_STATS_PERCENTILES)), "f4")
+        self._hist = np.zeros((*shape, FRAME_STATS_BINS), "u4")
+        self._bin_width = max(2**self.bit_depth // FRAME_STATS_BINS, 1)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the statistics."""
+        arrays = (self._valid, self._minmax, self._percentiles, self._hist)
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def bin_edges(self) -> np.ndarray:
+        """Edges of the histogram bins (`FRAME_STATS_BINS + 1` values)."""
+        edges = np.arange(FRAME_STATS_BINS + 1, dtype="f8") * self._bin_width
+        return cast("np.ndarray", edges)
+
+    def update(self, index: tuple, data: np.ndarray) -> None:
+        """Compute the stats of `data`, written at `index` of the array.
+
+        `data` is a single frame, or a stack of frames if `index` ends with a slice
+        (as written by the MDA handler).  The stats of RGB frames cover all colors.
+        """
+        if index and isinstance(index[-1], slice):
+            start = index[-1].start
+            for i, frame in enumerate(data):
+                self._update_frame((*index[:-1], start + i), frame)
+        else:
+            self._update_frame(index, data)
+
+    def values(self, index: tuple) -> tuple[np.ndarray, ...]:
+        """Return the raw stats at `index` (a frame, or a slab as in `update`).
+
+        With `set_values`, this copies the stats computed by another `FrameStats`
+        (e.g. in the writer process).
+        """
+        arrays = (self._minmax, self._percentiles, self._hist)
+        return tuple(a[index].copy() for a in arrays)
+
+    def set_values(self, index: tuple, values: tuple[np.ndarray, ...]) -> None:
+        """Store the raw stats returned by `values` for the frames at `index`."""
+        self._minmax[index], self._percentiles[index], self._hist[index] = values
+        self._valid[index] = True
+
+    def _update_frame(self, index: tuple, frame: np.ndarray) -> None:
+        self._minmax[index] = frame.min(), frame.max()
+        step = math.ceil(math.sqrt(frame.size / FRAME_STATS_SAMPLE))
+        sample = frame[::step, ::step] if step > 1 else frame
+        values = sample.ravel()
+        if self.dtype.itemsize <= 2:
+            counts = np.bincount(values)
+            cumsum = np.cumsum(counts)
+            targets = np.asarray(FRAME_STATS_PERCENTILES) / 100 * (cumsum[-1] - 1)
+            self._percentiles[index] = np.searchsorted(cumsum, targets, side="right")
+            self._hist[index] = np.bincount(
+                self._bins(np.arange(len(counts))),
+                weights=counts,
+                minlength=FRAME_STATS_BINS,
+            )
+        else:
+            self._percentiles[index] = np.percentile(values, FRAME_STATS_PERCENTILES)
+            self._hist[index] = np.bincount(
+                self._bins(values), minlength=FRAME_STATS_BINS
+            )
+        self._valid[index] = True
+
+    def _bins(self, values: np.ndarray) -> np.ndarray:
+        """Return the histogram bin of each of `values`."""
+        return cast(
+            "np.ndarray", np.minimum(values // self._bin_width, FRAME_STATS_BINS - 1)
+        )
+
+    def minmax(self, index: tuple[int, ...]) -> tuple[int, int] | None:
+        """Return the (min, max) of the frame at `index`, None if not written yet."""
+        if not self._valid[index]:
+            return None
+        low, high = self._minmax[index]
+        return int(low), int(high)
+
+    def percentiles(self, index: tuple[int, ...]) -> tuple[float, ...] | None:
+        """Return the `FRAME_STATS_PERCENTILES` of the frame at `index` (or None)."""
+        if not self._valid[index]:
+            return None
+        return tuple(float(p) for p in self._percentiles[index])
+
+    def histogram(self, index: tuple[int, ...]) -> np.ndarray | None:
+        """Return the histogram of the frame at `index` (or None); see `bin_edges`."""
+        if not self._valid[index]:
+            return None
+        return cast("np.ndarray", self._hist[index].copy())
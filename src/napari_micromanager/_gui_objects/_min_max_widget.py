@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import itertools
+import math
 import warnings
-from typing import TYPE_CHECKING
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, cast
 
+import numpy as np
 from qtpy.QtGui import QColor
 from qtpy.QtWidgets import QLabel, QScrollArea, QWidget
+from superqt.utils import ensure_main_thread
+
+from napari_micromanager._util import NMM_METADATA_KEY
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
@@ -12,26 +21,175 @@ if TYPE_CHECKING:
     from napari.layers import Image
 
 QCOLORS = set(QColor.colorNames())
+# number of (layer, slice index) ranges kept by `MinMax`
+MINMAX_CACHE_SIZE = 512
+# number of threads computing ranges for `MinMax`
+MINMAX_WORKERS = 2
 
 
 class MinMax(QScrollArea):
-    """A Widget to display min and max layer grey values."""
+    """A Widget to display min and max layer grey values.
+
+    The range of the shown slice of each layer is taken from the per-frame stats of
+    MDA layers when available, and otherwise computed in a worker thread, so that
+    scrolling through large layers doesn't block the GUI.  Only the results of the
+    latest `update_from_layers` call are shown.  The ranges of layers with slider
+    dimensions are cached per (layer, slice index), until the layer data changes or
+    `forget` is called with the layer.
+
+    Parameters
+    ----------
+    parent : QWidget | None
+        Parent widget.
+    sample_size : int
+        If > 0, the range of slices with more pixels than this is computed from a
+        regular grid of about this many pixels (faster, but approximate).
+    """
 
-    def __init__(self, *, parent: QWidget | None = None) -> None:
+    def __init__(self, *, parent: QWidget | None = None, sample_size: int = 0) -> None:
         super().__init__(parent=parent)
         self.setWidgetResizable(True)
         self._label = QLabel()
         self.setWidget(self._label)
+        self.sample_size = sample_size
+        self._pool: ThreadPoolExecutor | None = None
+        # futures of the latest update, cancelled when a new update comes in
+        self._futures: list[Future] = []
+        self._generation = 0
+        # (color, range or None while computing) of each layer of the latest update
+        self._entries: list[tuple[str, tuple | None]] = []
+        # keyed by (layer token, slice index): unlike `id(layer)`, a token is never
+        # reused by another layer
+        self._cache: OrderedDict[tuple[int, tuple], tuple] = OrderedDict()
+        self._tokens: weakref.WeakKeyDictionary[Image, int] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._token_counter = itertools.count()
 
     def update_from_layers(self, layers: Iterable[Image]) -> None:
         """Update the minmax label based on data from layers."""
-        min_max_txt = "(min, max):  "
+        self._generation += 1
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._entries = []
         for layer in layers:
             col = col if (col := layer.colormap.name) in QCOLORS else "gray"
             try:
-                minmax = tuple(layer._calc_data_range(mode="slice"))
-                min_max_txt += f' <font color="{col}">{minmax}</font>'
+                minmax = _frame_minmax(layer)
+                key = self._cache_key(layer)
+                if minmax is None and key is not None:
+                    minmax = self._cache.get(key)
+                    if minmax is not None:
+                        self._cache.move_to_end(key)
+                if minmax is None:
+                    view = layer._slice.image.view
+                    self._submit(len(self._entries), key, view, layer.rgb)
             except Exception:
                 warnings.warn("cannot update minmax. napari api changed?", stacklevel=2)
+                continue
+            self._entries.append((col, minmax))
+        self._render()
+
+    def forget(self, layer: Image) -> None:
+        """Drop the cached ranges of `layer` (e.g. when it is removed)."""
+        if (token := self._tokens.pop(layer, None)) is not None:
+            self._drop(token)
+
+    def cleanup(self) -> None:
+        """Cancel the pending computations and stop the worker threads."""
+        for future in self._futures:
+            future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _submit(self, entry: int, key: tuple | None, view: Any, rgb: bool) -> None:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(MINMAX_WORKERS, "nmm_minmax")
+        generation = self._generation
+
+        def _compute() -> None:
+            minmax = _data_range(view, rgb, self.sample_size)
+            self._on_range(generation, entry, key, minmax)
+
+        self._futures.append(self._pool.submit(_compute))
+
+    @ensure_main_thread
+    def _on_range(
+        self, generation: int, entry: int, key: tuple | None, minmax: tuple
+    ) -> None:
+        # not cached if the layer was forgotten in the meantime
+        if key is not None and key[0] in self._tokens.values():
+            self._cache[key] = minmax
+            if len(self._cache) > MINMAX_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        if generation != self._generation:
+            return  # a newer update came in
+        col, _ = self._entries[entry]
+        self._entries[entry] = (col, minmax)
+        self._render()
+
+    def _cache_key(self, layer: Image) -> tuple[int, tuple] | None:
+        """Return the cache key of the shown slice of `layer`, None if not cacheable.
+
+        Layers without slider dimensions (e.g. the live preview, which is updated in
+        place) are not cached.
+        """
+        if not (index := _slice_index(layer)):
+            return None
+        if (token := self._tokens.get(layer)) is None:
+            token = self._tokens[layer] = next(self._token_counter)
 
+            # drop the cached ranges of the layer when its data changes
+            def _invalidate() -> None:
+                self._drop(token)
+
+            layer.events.data.connect(_invalidate)
+        return (token, index)
+
+    def _drop(self, token: int) -> None:
+        for key in [k for k in self._cache if k[0] == token]:
+            del self._cache[key]
+
+    def _render(self) -> None:
+        min_max_txt = "(min, max):  "
+        for col, minmax in self._entries:
+            txt = "..." if minmax is None else str(minmax)
+            min_max_txt += f' <font color="{col}">{txt}</font>'
         self._label.setText(min_max_txt)
+
+
+def _slice_index(layer: Image) -> tuple[int, ...]:
+    """Return the index of the shown slice of `layer` along its slider dimensions."""
+    displayed = set(layer._slice_input.displayed)
+    indices = layer._slice_indices
+    return tuple(int(i) for d, i in enumerate(indices) if d not in displayed)
+
+
+def _data_range(data: Any, rgb: bool, sample_size: int = 0) -> tuple:
+    """Return the (min, max) of `data`, from a regular grid of `sample_size` pixels.
+
+    `sample_size` 0 uses every pixel.  The last axis is the color axis if `rgb`.
+    """
+    data = np.asarray(data)
+    n_pixels = data.size // 3 if rgb else data.size
+    if 0 < sample_size < n_pixels:
+        step = math.ceil(math.sqrt(n_pixels / sample_size))
+        data = data[..., ::step, ::step, :] if rgb else data[..., ::step, ::step]
+    return data.min().item(), data.max().item()
+
+
+def _frame_minmax(layer: Image) -> tuple[int, int] | None:
+    """Return the (min, max) of the shown frame of an MDA layer from its stats.
+
+    These are computed by the MDA writer, so nothing is read from the data.  Returns
+    None if they are not available (not an MDA layer, frame not written yet, or the
+    frame planes are not the displayed ones).
+    """
+    stats = layer.metadata.get(NMM_METADATA_KEY, {}).get("frame_stats")
+    ndim = layer.ndim
+    if stats is None or list(layer._slice_input.displayed) != [ndim - 2, ndim - 1]:
+        return None
+    index = tuple(int(i) for i in layer._slice_indices[:-2])
+    return cast("tuple[int, int] | None", stats.minmax(index))
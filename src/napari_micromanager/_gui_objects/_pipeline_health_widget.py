@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from qtpy.QtCore import QTimer
+from qtpy.QtWidgets import QFormLayout, QLabel, QWidget
+
+from napari_micromanager._pipeline_health import (
+    PIPELINE_HEALTH_INTERVAL_MS,
+    PipelineHealth,
+)
+
+if TYPE_CHECKING:
+    from pymmcore_plus import CMMCorePlus
+    from qtpy.QtGui import QHideEvent, QShowEvent
+
+    from napari_micromanager._core_link import CoreViewerLink
+    from napari_micromanager._pipeline_health import PipelineSample
+
+# (key, row title) of the values shown by `PipelineHealthWidget`
+HEALTH_ROWS = (
+    ("acquisition", "Acquisition:"),
+    ("write", "Writing:"),
+    ("queue", "Queue:"),
+    ("oldest", "Oldest unwritten frame:"),
+    ("disk", "Disk free:"),
+    ("display", "Display:"),
+)
+
+
+class PipelineHealthWidget(QWidget):
+    """Live throughput and backlog of the acquisition pipeline.
+
+    While shown, the counters of the main window's `CoreViewerLink` are sampled
+    every `PIPELINE_HEALTH_INTERVAL_MS`, so nothing is added to the acquisition
+    path.  The free space of the storage directory is read in a worker thread.
+
+    Parameters
+    ----------
+    parent : QWidget | None
+        Parent widget, normally the `MainWindow` (whose core link is sampled).
+    mmcore : CMMCorePlus | None
+        Unused, for compatibility with the other dock widgets.
+    """
+
+    def __init__(
+        self, *, parent: QWidget | None = None, mmcore: CMMCorePlus | None = None
+    ) -> None:
+        super().__init__(parent=parent)
+        self._link: CoreViewerLink | None = getattr(parent, "_core_link", None)
+        self._prev: PipelineSample | None = None
+        self._disk_free: int | None = None
+        # reads the free disk space, which can be slow on network drives
+        self._pool: ThreadPoolExecutor | None = None
+        self._disk_future: Future | None = None
+
+        layout = QFormLayout(self)
+        self._labels: dict[str, QLabel] = {}
+        for key, title in HEALTH_ROWS:
+            self._labels[key] = QLabel("-")
+            layout.addRow(title, self._labels[key])
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(PIPELINE_HEALTH_INTERVAL_MS)
+        self._timer.timeout.connect(self._sample)
+
+    def showEvent(self, a0: QShowEvent | None) -> None:
+        self._prev = None
+        self._sample()
+        self._timer.start()
+        super().showEvent(a0)
+
+    def hideEvent(self, a0: QHideEvent | None) -> None:
+        self._timer.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            self._disk_future = None
+        super().hideEvent(a0)
+
+    def _sample(self) -> None:
+        if self._link is None:
+            return
+        sample = self._link.pipeline_sample()
+        self._update_disk_free(sample)
+        if self._prev is not None:
+            self._show(PipelineHealth.from_samples(self._prev, sample))
+        self._prev = sample
+
+    def _update_disk_free(self, sample: PipelineSample) -> None:
+        """Take the result of the last disk space request, and send a new one."""
+        future = self._disk_future
+        if future is not None and not future.done():
+            return
+        if future is not None:
+            self._disk_free = None if future.exception() else future.result().free
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(1, "nmm_disk_usage")
+        self._disk_future = self._pool.submit(shutil.disk_usage, sample.storage_dir)
+
+    def _show(self, health: PipelineHealth) -> None:
+        labels = self._labels
+        labels["acquisition"].setText(f"{health.acquisition_fps:.1f} fps")
+        labels["write"].setText(f"{health.write_mb_per_s:.1f} MB/s")
+        labels["queue"].setText(f"{health.queue_depth} frames")
+        labels["oldest"].setText(f"{health.oldest_frame_age:.1f} s")
+        # flag the backlog when the writer falls behind
+        labels["oldest"].setStyleSheet("color: red" if health.falling_behind else "")
+        free = self._disk_free
+        labels["disk"].setText("-" if free is None else f"{free / 1e9:.1f} GB")
+        labels["display"].setText(f"{health.display_fps:.1f} fps")
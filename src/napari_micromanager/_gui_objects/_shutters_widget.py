@@ -3,6 +3,7 @@ from typing import Optional
 from pymmcore_plus import CMMCorePlus, DeviceType
 from pymmcore_widgets import ShuttersWidget
 from qtpy.QtWidgets import QHBoxLayout, QSizePolicy, QWidget
+from superqt.utils import ensure_main_thread
 
 
 class MMShuttersWidget(QWidget):
@@ -23,6 +24,7 @@ class MMShuttersWidget(QWidget):
         self._mmc.events.systemConfigurationLoaded.connect(self._on_cfg_loaded)
         self._on_cfg_loaded()
 
+    @ensure_main_thread
     def _on_cfg_loaded(self) -> None:
         self._clear()
 
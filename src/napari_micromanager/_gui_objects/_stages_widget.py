@@ -6,6 +6,7 @@ from pymmcore_widgets import StageWidget
 from qtpy.QtCore import QMimeData, Qt
 from qtpy.QtGui import QDrag, QDragEnterEvent, QDropEvent, QMouseEvent
 from qtpy.QtWidgets import QGroupBox, QHBoxLayout, QSizePolicy, QWidget
+from superqt.utils import ensure_main_thread
 
 STAGE_DEVICES = {DeviceType.Stage, DeviceType.XYStage}
 
@@ -29,6 +30,7 @@ class MMStagesWidget(QWidget):
         self._on_cfg_loaded()
         self._mmc.events.systemConfigurationLoaded.connect(self._on_cfg_loaded)
 
+    @ensure_main_thread
     def _on_cfg_loaded(self) -> None:
         self._clear()
         sizepolicy = QSizePolicy(
@@ -1,29 +1,11 @@
 from __future__ import annotations
 
 import contextlib
+import importlib
 from typing import TYPE_CHECKING, cast
 
 from fonticon_mdi6 import MDI6
 from pymmcore_plus import CMMCorePlus
-from pymmcore_widgets import (
-    CameraRoiWidget,
-    ChannelGroupWidget,
-    ChannelWidget,
-    ConfigurationWidget,
-    DefaultCameraExposureWidget,
-    GroupPresetTableWidget,
-    LiveButton,
-    ObjectivesWidget,
-    PropertyBrowser,
-    SnapButton,
-)
-
-try:
-    # this was renamed
-    from pymmcore_widgets import ObjectivesPixelConfigurationWidget
-except ImportError:
-    from pymmcore_widgets import PixelSizeWidget as ObjectivesPixelConfigurationWidget
-
 from qtpy.QtCore import QEvent, QObject, QSize, Qt
 from qtpy.QtWidgets import (
     QDockWidget,
@@ -39,30 +21,56 @@ from qtpy.QtWidgets import (
 )
 from superqt.fonticon import icon
 
-from ._illumination_widget import IlluminationWidget
-from ._mda_widget import MultiDWidget
 from ._min_max_widget import MinMax
-from ._shutters_widget import MMShuttersWidget
-from ._stages_widget import MMStagesWidget
 
 if TYPE_CHECKING:
     import napari.viewer
+    from qtpy.QtGui import QShowEvent
 
 TOOL_SIZE = 35
 
 
-# Dict for QObject and its QPushButton icon
-DOCK_WIDGETS: dict[str, tuple[type[QWidget], str | None]] = {
-    "Device Property Browser": (PropertyBrowser, MDI6.table_large),
-    "Groups and Presets Table": (GroupPresetTableWidget, MDI6.table_large_plus),
-    "Illumination Control": (IlluminationWidget, MDI6.lightbulb_on),
-    "Stages Control": (MMStagesWidget, MDI6.arrow_all),
-    "Camera ROI": (CameraRoiWidget, MDI6.crop),
-    "Pixel Size Table": (ObjectivesPixelConfigurationWidget, MDI6.ruler),
-    "MDA": (MultiDWidget, None),
+# Dict of dock widget name -> ("module:class" of the widget, QPushButton icon).
+# Widget classes are imported when the dock widget is first shown (see
+# `_widget_class`): pymmcore_widgets is slow to import.
+DOCK_WIDGETS: dict[str, tuple[str, str | None]] = {
+    "Device Property Browser": ("pymmcore_widgets:PropertyBrowser", MDI6.table_large),
+    "Groups and Presets Table": (
+        "pymmcore_widgets:GroupPresetTableWidget",
+        MDI6.table_large_plus,
+    ),
+    "Illumination Control": (
+        "._illumination_widget:IlluminationWidget",
+        MDI6.lightbulb_on,
+    ),
+    "Stages Control": ("._stages_widget:MMStagesWidget", MDI6.arrow_all),
+    "Camera ROI": ("pymmcore_widgets:CameraRoiWidget", MDI6.crop),
+    # ObjectivesPixelConfigurationWidget was renamed from PixelSizeWidget
+    "Pixel Size Table": (
+        "pymmcore_widgets:ObjectivesPixelConfigurationWidget,PixelSizeWidget",
+        MDI6.ruler,
+    ),
+    "Pipeline Health": (
+        "._pipeline_health_widget:PipelineHealthWidget",
+        MDI6.speedometer,
+    ),
+    "MDA": ("._mda_widget:MultiDWidget", None),
 }
 
 
+def _widget_class(key: str) -> type[QWidget]:
+    """Import and return the widget class of the `DOCK_WIDGETS` entry `key`.
+
+    The class is the first of the comma-separated names that the module has.
+    """
+    module_name, _, names = DOCK_WIDGETS[key][0].partition(":")
+    module = importlib.import_module(module_name, __package__)
+    for name in names.split(","):
+        if (cls := getattr(module, name, None)) is not None:
+            return cast("type[QWidget]", cls)
+    raise ImportError(f"cannot import {names!r} from {module_name!r}")
+
+
 class MicroManagerToolbar(QMainWindow):
     """Create a QToolBar for the Main Window."""
 
@@ -72,11 +80,12 @@ class MicroManagerToolbar(QMainWindow):
         self._mmc = CMMCorePlus.instance()
         self.viewer: napari.viewer.Viewer = getattr(viewer, "__wrapped__", viewer)
 
-        # add variables to the napari console
-        if console := getattr(self.viewer.window._qt_viewer, "console", None):
-            from useq import MDAEvent, MDASequence
+        # add variables to the napari console (napari pushes them when the console
+        # is first opened, rather than creating it now: that is slow)
+        from useq import MDAEvent, MDASequence
 
-            console.push(
+        with contextlib.suppress(AttributeError):
+            self.viewer.update_console(
                 {
                     "MDAEvent": MDAEvent,
                     "MDASequence": MDASequence,
@@ -108,7 +117,7 @@ class MicroManagerToolbar(QMainWindow):
             ObjectivesToolBar(self),
             None,
             ShuttersToolBar(self),
-            SnapLiveToolBar(self),
+            (snap_live := SnapLiveToolBar(self)),
             ExposureToolBar(self),
             ToolsToolBar(self),
         ]
@@ -118,6 +127,9 @@ class MicroManagerToolbar(QMainWindow):
             else:
                 self.addToolBarBreak(Qt.ToolBarArea.TopToolBarArea)
 
+        # shows the live mode frame rates
+        self.live_stats_label = snap_live.live_stats_label
+
         self._is_initialized = False
         self.installEventFilter(self)
 
@@ -180,7 +192,7 @@ class MicroManagerToolbar(QMainWindow):
             # creating it for the first time
             # sourcery skip: extract-method
             try:
-                wdg_cls = DOCK_WIDGETS[key][0]
+                wdg_cls = _widget_class(key)
             except KeyError as e:
                 raise KeyError(
                     "Not a recognized dock widget key. "
@@ -189,7 +201,7 @@ class MicroManagerToolbar(QMainWindow):
                 ) from e
             wdg = wdg_cls(parent=self, mmcore=self._mmc)
 
-            if isinstance(wdg, PropertyBrowser):
+            if key == "Device Property Browser":
                 wdg.setSizePolicy(
                     QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
                 )
@@ -226,6 +238,12 @@ class MicroManagerToolbar(QMainWindow):
 
 
 class MMToolBar(QToolBar):
+    """A toolbar whose widgets are created when it is first shown.
+
+    Subclasses add their widgets in `_populate`, and import them there, so that
+    creating the main window doesn't import (or build) every pymmcore_widgets widget.
+    """
+
     def __init__(self, title: str, parent: QWidget = None) -> None:
         super().__init__(title, parent)
         self.setMinimumHeight(48)
@@ -236,6 +254,16 @@ class MMToolBar(QToolBar):
         gb_layout.setContentsMargins(0, 0, 0, 0)
         gb_layout.setSpacing(2)
         self.addWidget(self.frame)
+        self._populated = False
+
+    def showEvent(self, a0: QShowEvent | None) -> None:
+        if not self._populated:
+            self._populated = True
+            self._populate()
+        super().showEvent(a0)
+
+    def _populate(self) -> None:
+        """Add the widgets of the toolbar (called when it is first shown)."""
 
     def addSubWidget(self, wdg: QWidget) -> None:
         cast("QHBoxLayout", self.frame.layout()).addWidget(wdg)
@@ -244,13 +272,21 @@ class MMToolBar(QToolBar):
 class ConfigToolBar(MMToolBar):
     def __init__(self, parent: QWidget) -> None:
         super().__init__("Configuration", parent)
-        self.addSubWidget(ConfigurationWidget())
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
 
+    def _populate(self) -> None:
+        from pymmcore_widgets import ConfigurationWidget
+
+        self.addSubWidget(ConfigurationWidget())
+
 
 class ObjectivesToolBar(MMToolBar):
     def __init__(self, parent: QWidget) -> None:
         super().__init__("Objectives", parent=parent)
+
+    def _populate(self) -> None:
+        from pymmcore_widgets import ObjectivesWidget
+
         self._wdg = ObjectivesWidget()
         self.addSubWidget(self._wdg)
 
@@ -258,6 +294,10 @@ class ObjectivesToolBar(MMToolBar):
 class ChannelsToolBar(MMToolBar):
     def __init__(self, parent: QWidget) -> None:
         super().__init__("Channels", parent)
+
+    def _populate(self) -> None:
+        from pymmcore_widgets import ChannelGroupWidget, ChannelWidget
+
         self.addSubWidget(QLabel(text="Channel:"))
         self.addSubWidget(ChannelGroupWidget())
         self.addSubWidget(ChannelWidget())
@@ -266,6 +306,10 @@ class ChannelsToolBar(MMToolBar):
 class ExposureToolBar(MMToolBar):
     def __init__(self, parent: QWidget) -> None:
         super().__init__("Exposure", parent)
+
+    def _populate(self) -> None:
+        from pymmcore_widgets import DefaultCameraExposureWidget
+
         self.addSubWidget(QLabel(text="Exposure:"))
         self.addSubWidget(DefaultCameraExposureWidget())
 
@@ -273,11 +317,19 @@ class ExposureToolBar(MMToolBar):
 class SnapLiveToolBar(MMToolBar):
     def __init__(self, parent: QWidget) -> None:
         super().__init__("Snap Live", parent)
+        # created right away: the main window shows the live mode stats in it
+        self.live_stats_label = QLabel()
+        self.live_stats_label.setToolTip("Live mode: camera / display frame rates")
+        self.live_stats_label.hide()
+        self.addSubWidget(self.live_stats_label)
+
+    def _populate(self) -> None:
+        from pymmcore_widgets import LiveButton, SnapButton
+
         snap_btn = SnapButton()
         snap_btn.setText("")
         snap_btn.setToolTip("Snap")
         snap_btn.setFixedSize(TOOL_SIZE, TOOL_SIZE)
-        self.addSubWidget(snap_btn)
 
         live_btn = LiveButton()
         live_btn.setText("")
@@ -285,7 +337,11 @@ class SnapLiveToolBar(MMToolBar):
         live_btn.button_text_off = ""
         live_btn.button_text_on = ""
         live_btn.setFixedSize(TOOL_SIZE, TOOL_SIZE)
-        self.addSubWidget(live_btn)
+
+        # before the stats label
+        layout = cast("QHBoxLayout", self.frame.layout())
+        layout.insertWidget(0, snap_btn)
+        layout.insertWidget(1, live_btn)
 
 
 class ToolsToolBar(MMToolBar):
@@ -304,7 +360,9 @@ class ToolsToolBar(MMToolBar):
 
         if not isinstance(parent, MicroManagerToolbar):
             raise TypeError("parent must be a MicroManagerToolbar instance.")
+        self._toolbar = parent
 
+    def _populate(self) -> None:
         for key in DOCK_WIDGETS:
             btn_icon = DOCK_WIDGETS[key][1]
             if btn_icon is None:
@@ -316,18 +374,22 @@ class ToolsToolBar(MMToolBar):
             btn.setIcon(icon(btn_icon, color=(0, 255, 0)))
             btn.setIconSize(QSize(30, 30))
             btn.setWhatsThis(key)
-            btn.clicked.connect(parent._show_dock_widget)
+            btn.clicked.connect(self._toolbar._show_dock_widget)
             self.addSubWidget(btn)
 
         btn = QPushButton("MDA")
         btn.setToolTip("MultiDimensional Acquisition")
         btn.setFixedSize(TOOL_SIZE, TOOL_SIZE)
         btn.setWhatsThis("MDA")
-        btn.clicked.connect(parent._show_dock_widget)
+        btn.clicked.connect(self._toolbar._show_dock_widget)
         self.addSubWidget(btn)
 
 
 class ShuttersToolBar(MMToolBar):
     def __init__(self, parent: QWidget) -> None:
         super().__init__("Shutters", parent)
+
+    def _populate(self) -> None:
+        from ._shutters_widget import MMShuttersWidget
+
         self.addSubWidget(MMShuttersWidget())
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from ._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pymmcore_plus import CMMCorePlus
+
+# interval (s) at which `run_headless` delivers the queued core signals
+_POLL_INTERVAL = 0.01
+
+
+@dataclass
+class HeadlessReport:
+    """Outcome of an acquisition run by `run_headless`.
+
+    Attributes
+    ----------
+    frames_acquired : int
+        Number of MDA frames received from the core.
+    frames_written : int
+        Number of frames written to the arrays.
+    nbytes : int
+        Uncompressed size (bytes) of the frames written.
+    elapsed : float
+        Time (s) from the start of the MDA until every frame was written.
+    paths : list[Path]
+        The stores (zarr or .npy) the frames were written to.
+    """
+
+    frames_acquired: int
+    frames_written: int
+    nbytes: int
+    elapsed: float
+    paths: list[Path] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """Return a description of the throughput and of the stores written."""
+        rate = self.frames_written / self.elapsed if self.elapsed else 0.0
+        mb_per_s = self.nbytes / 1e6 / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"Wrote {self.frames_written}/{self.frames_acquired} frames "
+            f"({self.nbytes / 1e6:.1f} MB) in {self.elapsed:.2f} s "
+            f"({rate:.1f} fps, {mb_per_s:.1f} MB/s)"
+        ]
+        lines.extend(f"  {path}" for path in self.paths)
+        return "\n".join(lines)
+
+
+def run_headless(
+    config: str | Path,
+    sequence: str | Path,
+    out: str | Path,
+    mmcore: CMMCorePlus | None = None,
+) -> HeadlessReport:
+    """Run the MDA sequence saved in `sequence` and write its frames to `out`.
+
+    The frames go through the same queue, writer thread and arrays as in the GUI
+    (`_NapariMDAHandler` without a viewer), so `out` has the layout of a GUI
+    acquisition with the "save_dir" option.  The other NMM options of the sequence
+    (storage, codec, chunks, trace...) apply as well.  Only a `QCoreApplication` is
+    created, to deliver the core signals: no display is needed.
+
+    Parameters
+    ----------
+    config : str | Path
+        The Micro-Manager configuration file to load.
+    sequence : str | Path
+        The `useq.MDASequence`, saved as yaml or json.
+    out : str | Path
+        Directory where the arrays are written (created if needed).
+    mmcore : CMMCorePlus | None
+        The core to use.  A new one is created by default.
+    """
+    import useq
+    from pymmcore_plus import CMMCorePlus
+    from qtpy.QtCore import QCoreApplication
+
+    from ._config_loading import resolve_config_path
+    from ._mda_handler import _NapariMDAHandler
+
+    # before the core, so that its signals use Qt (and are delivered in this thread)
+    app = QCoreApplication.instance() or QCoreApplication([])
+    seq = useq.MDASequence.from_file(sequence)
+    seq.metadata.setdefault(NMM_METADATA_KEY, {})["save_dir"] = str(out)
+
+    core = mmcore or CMMCorePlus()
+    core.loadSystemConfiguration(str(resolve_config_path(core, config)))
+    handler = _NapariMDAHandler(core, None)
+    try:
+        t0 = time.perf_counter()
+        thread = core.run_mda(seq)
+        while thread.is_alive():
+            app.processEvents()
+            thread.join(_POLL_INTERVAL)
+        # deliver the signals emitted at the end of the MDA, until the writer thread
+        # wrote the frames left in the queue
+        app.processEvents()
+        while handler._writing:
+            app.processEvents()
+            time.sleep(_POLL_INTERVAL)
+        elapsed = time.perf_counter() - t0
+        stats = handler.writer_stats()
+        return HeadlessReport(
+            frames_acquired=handler.queue_stats().put_count,
+            frames_written=stats.frames,
+            nbytes=stats.nbytes,
+            elapsed=elapsed,
+            paths=list(handler._store_paths.values()),
+        )
+    finally:
+        handler._cleanup()
@@ -1,38 +1,147 @@
 from __future__ import annotations
 
 import contextlib
+import errno
+import logging
+import os
+import shutil
 import tempfile
+import threading
 import time
-from collections import deque
-from typing import TYPE_CHECKING, Callable, cast
-
-import napari
-import zarr
+from dataclasses import dataclass
+from functools import partial
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, cast
+from warnings import warn
+
+import numpy as np
 from superqt.utils import create_worker, ensure_main_thread
 
-from ._util import NMM_METADATA_KEY, PYMMCW_METADATA_KEY, get_full_sequence_axes
+from ._display import DisplayGovernor, get_display_rate
+from ._frame_queue import FrameQueue
+from ._frame_stats import FrameStats
+from ._mosaic import MOSAIC_LEVELS, Mosaic, get_mosaic_option, in_mosaic
+from ._process_writer import (
+    PROCESS_WRITER_POLL,
+    ProcessWriter,
+    ProcessWriterError,
+    WriteResult,
+    get_writer_options,
+)
+from ._pyramid import downsample, get_pyramid_levels, pyramid_shapes
+from ._storage import (
+    AUTO_INITIAL_CODEC,
+    STORE_EXTENSIONS,
+    GrowingArray,
+    RaggedArray,
+    choose_codec,
+    chunk_layout,
+    close_array,
+    create_array,
+    create_memmap,
+    get_chunk_options,
+    get_codec_option,
+    get_storage_option,
+    measure_codecs,
+    open_array,
+)
+from ._trace import FrameTracer, get_trace_option
+from ._util import (
+    NMM_METADATA_KEY,
+    PYMMCW_METADATA_KEY,
+    connect_all,
+    disconnect_all,
+    ensure_unique,
+    get_full_sequence_axes,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Generator, Iterator, Sequence
     from uuid import UUID
 
     import napari.viewer
-    import numpy as np
+    import zarr
     from napari.layers import Image
+    from psygnal import SignalInstance
     from pymmcore_plus import CMMCorePlus
-    from pymmcore_plus.core.events._protocol import PSignalInstance
+    from pymmcore_plus.core.events._protocol import PSignal
     from typing_extensions import TypedDict
     from useq import MDAEvent, MDASequence
 
+    from ._display import DisplayStats, DisplayUpdate
+    from ._frame_queue import FrameQueueStats, OverflowPolicy
+    from ._storage import Codec
+
     class LayerMeta(TypedDict, total=False):
         """Metadata that we add to layer.metadata."""
 
         useq_sequence: MDASequence
         uid: UUID
         ch_id: str
+        frame_stats: FrameStats
 
 
 DEFAULT_NAME = "Exp"
+# default maximum number of frames kept in memory while waiting to be written, and
+# what to do with frames beyond that (see `FrameQueue`).  Both can be overridden per
+# sequence with the "queue_size" and "queue_overflow" keys of
+# `MDASequence.metadata[NMM_METADATA_KEY]`.
+DEFAULT_QUEUE_SIZE = 128
+DEFAULT_QUEUE_OVERFLOW: OverflowPolicy = "spill"
+# default maximum number of frames the writer takes from the queue at once, and how
+# long (s) it waits for that many frames to arrive before writing what it has.
+# Consecutive frames of a batch that go to adjacent planes of the same layer are
+# written with a single slab assignment.  Overridden per sequence with the
+# "write_batch_size" and "write_batch_latency" keys of the NMM metadata.
+DEFAULT_WRITE_BATCH_SIZE = 32
+DEFAULT_WRITE_BATCH_LATENCY = 0.0
+# with the "auto" codec, the writer measures the codecs on this many frames (waiting
+# at most AUTO_CODEC_TIMEOUT s for them), and requires a codec to encode this many
+# times faster than the measured acquisition data rate.
+AUTO_CODEC_FRAMES = 4
+AUTO_CODEC_TIMEOUT = 2.0
+AUTO_CODEC_HEADROOM = 1.5
+# default RAM budget (MB) for the in-memory storage of acquisitions (0: disabled).
+# Overridden with the "ram_budget_mb" key of the NMM metadata: layers of a sequence
+# that fits in the budget are plain numpy arrays, and the oldest in-memory
+# acquisitions are moved to temporary zarr stores when a new one needs the room.
+DEFAULT_RAM_BUDGET_MB = 0.0
+# time (s) `_cleanup` gives the writer thread to write the frames left in the queue
+WRITER_EXIT_TIMEOUT = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriterStats:
+    """Counters of the MDA writer for the current (or last) sequence.
+
+    Attributes
+    ----------
+    codec : str | None
+        The codec used by the arrays (None for the zarr default).  With the "auto"
+        codec this is the codec that was picked.
+    frames : int
+        Number of frames written.
+    nbytes : int
+        Uncompressed size (bytes) of the frames written.
+    write_time : float
+        Time (s) spent writing frames to the arrays.
+    codec_ratio : float | None
+        Compression ratio measured on the first frames ("auto" codec only).
+    """
+
+    codec: str | None = None
+    frames: int = 0
+    nbytes: int = 0
+    write_time: float = 0.0
+    codec_ratio: float | None = None
+
+    @property
+    def mb_per_s(self) -> float:
+        """Achieved write throughput in (uncompressed) MB/s."""
+        return self.nbytes / 1e6 / self.write_time if self.write_time else 0.0
 
 
 def _get_file_name_from_metadata(sequence: MDASequence) -> str:
@@ -44,55 +153,173 @@ def _get_file_name_from_metadata(sequence: MDASequence) -> str:
 class _NapariMDAHandler:
     """Object mediating events between an in-progress MDA and the napari viewer.
 
-    It is typically created by the MainWindow, but could conceivably live alone.
+    It is typically created by the MainWindow, but can also live alone: without a
+    viewer, the frames are only written to the arrays (see `_headless`).
 
     Parameters
     ----------
     mmcore : CMMCorePlus
         The Micro-Manager core instance.
-    viewer : napari.viewer.Viewer
-        The napari viewer instance.
+    viewer : napari.viewer.Viewer | None
+        The napari viewer instance, or None to only write the frames (no layers).
     """
 
-    def __init__(self, mmcore: CMMCorePlus, viewer: napari.viewer.Viewer) -> None:
+    def __init__(
+        self, mmcore: CMMCorePlus, viewer: napari.viewer.Viewer | None
+    ) -> None:
         self._mmc = mmcore
         self.viewer = viewer
         self._mda_running: bool = False
 
-        # mapping of id -> (zarr.Array, temporary directory) for each layer created
-        self._tmp_arrays: dict[str, tuple[zarr.Array, tempfile.TemporaryDirectory]] = {}
-        self._deck: deque[tuple[np.ndarray, MDAEvent]] = deque()
+        # mapping of id -> (array, temporary directory) for each layer created.  The
+        # array is a zarr.Array, a np.memmap ("memmap" storage), a RaggedArray
+        # ("ragged_positions"), a GrowingArray (generator MDAs) or, for in-memory
+        # acquisitions, a np.ndarray.  The directory is None for arrays that are kept
+        # after exit (see `keep`), and for in-memory arrays.
+        self._tmp_arrays: dict[
+            str, tuple[zarr.Array | np.ndarray, tempfile.TemporaryDirectory | None]
+        ] = {}
+        # mapping of id -> path of the store (zarr or .npy) of each layer
+        self._store_paths: dict[str, Path] = {}
+        # mapping of id -> size (bytes) of the in-memory arrays, oldest first
+        self._ram_arrays: dict[str, int] = {}
+        # mapping of id -> (downsampled levels, their temporary directory) for the
+        # layers with a pyramid ("pyramid_levels" option)
+        self._pyramids: dict[
+            str, tuple[list[zarr.Array], tempfile.TemporaryDirectory]
+        ] = {}
+        # mapping of layer name -> (id, shape shown in the viewer) of the growing
+        # arrays of the current generator MDA (see `_GrowingRouter`)
+        self._growing: dict[str, tuple[str, tuple[int, ...]]] = {}
+        # frames of the current sequence placed at their stage position ("mosaic"
+        # option), the index of the frames it shows along the other axes, and the
+        # (version, (bounds, scale)) of it shown in its layer
+        self._mosaic: Mosaic | None = None
+        self._mosaic_index: dict[str, int] = {}
+        self._mosaic_name = ""
+        self._mosaic_shown: tuple[int, tuple | None] = (0, None)
+        # mapping of id -> per-frame statistics, computed by the writer
+        self._frame_stats: dict[str, FrameStats] = {}
+        # frames waiting to be written by the `_watch_mda` writer thread.
+        # A new queue is created for each sequence.
+        self._queue = FrameQueue(DEFAULT_QUEUE_SIZE, DEFAULT_QUEUE_OVERFLOW)
+        # held while taking frames from the queue and writing them (the writer thread
+        # of a sequence may still be busy when the next sequence starts)
+        self._write_lock = threading.Lock()
+        # True from the start of a sequence until its writer thread wrote the last
+        # frame and the layers were updated (see `_finish_sequence`), and set by the
+        # writer thread once it is done with its queue
+        self._writing = False
+        self._writer_done = threading.Event()
+        self._writer_done.set()
+        self._batch_size = DEFAULT_WRITE_BATCH_SIZE
+        self._batch_latency = DEFAULT_WRITE_BATCH_LATENCY
+        self._writer_stats = WriterStats()
+        # rate-limits the viewer updates of the writer (a new one for each sequence)
+        self._display = DisplayGovernor(0)
+        # finds the array, index and layer of each frame (built for each sequence)
+        self._router: _FrameRouter | _GrowingRouter | None = None
+        # with the "auto" codec: the arrays of the current sequence whose codec
+        # is still to be chosen, as {id: (layer name, chunks, shards)}
+        self._pending_codec: dict[str, tuple[str, tuple, tuple | None]] = {}
+        # layers of the current sequence whose contrast limits were set from the
+        # stats of their first shown frame
+        self._contrast_set: set[str] = set()
+        # per-frame timestamps of the current (or last) sequence, if traced ("trace"
+        # option), and where to save them when it ends
+        self._tracer: FrameTracer | None = None
+        self._trace_path: Path | None = None
+        # directory where the arrays of the current (or last) sequence are stored
+        self._storage_dir = Path(tempfile.gettempdir())
+        # the process writing the frames of the current sequence, with the "process"
+        # writer (it belongs to the writer thread, which closes it)
+        self._process_writer: ProcessWriter | None = None
 
         # Add all core connections to this list.  This makes it easy to disconnect
         # from core when this widget is closed.
-        self._connections: list[tuple[PSignalInstance, Callable]] = [
+        self._connections: list[tuple[PSignal | SignalInstance, Callable]] = [
             (self._mmc.mda.events.frameReady, self._on_mda_frame),
             (self._mmc.mda.events.sequenceStarted, self._on_mda_started),
             (self._mmc.mda.events.sequenceFinished, self._on_mda_finished),
         ]
-        for signal, slot in self._connections:
-            signal.connect(slot)
+        connect_all(self._connections)
 
     def _cleanup(self) -> None:
-        for signal, slot in self._connections:
-            with contextlib.suppress(TypeError, RuntimeError):
-                signal.disconnect(slot)
+        disconnect_all(self._connections)
+        # let the writer thread write the frames left in the queue and exit, before
+        # closing the arrays
+        self._queue.close()
+        if not self._writer_done.wait(WRITER_EXIT_TIMEOUT):
+            warn("The MDA writer thread did not exit: closing anyway.", stacklevel=2)
+        # normally closed by the writer thread already (closing again is a no-op)
+        if self._process_writer is not None:
+            self._process_writer.close()
+        self._queue.cleanup()
         # Clean up temporary files we opened.
         for z, v in self._tmp_arrays.values():
-            z.store.close()
+            close_array(z)
+            if v is not None:
+                with contextlib.suppress(NotADirectoryError):
+                    v.cleanup()
+        for levels, v in self._pyramids.values():
+            for level in levels:
+                level.store.close()
             with contextlib.suppress(NotADirectoryError):
                 v.cleanup()
 
-    @ensure_main_thread  # type: ignore [misc]
+    @ensure_main_thread
     def _on_mda_started(self, sequence: MDASequence) -> None:
         """Create temp folder and block gui when mda starts."""
         from pymmcore_plus.mda._runner import GeneratorMDASequence
 
-        # Generator sequences have unknown shape — we can't pre-create layers.
-        # Just mark the MDA as running so _image_snapped skips preview updates.
-        if isinstance(sequence, GeneratorMDASequence):
-            self._mda_running = True
-            self._deck = deque()
+        # validate the queue options before pausing, so a bad value can't leave the
+        # acquisition paused
+        meta = cast("dict", sequence.metadata.get(NMM_METADATA_KEY, {}))
+        queue = FrameQueue(
+            meta.get("queue_size", DEFAULT_QUEUE_SIZE),
+            meta.get("queue_overflow", DEFAULT_QUEUE_OVERFLOW),
+        )
+        self._batch_size, self._batch_latency = _get_batch_options(meta)
+        chunk_policy, tile_size = get_chunk_options(meta)
+        codec = get_codec_option(meta)
+        save_dir = _get_save_dir(meta)
+        self._storage_dir = save_dir or Path(tempfile.gettempdir())
+        storage = get_storage_option(meta)
+        ram_budget = _get_ram_budget(meta)
+        ragged = _get_ragged_option(meta, storage)
+        pyramid_levels = get_pyramid_levels(meta)
+        mosaic = get_mosaic_option(meta)
+        display = DisplayGovernor(get_display_rate(meta))
+        trace = get_trace_option(meta)
+        self._tracer = FrameTracer() if trace else None
+        self._trace_path = trace if isinstance(trace, Path) else None
+        writer, writer_buffer_mb = get_writer_options(meta)
+        generator = isinstance(sequence, GeneratorMDASequence)
+        if writer == "process" and (
+            pyramid_levels
+            or mosaic is not None
+            or ragged
+            or codec == "auto"
+            or generator
+        ):
+            raise ValueError(
+                "writer 'process' must be used without the pyramid_levels, mosaic "
+                "and ragged_positions options, without the 'auto' codec, and with "
+                "an MDASequence (not a generator of events)"
+            )
+        self._writer_stats = WriterStats(codec=codec)
+        self._pending_codec = {}
+        self._contrast_set = set()
+        self._mosaic = None
+        self._process_writer = None
+
+        # Generator sequences have unknown shape: the arrays grow as frames come in,
+        # and their layers are created when the first frame is written.
+        if generator:
+            self._router = _GrowingRouter(
+                sequence, AUTO_INITIAL_CODEC if codec == "auto" else codec
+            )
+            self._start_writer(queue, display)
             return
 
         # pause acquisition until zarr layer(s) are added
@@ -106,126 +333,771 @@ class _NapariMDAHandler:
         if self._mmc.getNumberOfComponents() >= 3:
             yx_shape = [*yx_shape, 3]
 
-        # now create a zarr array in a temporary directory for each layer
+        # get filename from MDASequence metadata
+        fname = _get_file_name_from_metadata(sequence)
+
+        dtype = f"u{self._mmc.getBytesPerPixel()}"
+        # the frame stats histograms cover the values the camera can produce
+        bit_depth = self._mmc.getImageBitDepth()
+        frame_bytes = int(np.prod(yx_shape)) * self._mmc.getBytesPerPixel()
+        nbytes = sum(int(np.prod(shape)) for _, shape, _ in layers_to_create)
+        nbytes *= frame_bytes
+        # store each position with its own shape ("ragged_positions" option)
+        p_axis = axis_labels.index("p") if "p" in axis_labels else -1
+        ragged = ragged and p_axis >= 0 and _has_sub_sequences(sequence)
+        in_ram = (
+            save_dir is None
+            and 0 < nbytes <= ram_budget
+            and not ragged
+            # the writer process only writes to files
+            and writer == "thread"
+        )
+        if in_ram:
+            self._free_ram(ram_budget - nbytes)
+
+        # one counter for the stores of all the layers (channels) of the sequence
+        if save_dir is not None:
+            acq_stem = ensure_unique(save_dir / fname, STORE_EXTENSIONS[storage]).stem
+
+        # now create an array for each layer (zarr, or memmap with the "memmap"
+        # storage), in a temporary directory unless a "save_dir" was given (or a
+        # numpy array if it fits in the RAM budget)
         for id_, shape, kwargs in layers_to_create:
-            tmp = tempfile.TemporaryDirectory()
-            dtype = f"u{self._mmc.getBytesPerPixel()}"
-            # create the zarr array and add it to the viewer
-            z = zarr.open(
-                str(tmp.name),
-                shape=shape + yx_shape,
-                dtype=dtype,
-                chunks=tuple([1] * len(shape) + yx_shape),  # VERY IMPORTANT FOR SPEED!
+            layer_name = f"{fname}_{id_}"
+            tmp: tempfile.TemporaryDirectory | None = None
+            arr: zarr.Array | np.ndarray
+            if in_ram:
+                arr = np.zeros(shape + yx_shape, dtype)
+                self._ram_arrays[id_] = arr.nbytes
+            else:
+                if save_dir is None:
+                    tmp = tempfile.TemporaryDirectory()
+                    # in a sub-directory, so that `keep` can move it out
+                    path = Path(tmp.name, f"data{STORE_EXTENSIONS[storage]}")
+                else:
+                    stem = acq_stem
+                    if "ch_id" in kwargs:
+                        stem = f"{acq_stem}_{kwargs['ch_id']}"
+                    path = save_dir / f"{stem}{STORE_EXTENSIONS[storage]}"
+                if storage == "memmap":
+                    arr = create_memmap(path, shape + yx_shape, dtype)
+                elif ragged:
+                    pos_axes = [ax for ax in axis_labels[:-2] if ax != "p"]
+                    pos_shapes = _position_shapes(sequence, pos_axes)
+                    arr = RaggedArray.create(
+                        path,
+                        p_axis,
+                        [pos_shape + yx_shape for pos_shape in pos_shapes],
+                        dtype,
+                        [
+                            chunk_layout(
+                                chunk_policy, pos_axes, pos_shape, yx_shape, tile_size
+                            )[0]
+                            for pos_shape in pos_shapes
+                        ],
+                        AUTO_INITIAL_CODEC if codec == "auto" else codec,
+                    )
+                    if codec == "auto":
+                        self._pending_codec[id_] = (layer_name, (), None)
+                else:
+                    # The chunk layout is VERY IMPORTANT FOR SPEED! (see `chunk_layout`)
+                    chunks, shards = chunk_layout(
+                        chunk_policy, axis_labels[:-2], shape, yx_shape, tile_size
+                    )
+                    arr = create_array(
+                        str(path),
+                        shape + yx_shape,
+                        dtype,
+                        chunks,
+                        shards,
+                        AUTO_INITIAL_CODEC if codec == "auto" else codec,
+                    )
+                    if codec == "auto":
+                        self._pending_codec[id_] = (layer_name, chunks, shards)
+                self._store_paths[id_] = path
+
+            # store the array and temporary directory for later cleanup
+            self._tmp_arrays[id_] = (arr, tmp)
+            if pyramid_levels:
+                self._pyramids[id_] = _create_pyramid(arr, pyramid_levels)
+            self._frame_stats[id_] = kwargs["frame_stats"] = FrameStats(
+                shape, dtype, bit_depth
             )
-            # get filename from MDASequence metadata
-            fname = _get_file_name_from_metadata(sequence)
-            self._create_empty_image_layer(z, f"{fname}_{id_}", sequence, kwargs)
+            if self.viewer is not None:
+                self._create_empty_image_layer(
+                    self._layer_data(id_), layer_name, sequence, kwargs
+                )
+
+        if self.viewer is not None:
+            # set axis_labels after adding the images to ensure that the dims exist
+            self.viewer.dims.axis_labels = axis_labels
+
+        # the mosaic is only built to be shown
+        if mosaic is not None and self.viewer is not None:
+            pix_size = self._mmc.getPixelSizeUm() or 1.0
+            rgb = len(yx_shape) == 3
+            self._mosaic = Mosaic(pix_size, dtype, rgb, MOSAIC_LEVELS)
+            self._mosaic_index = mosaic
+            self._mosaic_name = f"{fname}_{sequence.uid}_mosaic"
+            self._mosaic_shown = (0, None)
+
+        if writer == "process":
+            self._process_writer = ProcessWriter(yx_shape, dtype, writer_buffer_mb)
+            for id_, shape, _ in layers_to_create:
+                self._process_writer.open(id_, self._store_paths[id_], shape, bit_depth)
+
+        self._router = _FrameRouter(sequence)
+        self._start_writer(queue, display)
 
-            # store the zarr array and temporary directory for later cleanup
-            self._tmp_arrays[id_] = (z, tmp)
+        # Set the viewer slider on the first layer frame
+        self._reset_viewer_dims()
 
-        # set axis_labels after adding the images to ensure that the dims exist
-        self.viewer.dims.axis_labels = axis_labels
+        # resume acquisition after zarr layer(s) is(are) added
+        self._mmc.mda.toggle_pause()
 
+    def _start_writer(self, queue: FrameQueue, display: DisplayGovernor) -> None:
+        """Start the `_watch_mda` writer thread for a new sequence."""
         # init index will always be less than any event index
         self._largest_idx: tuple[int, ...] = (-1,)
-
-        self._deck = deque()
+        self._queue = queue
+        self._display = display
         self._mda_running = True
+        self._writing = True
+        self._writer_done = threading.Event()
+        args: tuple = (self._watch_mda, queue, display)
+        if self._process_writer is not None:
+            args = (self._watch_process_writer, queue, display, self._process_writer)
         self._io_t = create_worker(
-            self._watch_mda,
+            self._write_sequence,
+            self._writer_done,
+            *args,
             _start_thread=True,
-            _connect={"yielded": self._update_viewer_dims},
+            _connect={
+                "yielded": self._update_viewer_dims,
+                "errored": self._on_writer_error,
+                "warned": self._on_writer_warning,
+                "finished": partial(self._on_writer_finished, queue),
+            },
         )
 
-        # Set the viewer slider on the first layer frame
-        self._reset_viewer_dims()
-
-        # resume acquisition after zarr layer(s) is(are) added
-        self._mmc.mda.toggle_pause()
+    def _write_sequence(
+        self,
+        done: threading.Event,
+        watch: Callable[..., Generator[DisplayUpdate, None, None]],
+        queue: FrameQueue,
+        display: DisplayGovernor,
+        *args: Any,
+    ) -> Generator[DisplayUpdate, None, None]:
+        """Write the frames of a sequence with `watch`, in the writer thread.
+
+        If `watch` fails, the error is reported as a warning, and the frames left in
+        the queue are written once the acquisition is over.  The arrays are then
+        finished (growing arrays are trimmed), and `done` is set.
+        """
+        try:
+            try:
+                yield from watch(queue, display, *args)
+            except Exception as e:
+                warn(
+                    f"Writing MDA frames failed: {e!r}. Frames still in the queue "
+                    "will be written when the acquisition finishes.",
+                    stacklevel=2,
+                )
+                queue.wait_closed()
+                yield from self._watch_mda(queue, display)
+            with self._write_lock:
+                for id_, _ in list(self._growing.values()):
+                    cast("GrowingArray", self._tmp_arrays[id_][0]).trim()
+        finally:
+            # delete the frames that could not be written
+            queue.cleanup()
+            done.set()
 
     def _watch_mda(
-        self,
-    ) -> Generator[tuple[str | None, tuple[int, ...] | None], None, None]:
-        """Watch the MDA for new frames and process them as they come in."""
-        while self._mda_running:
-            if self._deck:
-                layer_name, im_idx = self._process_frame(*self._deck.pop())
-                yield layer_name, im_idx
-            else:
-                time.sleep(0.1)
+        self, queue: FrameQueue, display: DisplayGovernor
+    ) -> Generator[DisplayUpdate, None, None]:
+        """Write frames from `queue`, in acquisition order, as they come in.
+
+        Runs in a worker thread until the queue is closed and empty.  Yields the
+        viewer updates, at the rate allowed by `display`.
+        """
+        while True:
+            # wake up for new frames, or when the pending viewer update is due
+            if not queue.wait(display.due_in()):
+                if queue.closed:
+                    break
+                yield from display.pop_due()
+                continue
+            if self._pending_codec:
+                # collect enough frames to measure the codecs
+                queue.wait(AUTO_CODEC_TIMEOUT, AUTO_CODEC_FRAMES)
+            elif self._batch_latency:
+                # give the acquisition a chance to fill up the batch
+                queue.wait(self._batch_latency, self._batch_size)
+            with self._write_lock:
+                frames = queue.get_many(self._batch_size)
+                results = self._process_frames(frames)
+            for update in results:
+                display.submit(update)
+            yield from display.pop_due()
+        yield from display.flush()
+
+    def _watch_process_writer(
+        self, queue: FrameQueue, display: DisplayGovernor, writer: ProcessWriter
+    ) -> Generator[DisplayUpdate, None, None]:
+        """Like `_watch_mda`, but have the frames written by `writer`'s process.
+
+        If the process fails, the frames it didn't write are written here, and so
+        are the next ones.  The process is stopped when the queue is done.
+        """
+        try:
+            yield from self._hand_over_frames(queue, display, writer)
+        except ProcessWriterError as e:
+            warn(f"{e}: writing the frames in the GUI process.", stacklevel=2)
+            writer.close()
+            for update in self._write_unfinished(e):
+                display.submit(update)
+            yield from self._watch_mda(queue, display)
+        finally:
+            writer.close()
+
+    def _hand_over_frames(
+        self, queue: FrameQueue, display: DisplayGovernor, writer: ProcessWriter
+    ) -> Generator[DisplayUpdate, None, None]:
+        """Copy the frames from `queue` into the ring buffer of `writer`'s process.
+
+        The viewer updates follow the writes that the process reports.
+        """
+        while True:
+            # also wake up to collect the writes of the process
+            timeout = display.due_in()
+            if writer.pending:
+                timeout = min(
+                    PROCESS_WRITER_POLL if timeout is None else timeout,
+                    PROCESS_WRITER_POLL,
+                )
+            wait = 0.0
+            if queue.wait(timeout):
+                if self._batch_latency:
+                    # give the acquisition a chance to fill up the batch
+                    queue.wait(self._batch_latency, self._batch_size)
+                with self._write_lock:
+                    if frames := queue.get_many(self._batch_size):
+                        self._submit_frames(writer, frames)
+            elif queue.closed:
+                if not writer.pending:
+                    break
+                # all that's left is waiting for the last writes
+                wait = PROCESS_WRITER_POLL
+            for update in self._on_written(writer.results(wait)):
+                display.submit(update)
+            yield from display.pop_due()
+        yield from display.flush()
+
+    def _write_unfinished(self, error: ProcessWriterError) -> list[DisplayUpdate]:
+        """Write the frames that the failed writer process didn't write."""
+        updates = self._on_written(error.done)
+        with self._write_lock:
+            for tag, data in error.unfinished:
+                _id, index = tag[0], _slab_index(tag[2])
+                t0 = time.perf_counter()
+                self._write_slab(_id, index, data)
+                elapsed = time.perf_counter() - t0
+                stats = self._frame_stats[_id].values(index)
+                updates += self._on_written([WriteResult(tag, elapsed, stats)])
+        return updates
+
+    def _submit_frames(
+        self, writer: ProcessWriter, frames: list[tuple[np.ndarray, MDAEvent]]
+    ) -> None:
+        """Hand `frames` to the writer process, in slabs as in `_process_frames`."""
+        if self._tracer is not None:
+            self._tracer.dequeued(len(frames))
+        route = self._router.route if self._router is not None else _id_idx_layer
+        slabs = _group_slabs(frames, route)
+        pieces = []
+        for (_id, _), slab in groupby(slabs, key=lambda x: x[0]):
+            _, idxs, layer_names, images = zip(*slab)
+            # a slab can't take more than the whole ring buffer
+            for k in range(0, len(images), writer.n_slots):
+                part = idxs[k : k + writer.n_slots]
+                nbytes = sum(img.nbytes for img in images[k : k + writer.n_slots])
+                tag = (_id, layer_names[0], part, nbytes)
+                pieces.append((tag, images[k : k + writer.n_slots]))
+        for n, (tag, images) in enumerate(pieces):
+            try:
+                writer.submit(tag[0], _slab_index(tag[2]), images, tag)
+            except ProcessWriterError as e:
+                # the next ones weren't handed over either
+                for later_tag, later in pieces[n + 1 :]:
+                    data = later[0] if len(later) == 1 else np.stack(later)
+                    e.unfinished.append((later_tag, data))
+                raise
+
+    def _on_written(self, results: list[WriteResult]) -> list[DisplayUpdate]:
+        """Record the writes done by the writer process; return the viewer updates."""
+        updates = []
+        labels: list[tuple[str | None, tuple[int, ...]]] = []
+        stats = self._writer_stats
+        for result in results:
+            _id, layer_name, idxs, nbytes = result.tag
+            labels.extend((layer_name, idx) for idx in idxs)
+            if _id in self._frame_stats:
+                self._frame_stats[_id].set_values(_slab_index(idxs), result.stats)
+            updates.append(self._viewer_update(layer_name, idxs))
+            stats.write_time += result.elapsed
+            stats.frames += len(idxs)
+            stats.nbytes += nbytes
+        if self._tracer is not None and labels:
+            self._tracer.written(labels)
+        return updates
+
+    def _on_writer_error(self, exc: Exception) -> None:
+        """Called (in the main thread) if the writer thread raised an exception.
+
+        That is, if writing the frames left in the queue at the end of the
+        acquisition failed as well (see `_write_sequence`).
+        """
+        warn(
+            f"Writing MDA frames failed: {exc!r}. The frames still in the queue "
+            "are lost.",
+            stacklevel=2,
+        )
+
+    def _on_writer_warning(self, args: tuple) -> None:
+        """Re-issue (in the main thread) a warning of the writer thread."""
+        message, category = args[:2]
+        warn(message, category, stacklevel=2)
+
+    def _on_writer_finished(self, queue: FrameQueue) -> None:
+        """Called (in the main thread) when the writer thread of `queue` exits."""
+        # the writer of a previous sequence: the layers are those of the current one
+        if queue is self._queue:
+            self._finish_sequence()
+
+    def _finish_sequence(self) -> None:
+        """Show the last frames of the sequence, once they are all written."""
+        if self._mosaic is not None:
+            self._sync_mosaic()
+            self._mosaic = None
+        for layer_name in self._growing:
+            self._sync_growing_layer(layer_name)
+            if self.viewer is not None:
+                self.viewer.layers[layer_name].visible = True
+        self._growing = {}
+        # the last viewer updates were delivered: the trace is complete
+        self._save_trace()
+        self._writing = False
+
+    def _save_trace(self) -> None:
+        if self._tracer is not None and self._trace_path is not None:
+            self._tracer.save(self._trace_path)
 
     def _on_mda_frame(self, image: np.ndarray, event: MDAEvent) -> None:
         """Called on the `frameReady` event from the core."""
-        # Generator-based events have no sequence; show them in the preview layer.
-        if event.sequence is None:
+        # Events without a sequence that aren't part of a generator MDA (which are
+        # written to growing arrays) are only shown in the preview layer.
+        if event.sequence is None and not isinstance(self._router, _GrowingRouter):
             self._update_preview(image)
             return
-        self._deck.append((image, event))
+        if self._tracer is not None:
+            self._tracer.received()
+        self._queue.put(image, event)
+
+    def queue_stats(self) -> FrameQueueStats:
+        """Return depth and wait-time counters of the frame queue."""
+        return self._queue.stats()
 
-    @ensure_main_thread  # type: ignore [misc]
+    def keep(self, layer: str | Image, dest: str | Path) -> Path:
+        """Keep the zarr store of an acquired layer at `dest` instead of deleting it.
+
+        The store is moved (renamed), not copied, so this is instant whatever the
+        size of the data, as long as `dest` is on the same filesystem as the
+        temporary directory (otherwise it falls back to a copy, with a warning).
+        In-memory acquisitions are written to a new zarr store at `dest`.
+        The layer keeps showing the data, now read from `dest`.
+
+        Parameters
+        ----------
+        layer : str | Image
+            The layer (or layer name) of a finished acquisition.
+        dest : str | Path
+            Where to move the store.  Must not exist yet.
+
+        Returns
+        -------
+        Path
+            The new location of the store.
+        """
+        if self._mda_running or self._writing:
+            raise RuntimeError(
+                "Cannot keep a store while an MDA is running or being written."
+            )
+        if isinstance(layer, str):
+            if self.viewer is None:
+                raise ValueError("layer must be an Image layer without a viewer.")
+            layer = self.viewer.layers[layer]
+        id_ = _layer_id(layer)
+        if id_ not in self._tmp_arrays:
+            raise ValueError(f"Layer {layer.name!r} is not an MDA acquisition.")
+        dest = Path(dest).expanduser()
+        if dest.exists():
+            raise FileExistsError(f"{dest} already exists.")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        z, tmp = self._tmp_arrays[id_]
+        if id_ in self._ram_arrays:
+            z = _write_store(cast("np.ndarray", z), dest)
+            self._tmp_arrays[id_] = (z, None)
+            layer.data = self._layer_data(id_)
+            self._store_paths[id_] = dest
+            del self._ram_arrays[id_]
+            return dest
+
+        src = self._store_paths[id_]
+        if src.suffix == ".npy" and dest.suffix != ".npy":
+            raise ValueError(f"{dest} must have a '.npy' extension.")
+        close_array(z)
+        try:
+            # atomic, and free, on the same filesystem
+            os.replace(src, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                # e.g. no permission: the store stays where it was
+                self._tmp_arrays[id_] = (_reopen_array(z, src), tmp)
+                layer.data = self._layer_data(id_)
+                raise
+            warn(
+                f"Cannot rename {src} to {dest} (different filesystem): copying.",
+                stacklevel=2,
+            )
+            shutil.move(src, dest)
+
+        self._tmp_arrays[id_] = (_reopen_array(z, dest), None)
+        layer.data = self._layer_data(id_)
+        self._store_paths[id_] = dest
+        if tmp is not None:
+            tmp.cleanup()
+        return dest
+
+    def _free_ram(self, available: int) -> None:
+        """Move the oldest in-memory acquisitions to disk, to use <= `available` B."""
+        while self._ram_arrays and sum(self._ram_arrays.values()) > available:
+            id_ = next(iter(self._ram_arrays))
+            tmp = tempfile.TemporaryDirectory()
+            path = Path(tmp.name, "data.zarr")
+            # the writer of the previous sequence may still be writing to it: its
+            # next frames go to the zarr store
+            with self._write_lock:
+                arr = self._tmp_arrays[id_][0]
+                z = _write_store(cast("np.ndarray", arr), path)
+                self._tmp_arrays[id_] = (z, tmp)
+            self._store_paths[id_] = path
+            del self._ram_arrays[id_]
+            if self.viewer is None:
+                continue
+            for layer in self.viewer.layers:
+                if layer.metadata.get(NMM_METADATA_KEY) and _layer_id(layer) == id_:
+                    layer.data = self._layer_data(id_)
+
+    def _layer_data(self, id_: str) -> zarr.Array | np.ndarray | list:
+        """Return the data of the layer of `id_`: the array, or its pyramid."""
+        arr = self._tmp_arrays[id_][0]
+        if id_ in self._pyramids:
+            return [arr, *self._pyramids[id_][0]]
+        return arr
+
+    def display_stats(self) -> DisplayStats:
+        """Return the counters of displayed vs acquired frames."""
+        stats = self._display.stats()
+        stats.acquired = self._queue.stats().put_count
+        return stats
+
+    def writer_stats(self) -> WriterStats:
+        """Return the writer counters (codec, frames written, MB/s)."""
+        return self._writer_stats
+
+    def storage_dir(self) -> Path:
+        """Return the directory where the arrays of the current sequence are stored."""
+        return self._storage_dir
+
+    def trace(self) -> FrameTracer | None:
+        """Return the per-frame timestamps of the last sequence, if it was traced."""
+        return self._tracer
+
+    def _choose_codec(self, frames: list[tuple[np.ndarray, MDAEvent]]) -> None:
+        """Pick the codec for the "auto" mode by measuring it on `frames`.
+
+        Must be called with the write lock held, before any frame is written.
+        """
+        images = [img for img, _ in frames[:AUTO_CODEC_FRAMES]]
+        data_rate = self._queue.stats().put_rate * images[0].nbytes / 1e6
+        measurements = measure_codecs(images)
+        codec = choose_codec(measurements, data_rate * AUTO_CODEC_HEADROOM)
+        ratio, mbps = measurements[codec]
+        logger.info(
+            "auto codec: chose %r (ratio %.2f, %.0f MB/s) for %.1f MB/s of data",
+            codec,
+            ratio,
+            mbps,
+            data_rate,
+        )
+        self._writer_stats.codec = codec
+        self._writer_stats.codec_ratio = ratio
+
+        # Nothing was written yet, so the arrays can be re-created with the chosen
+        # codec.  The layers keep reading through the old array objects until their
+        # data is replaced: they can decode the new chunks (see `AUTO_CODECS`).
+        for id_, (layer_name, chunks, shards) in self._pending_codec.items():
+            old, tmp = self._tmp_arrays[id_]
+            path = str(self._store_paths[id_])
+            if isinstance(old, RaggedArray):
+                new = old.recreate(codec)
+            else:
+                new = create_array(
+                    path, old.shape, str(old.dtype), chunks, shards, codec
+                )
+            self._tmp_arrays[id_] = (new, tmp)
+            self._set_layer_data(layer_name, self._layer_data(id_))
+        self._pending_codec = {}
+
+    @ensure_main_thread
+    def _set_layer_data(
+        self, layer_name: str, data: zarr.Array | np.ndarray | list
+    ) -> None:
+        if self.viewer is None:
+            return
+        with contextlib.suppress(KeyError):
+            self.viewer.layers[layer_name].data = data
+
+    @ensure_main_thread
     def _update_preview(self, data: np.ndarray) -> None:
         """Show a single frame in the preview layer."""
+        if self.viewer is None:
+            return
         try:
             self.viewer.layers["preview"].data = data
         except KeyError:
             self.viewer.add_image(data, name="preview")
 
-    def _process_frame(
-        self, image: np.ndarray, event: MDAEvent
-    ) -> tuple[str | None, tuple[int, ...] | None]:
-        # get info about the layer we need to update
-        _id, im_idx, layer_name = _id_idx_layer(event)
-
-        # update the zarr array backing the layer
-        self._tmp_arrays[_id][0][im_idx] = image
+    def _process_frames(
+        self, frames: list[tuple[np.ndarray, MDAEvent]]
+    ) -> list[tuple[str | None, tuple[int, ...] | None]]:
+        """Write `frames` (in order) to their arrays.
 
+        Runs of frames that go to consecutive positions along the last index axis of
+        the same array (e.g. the planes of a Z stack) are written as one slab.
+        Returns one `(layer_name, index)` viewer update per slab.
+        """
+        if self._tracer is not None:
+            self._tracer.dequeued(len(frames))
+        if self._pending_codec:
+            self._choose_codec(frames)
+
+        results = []
+        labels: list[tuple[str | None, tuple[int, ...]]] = []
+        t0 = time.perf_counter()
+        route = self._router.route if self._router is not None else _id_idx_layer
+        slabs = _group_slabs(frames, route)
+        for (_id, _), slab in groupby(slabs, key=lambda x: x[0]):
+            _, idxs, layer_names, images = zip(*slab)
+            layer_name = layer_names[0]
+            labels.extend(zip(layer_names, idxs))
+            if _id not in self._tmp_arrays:
+                self._create_growing_array(_id, layer_name, images[0])
+            data = images[0] if len(images) == 1 else np.stack(images)
+            self._write_slab(_id, _slab_index(idxs), data)
+            results.append(self._viewer_update(layer_name, idxs))
+
+        if self._mosaic is not None:
+            for image, event in frames:
+                if (
+                    event.x_pos is not None
+                    and event.y_pos is not None
+                    and in_mosaic(event.index, self._mosaic_index)
+                ):
+                    self._mosaic.add(image, event.x_pos, event.y_pos)
+
+        if self._tracer is not None:
+            self._tracer.written(labels)
+        stats = self._writer_stats
+        stats.write_time += time.perf_counter() - t0
+        stats.frames += len(frames)
+        stats.nbytes += sum(img.nbytes for img, _ in frames)
+        return results
+
+    def _write_slab(self, _id: str, index: tuple, data: np.ndarray) -> None:
+        """Write a frame, or a stack of frames, at `index` of the array `_id`."""
+        arr = self._tmp_arrays[_id][0]
+        arr[index] = data
+        if _id in self._frame_stats:
+            self._frame_stats[_id].update(index, data)
+        if _id in self._pyramids:
+            # each level is downsampled from the previous one
+            rgb = arr.shape[-1] == 3
+            for level in self._pyramids[_id][0]:
+                data = downsample(data, rgb)
+                level[index] = data
+
+    def _viewer_update(
+        self, layer_name: str, idxs: Sequence[tuple[int, ...]]
+    ) -> DisplayUpdate:
+        """Return the viewer update for frames written at `idxs` of `layer_name`."""
         # move the viewer step to the most recently added image
+        im_idx = max(idxs)
         if im_idx > self._largest_idx:
             self._largest_idx = im_idx
-            return layer_name, im_idx
+            return (layer_name, im_idx)
+        return (layer_name, None)
 
-        return layer_name, None
+    def _process_frame(
+        self, image: np.ndarray, event: MDAEvent
+    ) -> tuple[str | None, tuple[int, ...] | None]:
+        return self._process_frames([(image, event)])[0]
 
-    @ensure_main_thread  # type: ignore [misc]
+    def _create_growing_array(
+        self, id_: str, layer_name: str, image: np.ndarray
+    ) -> None:
+        """Create the growing array of a generator MDA, for frames like `image`."""
+        router = cast("_GrowingRouter", self._router)
+        n_index = len(router.axes)
+        tmp = tempfile.TemporaryDirectory()
+        path = Path(tmp.name, "data.zarr")
+        shape = (1,) * n_index + image.shape
+        array = create_array(
+            str(path), shape, str(image.dtype), _frame_chunks(shape), None, router.codec
+        )
+        self._tmp_arrays[id_] = (GrowingArray(array, n_index), tmp)
+        self._store_paths[id_] = path
+        self._growing[layer_name] = (id_, ())
+
+    def _sync_growing_layer(self, layer_name: str) -> None:
+        """Create the layer of a growing array, or update it if the array grew."""
+        id_, shown_shape = self._growing[layer_name]
+        arr = self._tmp_arrays[id_][0]
+        if shown_shape == arr.shape or self.viewer is None:
+            return
+        self._growing[layer_name] = (id_, arr.shape)
+        if layer_name in self.viewer.layers:
+            # same array, new shape: the dims follow
+            self.viewer.layers[layer_name].data = arr
+            return
+        router = cast("_GrowingRouter", self._router)
+        self._create_empty_image_layer(arr, layer_name, router.sequence, {})
+        self.viewer.dims.axis_labels = [*router.axes, "y", "x"]
+
+    def _sync_mosaic(self) -> None:
+        """Create the mosaic layer, or show the frames added to the mosaic."""
+        mosaic = cast("Mosaic", self._mosaic)
+        if self.viewer is None:
+            return
+        # the mosaic is downsampled (larger scale) when it gets too big
+        version, extent = mosaic.version, (mosaic.bounds, mosaic.scale)
+        if version == self._mosaic_shown[0]:
+            return
+        shown_extent = self._mosaic_shown[1]
+        self._mosaic_shown = (version, extent)
+        scale = (mosaic.scale, mosaic.scale)
+        try:
+            layer = self.viewer.layers[self._mosaic_name]
+        except KeyError:
+            self.viewer.add_image(
+                mosaic.views(),
+                name=self._mosaic_name,
+                multiscale=True,
+                rgb=mosaic.rgb,
+                scale=scale,
+                translate=mosaic.translate(),
+            )
+            return
+        if extent != shown_extent:
+            layer.data = mosaic.views()
+            layer.scale = scale
+            layer.translate = mosaic.translate()
+        else:
+            layer.refresh()
+
+    @ensure_main_thread
     def _update_viewer_dims(
         self, args: tuple[str | None, tuple[int, ...] | None]
     ) -> None:
         """Update the viewer dims to match the current image."""
+        if self.viewer is None:
+            return
         layer_name, im_idx = args
 
+        if self._mosaic is not None:
+            self._sync_mosaic()
+        if layer_name in self._growing:
+            self._sync_growing_layer(layer_name)
+        # updates can arrive after the layer was deleted (or the viewer cleared)
+        if layer_name not in self.viewer.layers:
+            return
         layer: Image = self.viewer.layers[layer_name]
         if not layer.visible:
             layer.visible = True
 
         if im_idx is None:
             return
+        if layer_name not in self._contrast_set:
+            self._init_contrast_limits(layer, im_idx)
 
         cs = list(self.viewer.dims.current_step)
         for a, v in enumerate(im_idx):
             cs[a] = v
         self.viewer.dims.current_step = cs
+        if self._tracer is not None:
+            self._tracer.displayed(layer_name, im_idx)
+
+    def _init_contrast_limits(self, layer: Image, index: tuple[int, ...]) -> None:
+        """Set the contrast limits of `layer` from the stats of its frame at `index`.
 
-    @ensure_main_thread  # type: ignore [misc]
+        Done once per layer, with its first shown frame: the limits span the outer
+        `FRAME_STATS_PERCENTILES` of the frame (napari would otherwise pick them from
+        the still empty array), and the range covers the camera bit depth.  Later
+        frames leave the limits to the user.
+        """
+        self._contrast_set.add(layer.name)
+        stats = layer.metadata.get(NMM_METADATA_KEY, {}).get("frame_stats")
+        if stats is None or len(index) != len(stats.index_shape):
+            return
+        if (percentiles := stats.percentiles(index)) is None:
+            return
+        low, high = percentiles[0], percentiles[-1]
+        if high <= low:
+            low, high = stats.minmax(index)
+        if high > low:
+            layer.contrast_limits_range = (0, 2**stats.bit_depth - 1)
+            layer.contrast_limits = (low, high)
+
+    @ensure_main_thread
     def _reset_viewer_dims(self) -> None:
         """Reset the viewer dims to the first image."""
+        if self.viewer is None:
+            return
         self.viewer.dims.current_step = [0] * len(self.viewer.dims.current_step)
 
     def _on_mda_finished(self, sequence: MDASequence) -> None:
         self._mda_running = False
         self._reset_viewer_dims()
-        while self._deck:
-            self._process_frame(*self._deck.pop())
+        # The writer thread writes the frames left in the queue, then exits (see
+        # `_finish_sequence`): the main thread never waits on it.
+        self._queue.close()
 
     def _create_empty_image_layer(
-        self, arr: zarr.Array, name: str, sequence: MDASequence, layer_meta: LayerMeta
+        self,
+        arr: zarr.Array | np.ndarray | list,
+        name: str,
+        sequence: MDASequence,
+        layer_meta: LayerMeta,
     ) -> Image:
         """Create new napari layer for zarr array about to be acquired.
 
         Parameters
         ----------
-        arr : zarr.Array
-            The array to create a layer for.
+        arr : zarr.Array | np.ndarray | list
+            The array to create a layer for, or the list of its pyramid levels
+            (full resolution first) for a multiscale layer.
         name : str
             The name of the layer.
         sequence : MDASequence
@@ -235,8 +1107,10 @@ class _NapariMDAHandler:
         """
         # we won't have reached this point if meta is None
         meta = sequence.metadata.get(NMM_METADATA_KEY, {})
-        is_rgb = arr.shape[-1] == 3
-        scale = [1.0] * (arr.ndim - (1 if is_rgb else 0))
+        multiscale = isinstance(arr, list)
+        full_res = arr[0] if isinstance(arr, list) else arr
+        is_rgb = full_res.shape[-1] == 3
+        scale = [1.0] * (full_res.ndim - (1 if is_rgb else 0))
 
         # add Z to layer scale
         if (pix_size := self._mmc.getPixelSizeUm()) != 0:
@@ -249,9 +1123,12 @@ class _NapariMDAHandler:
         layer_meta["useq_sequence"] = sequence
         layer_meta["uid"] = sequence.uid
 
-        return self.viewer.add_image(
+        # only called with a viewer
+        viewer = cast("napari.viewer.Viewer", self.viewer)
+        return viewer.add_image(
             arr,
             name=name,
+            multiscale=multiscale,
             blending="opaque",
             visible=False,
             scale=scale,
@@ -334,6 +1211,141 @@ def _determine_sequence_layers(
     return axis_labels, _layer_info
 
 
+def _get_save_dir(meta: dict) -> Path | None:
+    """Return the "save_dir" option from `meta`, creating the directory."""
+    if (save_dir := meta.get("save_dir")) is None:
+        return None
+    path = Path(save_dir).expanduser()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _frame_chunks(shape: Sequence[int]) -> tuple[int, ...]:
+    """Return a chunk shape of one frame for an array of `shape` (YX or YXC last)."""
+    n_yx = 3 if shape[-1] == 3 else 2
+    return (1,) * (len(shape) - n_yx) + tuple(shape[-n_yx:])
+
+
+def _create_pyramid(
+    arr: zarr.Array | np.ndarray, levels: int
+) -> tuple[list[zarr.Array], tempfile.TemporaryDirectory]:
+    """Create the empty downsampled levels of `arr`, in a temporary directory."""
+    tmp = tempfile.TemporaryDirectory()
+    rgb = arr.shape[-1] == 3
+    arrays = [
+        create_array(
+            str(Path(tmp.name, f"level_{k}.zarr")),
+            shape,
+            str(arr.dtype),
+            _frame_chunks(shape),
+        )
+        for k, shape in enumerate(pyramid_shapes(arr.shape, levels, rgb), start=1)
+    ]
+    return arrays, tmp
+
+
+def _get_ram_budget(meta: dict) -> int:
+    """Return the "ram_budget_mb" option from `meta`, in bytes."""
+    budget = meta.get("ram_budget_mb", DEFAULT_RAM_BUDGET_MB)
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget < 0:
+        raise ValueError(f"ram_budget_mb must be a non-negative number, not {budget!r}")
+    return int(budget * 1e6)
+
+
+def _get_ragged_option(meta: dict, storage: str) -> bool:
+    """Return the validated "ragged_positions" option from `meta`."""
+    ragged = meta.get("ragged_positions", False)
+    if not isinstance(ragged, bool):
+        raise ValueError(f"ragged_positions must be True or False, not {ragged!r}")
+    if ragged and storage != "zarr":
+        raise ValueError("ragged_positions must be used with the 'zarr' storage")
+    return ragged
+
+
+def _position_shapes(sequence: MDASequence, axes: Sequence[str]) -> list[list[int]]:
+    """Return the shape along `axes` of the frames of each stage position.
+
+    The plans of a position's sub-sequence replace those of the main sequence.
+    """
+    shapes = []
+    for pos in sequence.stage_positions:
+        sub_sizes = pos.sequence.sizes if pos.sequence is not None else {}
+        shapes.append([sub_sizes.get(ax) or sequence.sizes.get(ax) or 1 for ax in axes])
+    return shapes
+
+
+def _write_store(arr: np.ndarray, path: Path) -> zarr.Array:
+    """Write an in-memory acquisition to a new zarr store (one chunk per frame)."""
+    z = create_array(str(path), arr.shape, str(arr.dtype), _frame_chunks(arr.shape))
+    z[:] = arr
+    return z
+
+
+def _reopen_array(arr: zarr.Array | np.ndarray, path: Path) -> zarr.Array | np.ndarray:
+    """Open the store of the closed array `arr`, now at `path`."""
+    if isinstance(arr, RaggedArray):
+        return arr.reopen(path)
+    return open_array(path)
+
+
+def _layer_id(layer: Image) -> str:
+    """Return the id (key of `_tmp_arrays`) of an MDA layer."""
+    meta = layer.metadata.get(NMM_METADATA_KEY, {})
+    uid = str(meta.get("uid"))
+    return f"{meta['ch_id']}_{uid}" if "ch_id" in meta else uid
+
+
+def _get_batch_options(meta: dict) -> tuple[int, float]:
+    """Return the validated (write_batch_size, write_batch_latency) from `meta`."""
+    size = meta.get("write_batch_size", DEFAULT_WRITE_BATCH_SIZE)
+    if isinstance(size, bool) or not isinstance(size, int) or size < 1:
+        raise ValueError(f"write_batch_size must be a positive integer, not {size!r}")
+    latency = meta.get("write_batch_latency", DEFAULT_WRITE_BATCH_LATENCY)
+    if (
+        isinstance(latency, bool)
+        or not isinstance(latency, (int, float))
+        or latency < 0
+    ):
+        raise ValueError(
+            f"write_batch_latency must be a non-negative number, not {latency!r}"
+        )
+    return size, float(latency)
+
+
+def _group_slabs(
+    frames: list[tuple[np.ndarray, MDAEvent]],
+    route: Callable[[MDAEvent], tuple[str, tuple[int, ...], str]] | None = None,
+) -> Iterator[tuple[tuple[str, int], tuple[int, ...], str, np.ndarray]]:
+    """Yield `((id, slab_number), index, layer_name, image)` for each frame.
+
+    Consecutive frames share a slab number if they go to the same array, differ only
+    in the last index axis, and follow each other along that axis.  `route` returns
+    the `(id, index, layer_name)` of an event (`_id_idx_layer` by default).
+    """
+    if route is None:
+        route = _id_idx_layer
+    slab = 0
+    prev: tuple[str, tuple[int, ...]] | None = None
+    for image, event in frames:
+        _id, im_idx, layer_name = route(event)
+        if prev is None or not (
+            prev[0] == _id
+            and im_idx
+            and prev[1][:-1] == im_idx[:-1]
+            and prev[1][-1] + 1 == im_idx[-1]
+        ):
+            slab += 1
+        prev = (_id, im_idx)
+        yield (_id, slab), im_idx, layer_name, image
+
+
+def _slab_index(idxs: Sequence[tuple[int, ...]]) -> tuple:
+    """Return the array index of frames at consecutive `idxs` (see `_group_slabs`)."""
+    if len(idxs) == 1:
+        return idxs[0]
+    return (*idxs[0][:-1], slice(idxs[0][-1], idxs[-1][-1] + 1))
+
+
 def _id_idx_layer(event: MDAEvent) -> tuple[str, tuple[int, ...], str]:
     """Get the tmp_path id, index, and layer name for a given event.
 
@@ -380,3 +1392,95 @@ def _id_idx_layer(event: MDAEvent) -> tuple[str, tuple[int, ...], str]:
     layer_name = f"{prefix}_{ch_id}{seq.uid}"
 
     return _id, im_idx, layer_name
+
+
+class _FrameRouter:
+    """Fast equivalent of `_id_idx_layer` for the events of one sequence.
+
+    Everything that only depends on the sequence (the axis order, the file name, the
+    channel splitting) is computed once, so that routing a frame is a few dict
+    lookups.  Events of another sequence fall back to `_id_idx_layer`.
+    """
+
+    def __init__(self, sequence: MDASequence) -> None:
+        meta = cast("dict", sequence.metadata.get(NMM_METADATA_KEY, {}))
+        self._uid = sequence.uid
+        self._split = bool(meta.get("split_channels", False))
+        axes = list(get_full_sequence_axes(sequence))
+        if self._split and "c" in axes:
+            axes.remove("c")
+        self._axes = tuple(axes)
+        self._zeros = (0,) * len(axes)
+        self._prefix = _get_file_name_from_metadata(sequence)
+        # (channel config, channel index) -> (id, layer name)
+        self._targets: dict[tuple[str, int] | None, tuple[str, str]] = {
+            None: (str(self._uid), f"{self._prefix}_{self._uid}")
+        }
+
+    def route(self, event: MDAEvent) -> tuple[str, tuple[int, ...], str]:
+        """Return the `(id, index, layer_name)` of `event` (see `_id_idx_layer`)."""
+        seq = event.sequence
+        if seq is None or seq.uid != self._uid:
+            return _id_idx_layer(event)
+
+        index = event.index
+        # axes missing from the event (e.g. positions without a sub-sequence) are 0
+        im_idx = tuple(map(index.get, self._axes, self._zeros))
+
+        key = None
+        if self._split and event.channel:
+            key = (event.channel.config, index["c"])
+        try:
+            _id, layer_name = self._targets[key]
+        except KeyError:
+            ch_id = f"{key[0]}_{key[1]:03d}_"  # type: ignore[index]
+            _id = f"{ch_id}{self._uid}"
+            layer_name = f"{self._prefix}_{_id}"
+            self._targets[key] = (_id, layer_name)
+        return _id, im_idx, layer_name
+
+
+# order of the known useq axes in the arrays of generator MDAs (other axes follow,
+# in the order they first appear)
+GROWING_AXIS_ORDER = "tpgcz"
+# axis along which the events without an index of generator MDAs are appended
+GROWING_FRAME_AXIS = "frame"
+
+
+class _GrowingRouter:
+    """Route the events of a generator MDA to a growing array.
+
+    Generator events have no sequence, and their index is only known as they come.
+    The axes of the array are those of the first event's index (events without an
+    index are appended along a `GROWING_FRAME_AXIS` axis).  Axes that show up later
+    can't be added to the array: they are ignored, with a warning.
+    """
+
+    def __init__(self, sequence: MDASequence, codec: Codec | None) -> None:
+        self.sequence = sequence
+        self.codec = codec
+        self.axes: tuple[str, ...] = ()
+        self._started = False
+        self._count = 0
+        self._ignored: set[str] = set()
+        self._id = str(sequence.uid)
+        self._layer_name = f"{_get_file_name_from_metadata(sequence)}_{self._id}"
+
+    def route(self, event: MDAEvent) -> tuple[str, tuple[int, ...], str]:
+        """Return the `(id, index, layer_name)` of `event` (see `_id_idx_layer`)."""
+        index = dict(event.index) or {GROWING_FRAME_AXIS: self._count}
+        self._count += 1
+        if not self._started:
+            self._started = True
+            order = GROWING_AXIS_ORDER
+            self.axes = tuple(
+                sorted(index, key=lambda k: order.index(k) if k in order else 99)
+            )
+        if new := set(index).difference(self.axes, self._ignored):
+            self._ignored |= new
+            warn(
+                f"Ignoring axes {sorted(new)} of generator MDA events: the array "
+                f"axes are {self.axes}.",
+                stacklevel=2,
+            )
+        return self._id, tuple(index.get(k, 0) for k in self.axes), self._layer_name
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, cast
+
+import numpy as np
+
+from ._pyramid import downsample
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
+# size (pixels) of the square tiles in which mosaic canvases are allocated
+MOSAIC_TILE_SIZE = 512
+# number of downsampled levels of a mosaic (each one 2x smaller than the previous)
+MOSAIC_LEVELS = 4
+# memory (MB) above which a mosaic drops its finest level, and eventually stops
+# growing
+MOSAIC_MAX_MB = 512
+# axes whose frames all go to the mosaic (the latest one wins where they overlap);
+# only the frames at the selected index of the other axes (e.g. c, z) are added
+MOSAIC_AXES = ("t", "p", "g")
+
+
+def get_mosaic_option(meta: dict) -> dict[str, int] | None:
+    """Return the validated "mosaic" option from NMM metadata.
+
+    That is None without a mosaic, else the index of the frames to add along the
+    axes not in `MOSAIC_AXES` (0 for the axes not given).  The option is True, or a
+    mapping such as `{"c": 1, "z": 3}` to select another channel or z plane.
+    """
+    mosaic = meta.get("mosaic", False)
+    if mosaic is True or mosaic is False:
+        return {} if mosaic else None
+    if not isinstance(mosaic, dict) or not all(
+        isinstance(ax, str)
+        and ax not in MOSAIC_AXES
+        and isinstance(i, int)
+        and not isinstance(i, bool)
+        and i >= 0
+        for ax, i in mosaic.items()
+    ):
+        raise ValueError(
+            "mosaic must be True, False or a mapping of axis (other than "
+            f"{MOSAIC_AXES}) to non-negative index, not {mosaic!r}"
+        )
+    return dict(mosaic)
+
+
+def in_mosaic(index: Mapping[str, int], selection: Mapping[str, int]) -> bool:
+    """Return True if the frame at `index` goes to a mosaic of `selection`."""
+    return all(
+        i == selection.get(ax, 0) for ax, i in index.items() if ax not in MOSAIC_AXES
+    )
+
+
+class TiledCanvas:
+    """An unbounded 2D canvas, allocated in square tiles where something is pasted.
+
+    Coordinates are in pixels and can be negative.  Reading where nothing was pasted
+    returns zeros.
+
+    Parameters
+    ----------
+    dtype : str
+        Data type of the canvas.
+    rgb : bool
+        Whether pixels have a trailing color axis (of size 3).
+    tile_size : int
+        Size of the tiles.
+    """
+
+    def __init__(
+        self, dtype: str, rgb: bool = False, tile_size: int = MOSAIC_TILE_SIZE
+    ) -> None:
+        self.dtype = np.dtype(dtype)
+        self.rgb = rgb
+        self.tile_size = tile_size
+        self._color = (3,) if rgb else ()
+        self._tiles: dict[tuple[int, int], np.ndarray] = {}
+
+    @property
+    def n_tiles(self) -> int:
+        """Number of allocated tiles."""
+        return len(self._tiles)
+
+    def _overlapping(
+        self, y0: int, y1: int, x0: int, x1: int
+    ) -> Iterator[tuple[tuple[int, int], slice, slice, slice, slice]]:
+        """Yield `(tile, tile_ys, tile_xs, ys, xs)` for the tiles over [y0:y1, x0:x1].
+
+        `tile_ys`/`tile_xs` index the tile, and `ys`/`xs` the [y0:y1, x0:x1] region.
+        """
+        t = self.tile_size
+        for ty in range(y0 // t, -(-y1 // t)):
+            top, bottom = max(y0, ty * t), min(y1, (ty + 1) * t)
+            for tx in range(x0 // t, -(-x1 // t)):
+                left, right = max(x0, tx * t), min(x1, (tx + 1) * t)
+                yield (
+                    (ty, tx),
+                    slice(top - ty * t, bottom - ty * t),
+                    slice(left - tx * t, right - tx * t),
+                    slice(top - y0, bottom - y0),
+                    slice(left - x0, right - x0),
+                )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the allocated tiles."""
+        return sum(tile.nbytes for tile in self._tiles.values())
+
+    def paste(
+        self, image: np.ndarray, top: int, left: int, allocate: bool = True
+    ) -> None:
+        """Copy `image` onto the canvas, with its top-left corner at (top, left).
+
+        If not `allocate`, only the parts of `image` over allocated tiles are copied.
+        """
+        h, w = image.shape[:2]
+        t = self.tile_size
+        for key, tys, txs, ys, xs in self._overlapping(top, top + h, left, left + w):
+            if (tile := self._tiles.get(key)) is None:
+                if not allocate:
+                    continue
+                tile = np.zeros((t, t, *self._color), self.dtype)
+                self._tiles[key] = tile
+            tile[tys, txs] = image[ys, xs]
+
+    def read(self, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        """Return a copy of the [y0:y1, x0:x1] region of the canvas."""
+        out = np.zeros((max(y1 - y0, 0), max(x1 - x0, 0), *self._color), self.dtype)
+        for key, tys, txs, ys, xs in self._overlapping(y0, y1, x0, x1):
+            if (tile := self._tiles.get(key)) is not None:
+                out[ys, xs] = tile[tys, txs]
+        return out
+
+
+class CanvasView:
+    """Read-only array view of a window of a `TiledCanvas` (for napari).
+
+    Parameters
+    ----------
+    canvas : TiledCanvas
+        The canvas to read from.
+    origin : tuple[int, int]
+        Canvas coordinates of the top-left pixel of the window.
+    shape : tuple[int, int]
+        Height and width of the window.
+    """
+
+    def __init__(
+        self, canvas: TiledCanvas, origin: tuple[int, int], shape: tuple[int, int]
+    ) -> None:
+        self.canvas = canvas
+        self.origin = origin
+        self.shape = tuple(shape) + canvas._color
+        self.dtype = canvas.dtype
+        self.ndim = len(self.shape)
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (self.ndim - len(key))
+        ranges: list[tuple[int, int, int | None]] = []
+        for k, n in zip(key[:2], self.shape[:2]):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                if step < 0:
+                    return cast("np.ndarray", np.asarray(self)[key])
+                ranges.append((start, max(stop, start), step))
+            else:
+                i = int(k) + n if int(k) < 0 else int(k)
+                ranges.append((i, i + 1, None))
+        (y0, y1, ys), (x0, x1, xs) = ranges
+        oy, ox = self.origin
+        out = self.canvas.read(oy + y0, oy + y1, ox + x0, ox + x1)
+        # integer indices (no step) drop their axis
+        out = out[
+            0 if ys is None else slice(None, None, ys),
+            0 if xs is None else slice(None, None, xs),
+        ]
+        return out[(..., *key[2:])] if key[2:] else out
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        return np.asarray(self[:, :], dtype=dtype)
+
+
+class Mosaic:
+    """Frames placed at their stage position, with `levels` downsampled levels.
+
+    Frames are pasted (the latest one wins where they overlap) onto one
+    `TiledCanvas` per level, so memory is only used where frames landed.  `views`
+    returns the current extent of the mosaic as a multiscale napari layer's data.
+
+    Memory is bounded by `max_mb`: above it, the finest level is dropped (so the
+    mosaic is kept at half the resolution, see `scale`).  Once only the coarsest
+    level is left, frames are only pasted over the tiles already allocated.
+
+    Parameters
+    ----------
+    pixel_size : float
+        Size (um) of a frame pixel.
+    dtype : str
+        Data type of the frames.
+    rgb : bool
+        Whether frames have a trailing color axis.
+    levels : int
+        Number of downsampled levels.
+    max_mb : float
+        Memory (MB) above which the mosaic is downsampled.
+    """
+
+    def __init__(
+        self,
+        pixel_size: float,
+        dtype: str,
+        rgb: bool = False,
+        levels: int = 0,
+        max_mb: float = MOSAIC_MAX_MB,
+    ) -> None:
+        self.pixel_size = pixel_size
+        self.rgb = rgb
+        self.max_bytes = int(max_mb * 1e6)
+        # the canvases of levels `base_level` to `levels` (the finer ones were
+        # dropped to save memory); replaced, not modified, as it is read by `views`
+        # in another thread
+        self.canvases = [TiledCanvas(dtype, rgb) for _ in range(levels + 1)]
+        self._levels = levels
+        # True once no more tiles are allocated
+        self.full = False
+        # pixel bounds (top, left, bottom, right) of the level 0 canvas, multiples
+        # of 2**levels so that all levels share the same origin
+        self.bounds: tuple[int, int, int, int] | None = None
+        # incremented every time a frame is added
+        self.version = 0
+
+    def add(self, image: np.ndarray, x_pos: float, y_pos: float) -> None:
+        """Paste `image`, centered on the stage position (`x_pos`, `y_pos`) in um."""
+        h, w = image.shape[:2]
+        top = round(y_pos / self.pixel_size - h / 2)
+        left = round(x_pos / self.pixel_size - w / 2)
+        if not self.full:
+            self._extend(top, left, top + h, left + w)
+        base = self.base_level
+        for k in range(self._levels + 1):
+            if k:
+                image = downsample(image, self.rgb)
+            if k >= base:
+                canvas = self.canvases[k - base]
+                canvas.paste(image, top >> k, left >> k, allocate=not self.full)
+        while self.nbytes > self.max_bytes and not self.full:
+            if len(self.canvases) > 1:
+                self.canvases = self.canvases[1:]
+            else:
+                self.full = True
+        self.version += 1
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the canvases."""
+        return sum(canvas.nbytes for canvas in self.canvases)
+
+    @property
+    def base_level(self) -> int:
+        """Level of the finest canvas kept."""
+        return self._levels + 1 - len(self.canvases)
+
+    @property
+    def scale(self) -> float:
+        """Size (um) of a pixel of the finest level kept."""
+        return self.pixel_size * (1 << self.base_level)
+
+    def _extend(self, top: int, left: int, bottom: int, right: int) -> None:
+        align = 2**self._levels
+        top, left = top // align * align, left // align * align
+        bottom, right = -(-bottom // align) * align, -(-right // align) * align
+        if self.bounds is not None:
+            t, lf, b, r = self.bounds
+            top, left = min(t, top), min(lf, left)
+            bottom, right = max(b, bottom), max(r, right)
+        self.bounds = (top, left, bottom, right)
+
+    def views(self) -> list[CanvasView]:
+        """Return one `CanvasView` per level kept, covering the current bounds."""
+        if self.bounds is None:
+            return []
+        top, left, bottom, right = self.bounds
+        canvases = self.canvases
+        base = self._levels + 1 - len(canvases)
+        return [
+            CanvasView(
+                canvas,
+                (top >> k, left >> k),
+                (math.ceil((bottom - top) / 2**k), math.ceil((right - left) / 2**k)),
+            )
+            for k, canvas in enumerate(canvases, base)
+        ]
+
+    def translate(self) -> tuple[float, float]:
+        """Return the position (um) of the top-left corner of the mosaic."""
+        top, left, *_ = self.bounds or (0, 0)
+        return top * self.pixel_size, left * self.pixel_size
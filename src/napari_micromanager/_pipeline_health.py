@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# interval (ms) at which the pipeline health widget samples the counters
+PIPELINE_HEALTH_INTERVAL_MS = 1000
+# the writer is considered to fall behind when the oldest unwritten frame is older
+# than this (s)
+PIPELINE_BACKLOG_WARNING = 2.0
+
+
+@dataclass
+class PipelineSample:
+    """Counters of the acquisition pipeline at one point in time.
+
+    The counters are cumulative since the current (or last) MDA started: they go
+    back to 0 when a new one starts.
+
+    Attributes
+    ----------
+    time : float
+        `time.perf_counter()` when the sample was taken.
+    mda_running : bool
+        Whether an MDA is running.
+    frames_acquired : int
+        Number of MDA frames received from the core.
+    bytes_written : int
+        Number of bytes of frames written to the arrays.
+    frames_displayed : int
+        Number of times the viewer jumped to a new MDA frame.
+    queue_depth : int
+        Number of frames waiting to be written.
+    oldest_put : float
+        `time.perf_counter()` when the oldest unwritten frame was received (0 if
+        there is none).
+    live_display_fps : float | None
+        Display rate of live mode, None if live mode is off.
+    storage_dir : Path
+        Directory where the arrays of the current (or last) MDA are stored.
+    """
+
+    time: float
+    mda_running: bool
+    frames_acquired: int
+    bytes_written: int
+    frames_displayed: int
+    queue_depth: int
+    oldest_put: float
+    live_display_fps: float | None
+    storage_dir: Path
+
+
+@dataclass
+class PipelineHealth:
+    """Rates and backlog of the acquisition pipeline, between two samples.
+
+    Attributes
+    ----------
+    acquisition_fps : float
+        Rate at which MDA frames were received.
+    write_mb_per_s : float
+        Rate at which frames were written (MB/s).
+    queue_depth : int
+        Number of frames waiting to be written.
+    oldest_frame_age : float
+        Time (s) the oldest unwritten frame has been waiting.
+    display_fps : float
+        Rate at which frames were shown (live mode, or MDA).
+    """
+
+    acquisition_fps: float = 0.0
+    write_mb_per_s: float = 0.0
+    queue_depth: int = 0
+    oldest_frame_age: float = 0.0
+    display_fps: float = 0.0
+
+    @property
+    def falling_behind(self) -> bool:
+        """Whether frames wait longer than `PIPELINE_BACKLOG_WARNING` to be written."""
+        return self.oldest_frame_age > PIPELINE_BACKLOG_WARNING
+
+    @classmethod
+    def from_samples(cls, prev: PipelineSample, cur: PipelineSample) -> PipelineHealth:
+        """Return the health of the pipeline between `prev` and `cur`."""
+        elapsed = cur.time - prev.time
+        if elapsed <= 0:
+            return cls(queue_depth=cur.queue_depth)
+
+        def rate(before: int, after: int) -> float:
+            # counters restart from 0 with each MDA
+            return (after - before if after >= before else after) / elapsed
+
+        display_fps = cur.live_display_fps
+        if display_fps is None:
+            display_fps = rate(prev.frames_displayed, cur.frames_displayed)
+        return cls(
+            acquisition_fps=rate(prev.frames_acquired, cur.frames_acquired),
+            write_mb_per_s=rate(prev.bytes_written, cur.bytes_written) / 1e6,
+            queue_depth=cur.queue_depth,
+            oldest_frame_age=cur.time - cur.oldest_put if cur.oldest_put else 0.0,
+            display_fps=display_fps,
+        )
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import contextlib
+import math
+import multiprocessing
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Literal, cast
+
+import numpy as np
+
+from ._frame_stats import FrameStats
+from ._storage import close_array, open_array
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from multiprocessing.connection import Connection
+    from pathlib import Path
+
+# "thread": the frames are written by a thread of the GUI process.
+# "process": they are handed to a writer subprocess (see `ProcessWriter`).
+WriterBackend = Literal["thread", "process"]
+WRITER_BACKENDS: tuple[WriterBackend, ...] = ("thread", "process")
+DEFAULT_WRITER: WriterBackend = "thread"
+# default size (MB) of the shared-memory ring buffer of the writer process.  It always
+# has room for at least PROCESS_WRITER_MIN_SLOTS frames.
+DEFAULT_WRITER_BUFFER_MB = 256.0
+PROCESS_WRITER_MIN_SLOTS = 4
+# interval (s) at which the writer thread collects the writes reported by the process
+PROCESS_WRITER_POLL = 0.01
+# time (s) the process gets to close its arrays and exit before it is terminated
+PROCESS_WRITER_JOIN_TIMEOUT = 10.0
+
+
+def get_writer_options(meta: dict) -> tuple[WriterBackend, float]:
+    """Return the validated ("writer", "writer_buffer_mb") options from NMM metadata."""
+    writer = meta.get("writer", DEFAULT_WRITER)
+    if writer not in WRITER_BACKENDS:
+        raise ValueError(f"writer must be one of {WRITER_BACKENDS}, not {writer!r}")
+    buffer_mb = meta.get("writer_buffer_mb", DEFAULT_WRITER_BUFFER_MB)
+    if (
+        isinstance(buffer_mb, bool)
+        or not isinstance(buffer_mb, (int, float))
+        or buffer_mb <= 0
+    ):
+        raise ValueError(
+            f"writer_buffer_mb must be a positive number, not {buffer_mb!r}"
+        )
+    return cast("WriterBackend", writer), float(buffer_mb)
+
+
+@dataclass
+class WriteResult:
+    """A write reported as done by the writer process.
+
+    Attributes
+    ----------
+    tag : Any
+        The tag passed to `ProcessWriter.submit`.
+    elapsed : float
+        Time (s) the process spent writing (and compressing) the frames.
+    stats : tuple[np.ndarray, ...]
+        The `FrameStats.values` of the frames, computed by the process.
+    """
+
+    tag: Any
+    elapsed: float
+    stats: tuple[np.ndarray, ...]
+
+
+class ProcessWriterError(RuntimeError):
+    """The writer process failed.
+
+    Attributes
+    ----------
+    done : list[WriteResult]
+        Writes that were done, but not returned by `ProcessWriter.results` yet.
+    unfinished : list[tuple[Any, np.ndarray]]
+        The (tag, data) of the writes that were submitted but not done: the frame,
+        or the stack of frames, copied out of the ring buffer.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        done: list[WriteResult],
+        unfinished: list[tuple[Any, np.ndarray]],
+    ) -> None:
+        super().__init__(message)
+        self.done = done
+        self.unfinished = unfinished
+
+
+@dataclass
+class _Request:
+    slots: list[int]
+    tag: Any
+
+
+class ProcessWriter:
+    """Write frames to existing arrays (zarr or memmap) in a subprocess.
+
+    The frames are copied into a ring buffer of frame slots in shared memory, and
+    only the slot numbers (with the array id and index to write to) are sent to the
+    process, which compresses and stores the frames, computes their `FrameStats`
+    and reports each write back.  A slot is reused once its write is reported, so
+    `submit` blocks while the ring buffer is full.  Encoding thus runs without
+    holding the GIL of the GUI process.
+
+    Only one thread may use the writer.  The process is started with the "spawn"
+    method (forking a Qt application is unsafe), so it takes a moment to start
+    while the first frames wait in the ring buffer.
+
+    Parameters
+    ----------
+    frame_shape : Sequence[int]
+        Shape of the frames (YX, or YXC for RGB).
+    dtype : str
+        Dtype of the frames.
+    buffer_mb : float
+        Size of the ring buffer (MB).
+    """
+
+    def __init__(
+        self,
+        frame_shape: Sequence[int],
+        dtype: str,
+        buffer_mb: float = DEFAULT_WRITER_BUFFER_MB,
+    ) -> None:
+        frame_shape = tuple(frame_shape)
+        frame_bytes = math.prod(frame_shape) * np.dtype(dtype).itemsize
+        n_slots = max(PROCESS_WRITER_MIN_SLOTS, int(buffer_mb * 1e6) // frame_bytes)
+        self._shm = SharedMemory(create=True, size=n_slots * frame_bytes)
+        self._slots: np.ndarray = np.ndarray(
+            (n_slots, *frame_shape), dtype, buffer=self._shm.buf
+        )
+        self._free = deque(range(n_slots))
+        # submitted writes not reported yet (in submission order), and writes
+        # reported but not returned by `results` yet
+        self._requests: dict[int, _Request] = {}
+        self._done: list[WriteResult] = []
+        self._count = 0
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_writer_main,
+            args=(child_conn, self._shm.name, frame_shape, dtype, n_slots),
+            name="nmm_writer",
+            daemon=True,
+        )
+        self._process.start()
+        # so that `recv` fails if the process dies
+        child_conn.close()
+
+    @property
+    def n_slots(self) -> int:
+        """Number of frames the ring buffer holds."""
+        return len(self._slots)
+
+    @property
+    def pending(self) -> int:
+        """Number of writes submitted but not reported as done yet."""
+        return len(self._requests)
+
+    def open(
+        self,
+        id_: str,
+        path: str | Path,
+        index_shape: Sequence[int],
+        bit_depth: int = 0,
+    ) -> None:
+        """Have the process open the array at `path`, as the target `id_`.
+
+        `index_shape` is the shape of its index axes and `bit_depth` the camera bit
+        depth (for the `FrameStats`).
+        """
+        # called from the main thread: a dead process is reported by `submit`
+        with contextlib.suppress(OSError):
+            self._conn.send(("open", id_, str(path), tuple(index_shape), bit_depth))
+
+    def submit(
+        self, id_: str, index: tuple, images: Sequence[np.ndarray], tag: Any = None
+    ) -> None:
+        """Have `images` written at `index` of the array `id_`.
+
+        `images` is a single frame, or the frames of a slab if `index` ends with a
+        slice (at most `n_slots` of them).  Blocks until there is room for them in the
+        ring buffer.  The write is reported by `results`, with `tag`.  If the process
+        failed, the `ProcessWriterError` includes this write in its `unfinished` ones.
+        """
+        if len(images) > self.n_slots:
+            raise ValueError(f"images must fit in {self.n_slots} slots")
+        try:
+            while len(self._free) < len(images):
+                self._receive(None)
+        except ProcessWriterError as e:
+            data = images[0] if len(images) == 1 else np.stack(images)
+            e.unfinished.append((tag, data))
+            raise
+        slots = [self._free.popleft() for _ in images]
+        for slot, image in zip(slots, images):
+            self._slots[slot] = image
+        self._count += 1
+        self._requests[self._count] = _Request(slots, tag)
+        self._send(("write", self._count, id_, index, slots))
+
+    def results(self, timeout: float = 0.0) -> list[WriteResult]:
+        """Return the writes done since the last call.
+
+        Waits up to `timeout` (s) for one if there is none yet.
+        """
+        if not self._done and self._requests:
+            self._receive(timeout)
+        while self._requests and self._conn.poll():
+            self._receive(0)
+        done, self._done = self._done, []
+        return done
+
+    def close(self) -> None:
+        """Stop the process (after the pending writes) and free the ring buffer."""
+        # may be called by the writer thread and by the handler cleanup
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        with contextlib.suppress(OSError):
+            self._conn.send(None)
+        self._process.join(PROCESS_WRITER_JOIN_TIMEOUT)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._conn.close()
+        del self._slots
+        self._shm.close()
+        self._shm.unlink()
+
+    def _send(self, msg: tuple) -> None:
+        try:
+            self._conn.send(msg)
+        except OSError:
+            raise self._exited() from None
+
+    def _exited(self) -> ProcessWriterError:
+        self._process.join(PROCESS_WRITER_POLL)
+        return self._error(f"writer process exited with code {self._process.exitcode}")
+
+    def _receive(self, timeout: float | None) -> None:
+        """Wait up to `timeout` (s, None: forever) for a write to be reported."""
+        try:
+            if not self._conn.poll(timeout):
+                return
+            request, elapsed, stats = self._conn.recv()
+        except (EOFError, OSError):
+            raise self._exited() from None
+        if request is None:
+            raise self._error(f"writer process failed: {elapsed}")
+        req = self._requests.pop(request)
+        self._free.extend(req.slots)
+        self._done.append(WriteResult(req.tag, elapsed, stats))
+
+    def _error(self, message: str) -> ProcessWriterError:
+        unfinished = []
+        for req in self._requests.values():
+            slots = req.slots[0] if len(req.slots) == 1 else req.slots
+            unfinished.append((req.tag, self._slots[slots].copy()))
+        self._requests = {}
+        done, self._done = self._done, []
+        return ProcessWriterError(message, done, unfinished)
+
+
+def _writer_main(
+    conn: Connection,
+    shm_name: str,
+    frame_shape: tuple[int, ...],
+    dtype: str,
+    n_slots: int,
+) -> None:
+    """Body of the writer process (see `ProcessWriter`)."""
+    shm = SharedMemory(shm_name)
+    arrays: dict[str, Any] = {}
+    try:
+        slots: np.ndarray = np.ndarray((n_slots, *frame_shape), dtype, buffer=shm.buf)
+        _write_frames(conn, slots, dtype, arrays)
+        del slots
+    except EOFError:
+        pass  # the GUI process exited
+    except Exception as e:
+        with contextlib.suppress(OSError):
+            conn.send((None, repr(e), None))
+    finally:
+        for arr in arrays.values():
+            close_array(arr)
+        # fails if a view of the ring buffer is still alive: leave it to the exit
+        with contextlib.suppress(BufferError):
+            shm.close()
+
+
+def _write_frames(
+    conn: Connection, slots: np.ndarray, dtype: str, arrays: dict[str, Any]
+) -> None:
+    """Handle the requests of the `ProcessWriter` until it sends None."""
+    stats: dict[str, FrameStats] = {}
+    while (msg := conn.recv()) is not None:
+        if msg[0] == "open":
+            _, id_, path, index_shape, bit_depth = msg
+            arrays[id_] = open_array(path)
+            stats[id_] = FrameStats(index_shape, dtype, bit_depth)
+            continue
+        _, request, id_, index, slot_list = msg
+        t0 = time.perf_counter()
+        # a single frame, or a stack of frames (copied by fancy indexing)
+        data = slots[slot_list[0]] if len(slot_list) == 1 else slots[slot_list]
+        arrays[id_][index] = data
+        stats[id_].update(index, data)
+        elapsed = time.perf_counter() - t0
+        conn.send((request, elapsed, stats[id_].values(index)))
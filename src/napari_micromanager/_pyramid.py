@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# default number of downsampled levels added to each MDA layer (0: no pyramid).
+# Overridden with the "pyramid_levels" key of the NMM metadata.
+DEFAULT_PYRAMID_LEVELS = 0
+
+
+def get_pyramid_levels(meta: dict) -> int:
+    """Return the validated "pyramid_levels" option from NMM metadata."""
+    levels = meta.get("pyramid_levels", DEFAULT_PYRAMID_LEVELS)
+    if isinstance(levels, bool) or not isinstance(levels, int) or levels < 0:
+        raise ValueError(
+            f"pyramid_levels must be a non-negative integer, not {levels!r}"
+        )
+    return levels
+
+
+def pyramid_shapes(
+    shape: Sequence[int], levels: int, rgb: bool = False
+) -> list[tuple[int, ...]]:
+    """Return the shapes of the `levels` downsampled levels of an array of `shape`.
+
+    Each level halves the size of the Y and X axes of the previous one (rounding up),
+    i.e. level `k` is downsampled `2**k` times.  The last axis is the color axis if
+    `rgb` is True.
+    """
+    y = len(shape) - (3 if rgb else 2)
+    shapes = []
+    for k in range(1, levels + 1):
+        level = list(shape)
+        level[y : y + 2] = [math.ceil(n / 2**k) for n in shape[y : y + 2]]
+        shapes.append(tuple(level))
+    return shapes
+
+
+def downsample(image: np.ndarray, rgb: bool = False) -> np.ndarray:
+    """Return `image` downsampled 2x along Y and X by averaging 2x2 blocks.
+
+    `image` can have any number of leading axes (e.g. a stack of frames).  Odd sizes
+    are padded by repeating the last row/column, so the result has the shape given by
+    `pyramid_shapes`.
+    """
+    y = image.ndim - (3 if rgb else 2)
+    h, w = image.shape[y : y + 2]
+    if h % 2 or w % 2:
+        pad = [(0, 0)] * image.ndim
+        pad[y], pad[y + 1] = (0, h % 2), (0, w % 2)
+        image = np.pad(image, pad, mode="edge")
+        h, w = h + h % 2, w + w % 2
+    blocks = image.reshape(
+        *image.shape[:y], h // 2, 2, w // 2, 2, *image.shape[y + 2 :]
+    )
+    mean = blocks.mean(axis=(y + 1, y + 3), dtype=np.float32)
+    return cast("np.ndarray", mean.astype(image.dtype))
@@ -0,0 +1,477 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Literal, cast
+
+import numcodecs
+import numpy as np
+import zarr
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+    from pathlib import Path
+
+# "zarr": chunked (and compressed) zarr stores.
+# "memmap": one uncompressed, memory-mapped `.npy` file per layer.
+StorageBackend = Literal["zarr", "memmap"]
+STORAGE_BACKENDS: tuple[StorageBackend, ...] = ("zarr", "memmap")
+DEFAULT_STORAGE: StorageBackend = "zarr"
+# file extension of the stores of each backend
+STORE_EXTENSIONS: dict[StorageBackend, str] = {"zarr": ".zarr", "memmap": ".npy"}
+
+ChunkPolicy = Literal["frame", "stack", "tiles", "sharded"]
+CHUNK_POLICIES: tuple[ChunkPolicy, ...] = ("frame", "stack", "tiles", "sharded")
+DEFAULT_CHUNK_POLICY: ChunkPolicy = "frame"
+DEFAULT_TILE_SIZE = 512
+
+# axes that are kept whole in a "stack" chunk or a "sharded" shard
+STACK_AXES = "cz"
+
+ZARR_V3 = int(zarr.__version__.split(".")[0]) >= 3
+
+Codec = Literal[
+    "none",
+    "blosc-lz4",
+    "blosc-zstd",
+    "blosc-lz4-bitshuffle",
+    "blosc-zstd-bitshuffle",
+    "zstd",
+    "auto",
+]
+CODECS: tuple[Codec, ...] = (
+    "none",
+    "blosc-lz4",
+    "blosc-zstd",
+    "blosc-lz4-bitshuffle",
+    "blosc-zstd-bitshuffle",
+    "zstd",
+    "auto",
+)
+CLEVEL = 5
+# (cname, shuffle) of the blosc codecs
+_BLOSC: dict[str, tuple[str, str]] = {
+    "blosc-lz4": ("lz4", "shuffle"),
+    "blosc-zstd": ("zstd", "shuffle"),
+    "blosc-lz4-bitshuffle": ("lz4", "bitshuffle"),
+    "blosc-zstd-bitshuffle": ("zstd", "bitshuffle"),
+}
+# "auto" only chooses between blosc codecs: blosc chunks carry their own settings in
+# a header, so an array opened with any of them can read chunks written by the
+# others.  The arrays are created with AUTO_INITIAL_CODEC before the choice is made.
+AUTO_CODECS: tuple[Codec, ...] = (
+    "blosc-lz4",
+    "blosc-zstd",
+    "blosc-lz4-bitshuffle",
+    "blosc-zstd-bitshuffle",
+)
+AUTO_INITIAL_CODEC: Codec = "blosc-lz4"
+
+
+def chunk_layout(
+    policy: ChunkPolicy,
+    axis_labels: Sequence[str],
+    shape: Sequence[int],
+    yx_shape: Sequence[int],
+    tile_size: int = DEFAULT_TILE_SIZE,
+) -> tuple[tuple[int, ...], tuple[int, ...] | None]:
+    """Return `(chunks, shards)` for an array of shape `(*shape, *yx_shape)`.
+
+    Parameters
+    ----------
+    policy : {"frame", "stack", "tiles", "sharded"}
+        - "frame": one chunk per frame.
+        - "stack": one chunk per Z stack (the full "c" and "z" axes of the layer), so
+          a whole stack is a single file.
+        - "tiles": each frame is split into `tile_size` x `tile_size` tiles, for very
+          large sensors.
+        - "sharded": one chunk per frame, grouped in one shard per Z stack (zarr v3
+          sharding), so many frames share a single file while each frame can still be
+          read on its own.
+    axis_labels : Sequence[str]
+        The labels of the non-YX axes of the array (e.g. `["t", "c", "z"]`).
+    shape : Sequence[int]
+        The shape of the non-YX axes of the array.
+    yx_shape : Sequence[int]
+        The shape of a single frame (`[Y, X]` or `[Y, X, 3]` for RGB).
+    tile_size : int
+        The size of a tile for the "tiles" policy.
+
+    Returns
+    -------
+    tuple[tuple[int, ...], tuple[int, ...] | None]
+        The chunk shape, and the shard shape (`None` unless `policy` is "sharded").
+    """
+    frame_chunks = (1,) * len(shape) + tuple(yx_shape)
+    stack = tuple(
+        n if ax in STACK_AXES else 1 for ax, n in zip(axis_labels, shape)
+    ) + tuple(yx_shape)
+    if policy == "frame":
+        return frame_chunks, None
+    if policy == "stack":
+        return stack, None
+    if policy == "tiles":
+        tiles = [min(tile_size, n) for n in yx_shape[:2]]
+        return (1,) * len(shape) + tuple(tiles) + tuple(yx_shape[2:]), None
+    if policy == "sharded":
+        return frame_chunks, stack
+    raise ValueError(f"chunking must be one of {CHUNK_POLICIES}, not {policy!r}")
+
+
+def get_chunk_options(meta: dict) -> tuple[ChunkPolicy, int]:
+    """Return the validated ("chunking", "tile_size") options from NMM metadata."""
+    policy = meta.get("chunking", DEFAULT_CHUNK_POLICY)
+    if policy not in CHUNK_POLICIES:
+        raise ValueError(f"chunking must be one of {CHUNK_POLICIES}, not {policy!r}")
+    if policy == "sharded" and not ZARR_V3:
+        raise ValueError(
+            f"chunking='sharded' requires zarr>=3 (found {zarr.__version__})."
+        )
+    tile_size = meta.get("tile_size", DEFAULT_TILE_SIZE)
+    if isinstance(tile_size, bool) or not isinstance(tile_size, int) or tile_size < 1:
+        raise ValueError(f"tile_size must be a positive integer, not {tile_size!r}")
+    return cast("ChunkPolicy", policy), tile_size
+
+
+def get_storage_option(meta: dict) -> StorageBackend:
+    """Return the validated "storage" option from NMM metadata."""
+    storage = meta.get("storage", DEFAULT_STORAGE)
+    if storage not in STORAGE_BACKENDS:
+        raise ValueError(f"storage must be one of {STORAGE_BACKENDS}, not {storage!r}")
+    return cast("StorageBackend", storage)
+
+
+def get_codec_option(meta: dict) -> Codec | None:
+    """Return the validated "codec" option from NMM metadata (None: zarr default)."""
+    codec = meta.get("codec")
+    if codec is not None and codec not in CODECS:
+        raise ValueError(f"codec must be one of {CODECS}, not {codec!r}")
+    return cast("Codec | None", codec)
+
+
+def numcodecs_codec(codec: Codec) -> numcodecs.abc.Codec | None:
+    """Return the numcodecs compressor for `codec` (None for "none")."""
+    if codec == "none":
+        return None
+    if codec == "zstd":
+        return numcodecs.Zstd(level=CLEVEL)
+    if codec in _BLOSC:
+        cname, shuffle = _BLOSC[codec]
+        shuffle_ = numcodecs.Blosc.BITSHUFFLE if shuffle == "bitshuffle" else 1
+        return numcodecs.Blosc(cname=cname, clevel=CLEVEL, shuffle=shuffle_)
+    raise ValueError(f"No compressor for codec {codec!r}")
+
+
+def _compressor_kwargs(codec: Codec) -> dict[str, Any]:
+    """Return the kwargs that select `codec` when creating a zarr array."""
+    if not ZARR_V3:
+        return {"compressor": numcodecs_codec(codec)}
+
+    from zarr.codecs import BloscCodec, ZstdCodec
+
+    if codec == "none":
+        return {"compressors": None}
+    if codec == "zstd":
+        return {"compressors": ZstdCodec(level=CLEVEL)}
+    cname, shuffle = _BLOSC[codec]
+    return {"compressors": BloscCodec(cname=cname, clevel=CLEVEL, shuffle=shuffle)}
+
+
+def create_array(
+    path: str,
+    shape: Sequence[int],
+    dtype: str,
+    chunks: Sequence[int],
+    shards: Sequence[int] | None = None,
+    codec: Codec | None = None,
+) -> zarr.Array:
+    """Create an empty zarr array at `path`, replacing anything already there.
+
+    `codec` selects the compressor (see `CODECS`), or the zarr default if None.
+    """
+    kwargs = {} if codec is None else _compressor_kwargs(codec)
+    if shards is None and (codec is None or not ZARR_V3):
+        return zarr.open(
+            str(path),
+            mode="w",
+            shape=tuple(shape),
+            dtype=dtype,
+            chunks=chunks,
+            **kwargs,
+        )
+    return zarr.create_array(
+        str(path),
+        shape=tuple(shape),
+        dtype=dtype,
+        chunks=tuple(chunks),
+        shards=shards,
+        overwrite=True,
+        **kwargs,
+    )
+
+
+def create_memmap(path: str | Path, shape: Sequence[int], dtype: str) -> np.memmap:
+    """Create a zero-filled, memory-mapped `.npy` file at `path`.
+
+    The file is preallocated (sparse on most filesystems), so writing a frame is a
+    single copy into the page cache and reading a slice needs no decoding.
+    """
+    mm = np.lib.format.open_memmap(  # type: ignore[no-untyped-call]
+        str(path), mode="w+", dtype=dtype, shape=tuple(shape)
+    )
+    return cast("np.memmap", mm)
+
+
+def open_array(path: str | Path) -> zarr.Array | np.memmap:
+    """Open the existing array (zarr or `.npy`) at `path` for reading and writing."""
+    if str(path).endswith(".npy"):
+        return np.load(str(path), mmap_mode="r+")
+    return zarr.open(str(path), mode="r+")
+
+
+def close_array(arr: zarr.Array | np.ndarray) -> None:
+    """Close the store of a zarr array, or flush a memmap to its file."""
+    if isinstance(arr, np.memmap):
+        arr.flush()
+    elif isinstance(arr, RaggedArray):
+        arr.close()
+    elif not isinstance(arr, np.ndarray):
+        arr.store.close()
+
+
+def measure_codecs(
+    frames: Sequence[np.ndarray], codecs: Sequence[Codec] = AUTO_CODECS
+) -> dict[Codec, tuple[float, float]]:
+    """Return `{codec: (compression ratio, encode MB/s)}` measured on `frames`."""
+    nbytes = sum(f.nbytes for f in frames)
+    results: dict[Codec, tuple[float, float]] = {}
+    for codec in codecs:
+        if (compressor := numcodecs_codec(codec)) is None:
+            continue
+        t0 = time.perf_counter()
+        encoded = sum(len(compressor.encode(f)) for f in frames)
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+        results[codec] = (nbytes / max(encoded, 1), nbytes / 1e6 / elapsed)
+    return results
+
+
+def choose_codec(
+    measurements: Mapping[Codec, tuple[float, float]], required_mbps: float
+) -> Codec:
+    """Pick a codec from `measure_codecs` results.
+
+    Among the codecs that encode at least `required_mbps`, the one with the best
+    compression ratio is chosen (i.e. the one that writes the fewest bytes to disk
+    while keeping up with acquisition).  If none keeps up, the fastest one is chosen.
+    """
+    fast_enough = [c for c, (_, mbps) in measurements.items() if mbps >= required_mbps]
+    if fast_enough:
+        return max(fast_enough, key=lambda c: measurements[c][0])
+    return max(measurements, key=lambda c: measurements[c][1])
+
+
+class GrowingArray:
+    """A zarr array that grows along its leading (index) axes as frames are written.
+
+    Used when the shape of an acquisition isn't known in advance (generator MDAs).
+    The underlying store is resized (which only rewrites its metadata, no data is
+    copied) to at least double the needed size along an axis, so that it is resized
+    O(log n) times for n frames.  `shape` is the extent of what was written so far,
+    and is what readers (e.g. napari) see; `trim` shrinks the store to it.
+
+    Parameters
+    ----------
+    array : zarr.Array
+        The (empty) array to fill, of shape `(1,) * n_index + frame_shape`.
+    n_index : int
+        Number of index axes, in front of the frame axes.
+    """
+
+    def __init__(self, array: zarr.Array, n_index: int) -> None:
+        self.array = array
+        self._n_index = n_index
+        self._shape = (0,) * n_index + tuple(array.shape[n_index:])
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Extent of the frames written so far."""
+        return self._shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return cast("np.dtype", self.array.dtype)
+
+    @property
+    def ndim(self) -> int:
+        return len(self._shape)
+
+    @property
+    def store(self) -> Any:
+        return self.array.store
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.array[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.reserve(key)
+        self.array[key] = value
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        data = self.array[tuple(slice(0, n) for n in self._shape)]
+        return np.asarray(data, dtype=dtype)
+
+    def reserve(self, key: Any) -> bool:
+        """Grow the array so that `key` (ints and slices) fits; return True if it grew.
+
+        Only the index axes grow: `key` must not go past the frame axes.
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        needed = [
+            k.stop if isinstance(k, slice) else k + 1 for k in key[: self._n_index]
+        ]
+        grew = False
+        shape = list(self._shape)
+        for i, n in enumerate(needed):
+            if n > shape[i]:
+                shape[i] = n
+                grew = True
+        if not grew:
+            return False
+        capacity = list(self.array.shape)
+        if any(n > c for n, c in zip(shape, capacity)):
+            new = [max(n, 2 * c) if n > c else c for n, c in zip(shape, capacity)]
+            self.array.resize(tuple(new))
+        self._shape = tuple(shape)
+        return True
+
+    def trim(self) -> None:
+        """Shrink the store to `shape` (e.g. once the acquisition is over)."""
+        if tuple(self.array.shape) != self._shape and all(self._shape):
+            self.array.resize(self._shape)
+
+
+class RaggedArray:
+    """One zarr array per stage position, seen as a single (padded) array.
+
+    Positions with different sub-sequences have different shapes.  Rather than
+    padding every position to the largest one on disk, each position is stored with
+    its own shape in `<path>/p<index>`, and this class presents them as one array
+    of the padded `shape` (along `p_axis`), reading zeros outside of a position's
+    array.  Nothing is allocated for the padding.
+
+    Use `create` to make a new one.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        arrays: Sequence[zarr.Array],
+        p_axis: int,
+        shape: Sequence[int],
+    ) -> None:
+        self.path = path
+        self.arrays = list(arrays)
+        self.p_axis = p_axis
+        self.shape = tuple(shape)
+        self.dtype = self.arrays[0].dtype
+        self.ndim = len(self.shape)
+
+    @classmethod
+    def create(
+        cls,
+        path: str | Path,
+        p_axis: int,
+        position_shapes: Sequence[Sequence[int]],
+        dtype: str,
+        chunks: Sequence[Sequence[int]],
+        codec: Codec | None = None,
+    ) -> RaggedArray:
+        """Create one empty array per position, of `position_shapes` (without P)."""
+        arrays = [
+            create_array(f"{path}/p{i}", shape, dtype, chunk, codec=codec)
+            for i, (shape, chunk) in enumerate(zip(position_shapes, chunks))
+        ]
+        padded = list(np.max([a.shape for a in arrays], axis=0))
+        padded.insert(p_axis, len(arrays))
+        return cls(path, arrays, p_axis, padded)
+
+    def recreate(self, codec: Codec | None) -> RaggedArray:
+        """Return a new, empty, ragged array like this one, with another codec."""
+        return RaggedArray.create(
+            self.path,
+            self.p_axis,
+            [a.shape for a in self.arrays],
+            str(self.dtype),
+            [a.chunks for a in self.arrays],
+            codec,
+        )
+
+    def reopen(self, path: str | Path) -> RaggedArray:
+        """Open this ragged array, moved to `path`."""
+        arrays = [open_array(f"{path}/p{i}") for i in range(len(self.arrays))]
+        return RaggedArray(path, arrays, self.p_axis, self.shape)
+
+    def close(self) -> None:
+        for arr in self.arrays:
+            arr.store.close()
+
+    def _split(self, key: Any) -> tuple[Any, tuple, int]:
+        """Return (position key, key of the position arrays, output axis of P)."""
+        if not isinstance(key, tuple):
+            key = (key,)
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (self.ndim - len(key) + 1) + key[i + 1 :]
+        key = key + (slice(None),) * (self.ndim - len(key))
+        p = self.p_axis
+        out_axis = sum(not isinstance(k, (int, np.integer)) for k in key[:p])
+        return key[p], key[:p] + key[p + 1 :], out_axis
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        pkey, rest, out_axis = self._split(key)
+        if isinstance(pkey, (int, np.integer)):
+            return self._read(int(pkey), rest)
+        if any(isinstance(k, slice) and (k.step or 1) < 0 for k in rest):
+            return cast("np.ndarray", np.asarray(self)[key])
+        positions = range(*pkey.indices(len(self.arrays)))
+        return np.stack([self._read(i, rest) for i in positions], axis=out_axis)
+
+    def _read(self, position: int, key: tuple) -> np.ndarray:
+        """Read `key` of the position array, padded with zeros to the padded shape."""
+        arr = self.arrays[position]
+        padded = self.shape[: self.p_axis] + self.shape[self.p_axis + 1 :]
+        out_shape: list[int] = []
+        sub: list[Any] = []
+        fill: list[slice] = []
+        empty = False
+        for k, n, size in zip(key, padded, arr.shape):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                length = len(range(start, stop, step))
+                # the indices that fall inside the position array
+                inside = len(range(start, min(stop, size), step)) if start < size else 0
+                out_shape.append(length)
+                sub.append(slice(start, start + inside * step, step))
+                fill.append(slice(0, inside))
+                empty |= not inside
+            else:
+                k = int(k) + n if int(k) < 0 else int(k)
+                sub.append(k)
+                empty |= k >= size
+        out = np.zeros(out_shape, self.dtype)
+        if not empty:
+            out[tuple(fill)] = arr[tuple(sub)]
+        return out
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        pkey, rest, out_axis = self._split(key)
+        if isinstance(pkey, (int, np.integer)):
+            self.arrays[int(pkey)][rest] = value
+            return
+        positions = range(*pkey.indices(len(self.arrays)))
+        value = np.asarray(value)
+        for i, p in enumerate(positions):
+            self.arrays[p][rest] = np.take(value, i, axis=out_axis)
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        return np.asarray(self[(slice(None),) * self.ndim], dtype=dtype)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import csv
+import json
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Callable
+
+# stages of a frame through the MDA pipeline, in order
+TRACE_STAGES = ("received", "dequeued", "written", "displayed")
+# file formats of a saved trace, by extension
+TRACE_FORMATS = (".json", ".csv")
+
+# (layer name, index) of a written frame, as in the viewer updates of the writer
+FrameLabel = tuple["str | None", "tuple[int, ...]"]
+
+
+def get_trace_option(meta: dict) -> Path | bool:
+    """Return the validated "trace" option from NMM metadata.
+
+    False (the default) disables tracing, True traces the sequence, and a ".json"
+    (Chrome trace) or ".csv" path also saves the trace there when the sequence ends.
+    """
+    trace = meta.get("trace", False)
+    if isinstance(trace, bool):
+        return trace
+    if isinstance(trace, (str, Path)) and Path(trace).suffix.lower() in TRACE_FORMATS:
+        return Path(trace).expanduser()
+    raise ValueError(
+        f"trace must be True, False or a path ending in {TRACE_FORMATS}, not {trace!r}"
+    )
+
+
+class FrameTracer:
+    """Timestamps of the frames of an MDA at each stage of the pipeline.
+
+    The MDA handler records when each frame is `received` (by its `frameReady` slot,
+    in the main thread), `dequeued` and `written` (in the writer thread), and
+    `displayed` (the viewer jumped to it, in the main thread).  Frames are numbered
+    in the order they are received, which is also the order in which they are
+    dequeued and written, since the frame queue is first-in first-out.  Frames whose
+    viewer update was coalesced with a newer one are never displayed.
+
+    Each stage is recorded by a single thread, so no lock is needed.
+
+    Parameters
+    ----------
+    clock : Callable[[], float]
+        Monotonic clock, in seconds.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._start = clock()
+        self._received: list[float] = []
+        self._dequeued: list[float] = []
+        self._written: list[float] = []
+        self._labels: list[FrameLabel] = []
+        # frame number of each written (layer name, index)
+        self._frames: dict[FrameLabel, int] = {}
+        self._displayed: dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._received)
+
+    def received(self) -> None:
+        """Record that a frame was received."""
+        self._received.append(self._clock())
+
+    def dequeued(self, n: int) -> None:
+        """Record that the next `n` frames were taken from the queue."""
+        self._dequeued.extend([self._clock()] * n)
+
+    def written(self, labels: Sequence[FrameLabel]) -> None:
+        """Record that the next frames were written, at (layer name, index) `labels`."""
+        now = self._clock()
+        for label in labels:
+            self._frames[label] = len(self._written)
+            self._written.append(now)
+        self._labels.extend(labels)
+
+    def displayed(self, layer_name: str | None, index: tuple[int, ...]) -> None:
+        """Record that the viewer jumped to `index` of `layer_name`."""
+        frame = self._frames.get((layer_name, index))
+        if frame is not None and frame not in self._displayed:
+            self._displayed[frame] = self._clock()
+
+    def rows(self) -> list[dict]:
+        """Return the trace, as one dict per frame.
+
+        Each dict has the "frame" number, its "layer" and "index" (None until it is
+        written), and the time (ms since the tracer was created) of each of the
+        `TRACE_STAGES` (None if the frame didn't reach it).
+        """
+        stages = (self._received, self._dequeued, self._written)
+        rows = []
+        for frame in range(len(self._received)):
+            layer, index = (
+                self._labels[frame] if frame < len(self._labels) else (None, None)
+            )
+            row: dict = {"frame": frame, "layer": layer, "index": index}
+            for name, times in zip(TRACE_STAGES, stages):
+                row[name] = self._ms(times[frame]) if frame < len(times) else None
+            displayed = self._displayed.get(frame)
+            row["displayed"] = None if displayed is None else self._ms(displayed)
+            rows.append(row)
+        return rows
+
+    def _ms(self, t: float) -> float:
+        return (t - self._start) * 1000
+
+    def save(self, path: str | Path) -> None:
+        """Save the trace as Chrome trace events (".json") or as CSV (".csv")."""
+        path = Path(path)
+        if path.suffix.lower() == ".csv":
+            self.to_csv(path)
+        else:
+            self.to_chrome_trace(path)
+
+    def to_csv(self, path: str | Path) -> None:
+        """Save the trace as CSV, with the columns of `rows`."""
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, ["frame", "layer", "index", *TRACE_STAGES])
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def to_chrome_trace(self, path: str | Path) -> None:
+        """Save the trace as Chrome trace-event JSON (for chrome://tracing, Perfetto).
+
+        Each frame is an async track with a "queue" (received to dequeued), a "write"
+        (dequeued to written) and a "display" (written to displayed) span.
+        """
+        events = []
+        spans = list(zip(("queue", "write", "display"), TRACE_STAGES, TRACE_STAGES[1:]))
+        for row in self.rows():
+            args = {"layer": row["layer"], "index": row["index"]}
+            for name, begin, end in spans:
+                if row[begin] is None or row[end] is None:
+                    break
+                common = {"name": name, "cat": "frame", "id": row["frame"], "pid": 1}
+                # timestamps are in microseconds
+                events.append(
+                    {**common, "ph": "b", "ts": row[begin] * 1000, "args": args}
+                )
+                events.append({**common, "ph": "e", "ts": row[end] * 1000})
+        Path(path).write_text(json.dumps({"traceEvents": events}))
@@ -1,20 +1,23 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import contextlib
+from typing import TYPE_CHECKING, Callable, cast
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from pathlib import Path
 
     import useq
+    from psygnal import SignalInstance
+    from pymmcore_plus.core.events._protocol import PSignal, PSignalInstance
 
 # key in MDASequence.metadata to store napari-micromanager metadata
 # note that this is also used in napari layer metadata
 NMM_METADATA_KEY = "napari_micromanager"
-try:
-    from pymmcore_widgets.useq_widgets import PYMMCW_METADATA_KEY as PYMMCW_METADATA_KEY
-except ImportError:
-    # key in MDASequence.metadata where we expect to find pymmcore_widgets metadata
-    PYMMCW_METADATA_KEY = "pymmcore_widgets"
+# key in MDASequence.metadata where we expect to find pymmcore_widgets metadata
+# (`pymmcore_widgets.useq_widgets.PYMMCW_METADATA_KEY`, not imported from there as
+# importing pymmcore_widgets is slow)
+PYMMCW_METADATA_KEY = "pymmcore_widgets"
 
 try:
     from pymmcore_plus.mda.handlers._util import (
@@ -38,10 +41,30 @@ except ImportError:
         return tuple(main_seq_axes + sub_seq_axes)
 
 
+def connect_all(
+    connections: Iterable[tuple[PSignal | SignalInstance, Callable]],
+) -> None:
+    """Connect each `(signal, slot)` pair."""
+    for signal, slot in connections:
+        # core events are typed as `PSignal` (descriptor or instance), but they are
+        # always signal instances when accessed on `CMMCorePlus.events`
+        cast("PSignalInstance", signal).connect(slot)
+
+
+def disconnect_all(
+    connections: Iterable[tuple[PSignal | SignalInstance, Callable]],
+) -> None:
+    """Disconnect each `(signal, slot)` pair, ignoring those already disconnected."""
+    for signal, slot in connections:
+        with contextlib.suppress(TypeError, RuntimeError):
+            cast("PSignalInstance", signal).disconnect(slot)
+
+
 def ensure_unique(path: Path, extension: str = ".tif", ndigits: int = 3) -> Path:
     """Get next suitable filepath (extension = ".tif") or folderpath (extension = "").
 
-    Result is appended with a counter of ndigits.
+    Result is appended with a counter of ndigits.  Paths of the same stem with a
+    suffix after the counter (e.g. "exp_000_DAPI" for "exp") use the counter too.
     """
     p = path
     stem = p.stem
@@ -60,8 +83,11 @@ def ensure_unique(path: Path, extension: str = ".tif", ndigits: int = 3) -> Path
         else (f for f in p.parent.iterdir() if f.is_dir())
     )
     for fn in paths:
+        counter = fn.stem.rsplit("_")[-1]
+        if fn.stem.startswith(f"{stem}_"):
+            counter = fn.stem[len(stem) + 1 :].split("_")[0]
         try:
-            current_max = max(current_max, int(fn.stem.rsplit("_")[-1]))
+            current_max = max(current_max, int(counter))
         except ValueError:
             continue
 
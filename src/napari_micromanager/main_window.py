@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import atexit
-import contextlib
 import logging
 from typing import TYPE_CHECKING, Any, Callable
 from warnings import warn
@@ -10,23 +9,40 @@ import napari
 import napari.layers
 import napari.viewer
 from pymmcore_plus import CMMCorePlus
+from qtpy.QtCore import Signal  # type: ignore[attr-defined]
+from superqt.utils import create_worker, ensure_main_thread
 
+from ._config_loading import load_config, resolve_config_path
 from ._core_link import CoreViewerLink
 from ._gui_objects._toolbar import MicroManagerToolbar
+from ._util import connect_all, disconnect_all
 
 if TYPE_CHECKING:
     from pathlib import Path
 
-    from pymmcore_plus.core.events._protocol import PSignalInstance
+    from psygnal import SignalInstance
+    from pymmcore_plus.core.events._protocol import PSignal
+
+    from ._config_loading import ConfigLoadReport
+    from ._display import LiveStats
 
 
 # this is very verbose
 logging.getLogger("napari.loader").setLevel(logging.WARNING)
 logging.getLogger("in_n_out").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(MicroManagerToolbar):
-    """The main napari-micromanager widget that gets added to napari."""
+    """The main napari-micromanager widget that gets added to napari.
+
+    The `config` file is loaded in a worker thread, so the window shows up without
+    waiting for the devices to initialize.  The window is disabled until the core
+    emits `systemConfigurationLoaded`, and `configLoaded` is then emitted with a
+    `ConfigLoadReport` (also logged) of how long each device took.
+    """
+
+    configLoaded = Signal(object)
 
     def __init__(
         self, viewer: napari.viewer.Viewer, config: str | Path | None = None
@@ -38,14 +54,17 @@ class MainWindow(MicroManagerToolbar):
         # this object mediates the connection between the viewer and core events
         self._core_link = CoreViewerLink(viewer, self._mmc, self)
 
+        self._core_link.liveStatsChanged.connect(self._show_live_stats)
+
         # some remaining connections related to widgets ... TODO: unify with superclass
-        self._connections: list[tuple[PSignalInstance, Callable]] = [
+        self._connections: list[tuple[PSignal | SignalInstance, Callable]] = [
             (self.viewer.layers.events, self._update_max_min),
             (self.viewer.layers.selection.events, self._update_max_min),
             (self.viewer.dims.events.current_step, self._update_max_min),
+            (self.viewer.layers.events.removed, self._forget_max_min),
+            (self._mmc.events.systemConfigurationLoaded, self._on_config_loaded),
         ]
-        for signal, slot in self._connections:
-            signal.connect(slot)
+        connect_all(self._connections)
 
         # add minmax dockwidget
         if "MinMax" not in getattr(self.viewer.window, "dock_widgets", []):
@@ -57,19 +76,61 @@ class MainWindow(MicroManagerToolbar):
 
         if config is not None:
             try:
-                self._mmc.loadSystemConfiguration(config)
+                path = resolve_config_path(self._mmc, config)
             except FileNotFoundError:
                 # don't crash if the user passed an invalid config
                 warn(f"Config file {config} not found. Nothing loaded.", stacklevel=2)
+            else:
+                self._load_config(path)
+
+    def _load_config(self, path: Path) -> None:
+        """Load the configuration `path` in a worker thread."""
+        self.setEnabled(False)
+        self._config_worker = create_worker(
+            load_config,
+            self._mmc,
+            path,
+            _start_thread=True,
+            _connect={
+                "returned": self._on_config_report,
+                "errored": self._on_config_error,
+            },
+        )
+
+    # the config is loaded in a worker thread, which emits systemConfigurationLoaded
+    @ensure_main_thread
+    def _on_config_loaded(self) -> None:
+        self.setEnabled(True)
+
+    def _on_config_report(self, report: ConfigLoadReport) -> None:
+        logger.info(report.summary())
+        self.configLoaded.emit(report)
+
+    def _on_config_error(self, exc: Exception) -> None:
+        self.setEnabled(True)
+        warn(f"Loading the config file failed: {exc!r}", stacklevel=2)
 
     def _cleanup(self) -> None:
-        for signal, slot in self._connections:
-            with contextlib.suppress(TypeError, RuntimeError):
-                signal.disconnect(slot)
+        disconnect_all(self._connections)
+        self.minmax.cleanup()
         # Clean up temporary files we opened.
         self._core_link.cleanup()
         atexit.unregister(self._cleanup)  # doesn't raise if not connected
 
+    def _show_live_stats(self, stats: LiveStats | None) -> None:
+        label = self.live_stats_label
+        if stats is None:
+            label.hide()
+            return
+        label.setText(
+            f"{stats.camera_fps:.1f} / {stats.display_fps:.1f} fps"
+            f" ({stats.skipped} skipped)"
+        )
+        label.show()
+
+    def _forget_max_min(self, event: Any) -> None:
+        self.minmax.forget(event.value)
+
     def _update_max_min(self, *_: Any) -> None:
         visible = (x for x in self.viewer.layers.selection if x.visible)
         self.minmax.update_from_layers(
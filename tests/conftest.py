@@ -4,7 +4,7 @@ import itertools
 import logging
 from contextlib import suppress
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable
 
 import napari
 import pytest
@@ -17,6 +17,10 @@ from napari_micromanager.main_window import MainWindow
 if TYPE_CHECKING:
     from collections.abc import Iterator
 
+    from pytestqt.qtbot import QtBot
+
+    from napari_micromanager._mda_handler import _NapariMDAHandler
+
 # Prevent ipykernel debug logs from causing formatting errors in pytest
 logging.getLogger("ipykernel.inprocess.ipkernel").setLevel(logging.ERROR)
 
@@ -46,6 +50,19 @@ def main_window(core: CMMCorePlus, napari_viewer: napari.Viewer) -> MainWindow:
     return win
 
 
+@pytest.fixture
+def wait_for_writer(qtbot: QtBot) -> Callable[[_NapariMDAHandler], None]:
+    """Return a function waiting until the handler wrote the frames of its last MDA.
+
+    The writer thread writes the frames left in the queue after the MDA finished.
+    """
+
+    def _wait(handler: _NapariMDAHandler) -> None:
+        qtbot.waitUntil(lambda: not handler._writing, timeout=20000)
+
+    return _wait
+
+
 TIME_PLANS = (None, useq.TIntervalLoops(loops=3, interval=0.250))
 Z_PLANS = (None, useq.ZRangeAround(range=3, step=0.5))
 CHANNEL_PLANS = (
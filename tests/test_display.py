@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+import useq
+
+from napari_micromanager._display import (
+    LIVE_STATS_PERIOD,
+    DisplayGovernor,
+    LiveClock,
+    decimate,
+    decimation_factor,
+    decimation_transform,
+    get_display_rate,
+)
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pytestqt.qtbot import QtBot
+
+    from napari_micromanager.main_window import MainWindow
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_display_governor_coalesces() -> None:
+    clock = _Clock()
+    gov = DisplayGovernor(10, clock=clock)
+
+    gov.submit(("a", (0,)))
+    # first update of a layer: visible right away, and the jump is due
+    assert gov.pop_due() == [("a", None), ("a", (0,))]
+
+    gov.submit(("a", (1,)))
+    gov.submit(("a", (2,)))
+    assert gov.due_in() == pytest.approx(0.1)
+    assert gov.pop_due() == []
+
+    clock.now = 0.1
+    assert gov.pop_due() == [("a", (2,))]
+    assert gov.due_in() is None
+
+    gov.submit(("a", (3,)))
+    gov.submit(("b", None))
+    assert gov.flush() == [("b", None), ("a", (3,))]
+
+    stats = gov.stats()
+    assert (stats.submitted, stats.displayed, stats.coalesced) == (4, 3, 1)
+
+
+def test_display_governor_unlimited() -> None:
+    gov = DisplayGovernor(0, clock=_Clock())
+    for i in range(3):
+        gov.submit(("a", (i,)))
+        assert gov.pop_due()[-1] == ("a", (i,))
+
+
+def test_invalid_display_rate() -> None:
+    with pytest.raises(ValueError, match="must be"):
+        get_display_rate({"display_rate": -5})
+
+
+def test_mda_display_rate(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 20, "interval": 0},
+        metadata={NMM_METADATA_KEY: {"display_rate": 1, "write_batch_size": 1}},
+    )
+    main_window._mmc.mda.run(mda)
+
+    handler = main_window._core_link._mda_handler
+    wait_for_writer(handler)
+    stats = handler.display_stats()
+    assert stats.acquired == 20
+    assert stats.displayed < stats.acquired
+    assert stats.displayed + stats.coalesced <= stats.submitted
+    # no frame is lost
+    assert handler.writer_stats().frames == 20
+    assert main_window.viewer.layers[-1].data[19].any()
+
+
+def test_live_clock() -> None:
+    clock = _Clock()
+    live = LiveClock(20, clock=clock)
+    assert live.interval_ms == 50
+
+    assert not live.tick(0)
+    assert live.tick(3)  # three new frames: show the last one
+    live.rendered(0.01)
+    assert not live.tick(3)  # nothing new
+    assert live.tick(1)  # the buffer was cleared
+    live.rendered(0.01)
+
+    assert live.update_stats() is None
+    clock.now = LIVE_STATS_PERIOD
+    stats = live.update_stats()
+    assert stats is not None
+    assert stats.camera_fps == pytest.approx(4 / LIVE_STATS_PERIOD)
+    assert stats.display_fps == pytest.approx(2 / LIVE_STATS_PERIOD)
+    assert (stats.displayed, stats.skipped) == (2, 2)
+
+    # rendering slower than the target rate stretches the interval
+    live.rendered(0.2)
+    live.rendered(0.2)
+    assert live.interval_ms > 50
+
+    with pytest.raises(ValueError, match="must be"):
+        LiveClock(0)
+
+
+def test_live_display(main_window: MainWindow, qtbot: QtBot) -> None:
+    link = main_window._core_link
+    link.live_fps = 50
+    mmc = main_window._mmc
+    mmc.setExposure(1)
+    # let the exposure change go through before starting live mode
+    qtbot.wait(50)
+
+    with qtbot.waitSignal(
+        link.liveStatsChanged, timeout=5000, check_params_cb=lambda s: s is not None
+    ) as blocker:
+        mmc.startContinuousSequenceAcquisition()
+    try:
+        stats = blocker.args[0]
+        assert stats.displayed > 0
+        # the display does not follow the 1 ms exposure
+        assert stats.display_fps < 100
+        assert not main_window.live_stats_label.isHidden()
+        assert "fps" in main_window.live_stats_label.text()
+        assert "preview" in main_window.viewer.layers
+    finally:
+        mmc.stopSequenceAcquisition()
+    assert main_window.live_stats_label.isHidden()
+
+
+@pytest.mark.parametrize(
+    "zoom, factor", [(2.0, 1), (1.0, 1), (0.5, 2), (0.3, 2), (0.2, 4), (0.0, 1)]
+)
+def test_decimation_factor(zoom: float, factor: int) -> None:
+    assert decimation_factor(zoom) == factor
+
+
+def test_decimate() -> None:
+    image = np.arange(35, dtype="u2").reshape(5, 7)
+    assert decimate(image, 1) is image
+    assert decimate(image, 2, "off") is image
+    np.testing.assert_array_equal(decimate(image, 2, "stride"), image[::2, ::2])
+    mean = decimate(image, 2, "mean")
+    assert mean.shape == (2, 3)
+    assert mean.dtype == image.dtype
+    assert mean[0, 0] == (0 + 1 + 7 + 8) // 4
+
+    rgb = np.ones((6, 4, 3), dtype="u1")
+    assert decimate(rgb, 2, "mean", rgb=True).shape == (3, 2, 3)
+
+    assert decimation_transform(4, "mean", 0.5) == (2.0, 0.75)
+    assert decimation_transform(4, "stride", 0.5) == (2.0, 0.0)
+
+
+def test_live_decimation(main_window: MainWindow) -> None:
+    link = main_window._core_link
+    with pytest.raises(ValueError, match="must be"):
+        link.live_decimation = "bin"  # type: ignore[assignment]
+    link.live_decimation = "mean"
+    assert link._decimation_factor() == 1  # no preview layer yet
+
+    pix = main_window._mmc.getPixelSizeUm() or 1.0
+    image = np.zeros((64, 64), dtype="u2")
+    link._update_viewer(image)
+    layer = main_window.viewer.layers["preview"]
+    main_window.viewer.camera.zoom = 0.25 / pix
+    assert link._decimation_factor() == 4
+
+    link._update_viewer(decimate(image, 4, "mean"), 4)
+    assert tuple(layer.scale) == (4 * pix, 4 * pix)
+    assert tuple(layer.translate) == (1.5 * pix, 1.5 * pix)
+    assert layer.data.shape == (16, 16)
+
+    # back to full resolution
+    link._update_viewer(image)
+    assert tuple(layer.scale) == (pix, pix)
+    assert tuple(layer.translate) == (0, 0)
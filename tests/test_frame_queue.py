@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pytest
+import useq
+
+from napari_micromanager._frame_queue import FrameQueue
+from napari_micromanager._mda_handler import (
+    _FrameRouter,
+    _group_slabs,
+    _id_idx_layer,
+    _NapariMDAHandler,
+)
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import napari
+    from pymmcore_plus import CMMCorePlus
+
+EVENT = useq.MDAEvent()
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full((4, 4), value, dtype=np.uint16)
+
+
+def _drain(q: FrameQueue) -> list[int]:
+    out = []
+    while (item := q.get_nowait()) is not None:
+        out.append(int(item[0][0, 0]))
+    return out
+
+
+def test_frame_queue_fifo() -> None:
+    q = FrameQueue()
+    for i in range(5):
+        q.put(_frame(i), EVENT)
+    q.close()
+
+    assert q.wait()
+    assert _drain(q) == [0, 1, 2, 3, 4]
+    assert not q.wait()
+
+    stats = q.stats()
+    assert stats.put_count == stats.get_count == 5
+    assert stats.peak_depth == 5
+    assert stats.depth == 0
+
+
+def test_frame_queue_wakes_consumer() -> None:
+    q = FrameQueue()
+    received: list[int] = []
+    got_frame = threading.Event()
+
+    def _consume() -> None:
+        while q.wait():
+            received.extend(_drain(q))
+            got_frame.set()
+
+    thread = threading.Thread(target=_consume)
+    thread.start()
+    q.put(_frame(1), EVENT)
+    assert got_frame.wait(timeout=5)
+    q.close()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert received == [1]
+
+
+@pytest.mark.parametrize("overflow", ["spill", "unbounded"])
+def test_frame_queue_overflow(overflow: str) -> None:
+    q = FrameQueue(maxsize=2, overflow=overflow)  # type: ignore[arg-type]
+    for i in range(4):
+        q.put(_frame(i), EVENT)
+
+    assert q.stats().spilled == 2
+    assert len(q) == 4
+    spill_dir = q._spill_dir
+    assert (spill_dir is not None) == (overflow == "spill")
+    # spilled frames come back in order
+    assert _drain(q) == [0, 1, 2, 3]
+    q.cleanup()
+    assert spill_dir is None or not spill_dir.exists()
+
+
+def test_frame_queue_spills_in_background(monkeypatch: pytest.MonkeyPatch) -> None:
+    saved_by: list[threading.Thread] = []
+    save = np.save
+
+    def _save(*args: Any) -> None:
+        saved_by.append(threading.current_thread())
+        save(*args)
+
+    monkeypatch.setattr(np, "save", _save)
+    q = FrameQueue(maxsize=1)
+    for i in range(3):
+        q.put(_frame(i), EVENT)
+
+    # `put` returned before the frames were written to disk, by the spill thread
+    deadline = time.perf_counter() + 5
+    while len(saved_by) < 2 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert len(saved_by) == 2
+    assert threading.current_thread() not in saved_by
+    assert _drain(q) == [0, 1, 2]
+    q.cleanup()
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"overflow": "drop"}, {"maxsize": -1}, {"maxsize": None}]
+)
+def test_frame_queue_invalid(kwargs: dict) -> None:
+    with pytest.raises(ValueError):
+        FrameQueue(**kwargs)
+
+
+def test_handler_writes_in_order(
+    napari_viewer: napari.Viewer,
+    core: CMMCorePlus,
+    wait_for_writer: Callable[..., None],
+) -> None:
+    written: list[dict] = []
+    threads: set[int] = set()
+
+    class _Handler(_NapariMDAHandler):
+        def _process_frames(self, frames):  # type: ignore[no-untyped-def]
+            written.extend(dict(event.index) for _, event in frames)
+            threads.add(threading.get_ident())
+            return super()._process_frames(frames)
+
+    handler = _Handler(core, napari_viewer)
+    acquired: list[tuple[dict, np.ndarray]] = []
+    core.mda.events.frameReady.connect(
+        lambda img, event: acquired.append((dict(event.index), img))
+    )
+
+    meta = {"queue_size": 1, "queue_overflow": "spill"}
+    sequence = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        z_plan={"range": 2, "step": 1},
+        metadata={NMM_METADATA_KEY: meta},
+    )
+    core.mda.run(sequence)
+    wait_for_writer(handler)
+
+    try:
+        assert handler._queue.maxsize == 1
+        assert handler._queue.overflow == "spill"
+        assert written == [idx for idx, _ in acquired]
+        # even the frames left at the end of the MDA are written by the writer thread
+        assert threading.main_thread().ident not in threads
+        stats = handler.queue_stats()
+        assert stats.put_count == stats.get_count == len(acquired) == 9
+        assert stats.depth == 0
+
+        data = napari_viewer.layers[-1].data
+        for idx, img in acquired:
+            np.testing.assert_array_equal(data[idx["t"], idx["z"]], img)
+    finally:
+        handler._cleanup()
+
+
+@pytest.mark.parametrize(
+    "meta",
+    [
+        {"queue_overflow": "drop"},
+        {"queue_size": -1},
+        {"write_batch_size": 0},
+        {"write_batch_latency": -1},
+    ],
+)
+def test_handler_invalid_queue_meta(
+    napari_viewer: napari.Viewer, core: CMMCorePlus, meta: dict
+) -> None:
+    handler = _NapariMDAHandler(core, napari_viewer)
+    sequence = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0}, metadata={NMM_METADATA_KEY: meta}
+    )
+    with pytest.raises(ValueError, match="must be"):
+        handler._on_mda_started(sequence)
+    handler._cleanup()
+
+
+def test_group_slabs() -> None:
+    seq = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0}, z_plan={"range": 2, "step": 1}
+    )
+    frames = [(_frame(i), event) for i, event in enumerate(seq)]
+    # drop one plane to break the second Z stack in two
+    del frames[4]
+    slabs = [s for s, *_ in _group_slabs(frames)]
+    uid = str(seq.uid)
+    assert slabs == [(uid, 1)] * 3 + [(uid, 2)] + [(uid, 3)]
+
+
+@pytest.mark.parametrize(
+    "seq",
+    [
+        useq.MDASequence(
+            time_plan={"loops": 2, "interval": 0}, z_plan={"range": 2, "step": 1}
+        ),
+        useq.MDASequence(
+            channels=["DAPI", "FITC"],
+            z_plan={"range": 2, "step": 1},
+            metadata={NMM_METADATA_KEY: {"split_channels": True}},
+        ),
+        useq.MDASequence(
+            channels=["DAPI", "FITC"],
+            stage_positions=[
+                {"x": 0, "y": 0},
+                {
+                    "x": 1,
+                    "y": 1,
+                    "sequence": {"grid_plan": {"rows": 2, "columns": 1}},
+                },
+            ],
+            metadata={NMM_METADATA_KEY: {"split_channels": True}},
+        ),
+    ],
+)
+def test_frame_router(seq: useq.MDASequence) -> None:
+    router = _FrameRouter(seq)
+    for event in seq:
+        assert router.route(event) == _id_idx_layer(event)
+    # events of another sequence are still routed
+    other = next(iter(useq.MDASequence(time_plan={"loops": 1, "interval": 0})))
+    assert router.route(other) == _id_idx_layer(other)
+
+
+def test_handler_batched_writes(
+    napari_viewer: napari.Viewer,
+    core: CMMCorePlus,
+    wait_for_writer: Callable[..., None],
+) -> None:
+    n_writes: list[int] = []
+
+    class _Handler(_NapariMDAHandler):
+        def _process_frames(self, frames):  # type: ignore[no-untyped-def]
+            results = super()._process_frames(frames)
+            n_writes.append(len(results))
+            return results
+
+    handler = _Handler(core, napari_viewer)
+    acquired: list[tuple[dict, np.ndarray]] = []
+    core.mda.events.frameReady.connect(
+        lambda img, event: acquired.append((dict(event.index), img))
+    )
+    # one batch can hold a whole Z stack, and the writer waits for it to fill up
+    meta = {"write_batch_size": 5, "write_batch_latency": 5}
+    sequence = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0},
+        z_plan={"range": 4, "step": 1},
+        metadata={NMM_METADATA_KEY: meta},
+    )
+    core.mda.run(sequence)
+    wait_for_writer(handler)
+
+    try:
+        # fewer slab writes than frames
+        assert sum(n_writes) < len(acquired) == 10
+        data = napari_viewer.layers[-1].data
+        for idx, img in acquired:
+            np.testing.assert_array_equal(data[idx["t"], idx["z"]], img)
+    finally:
+        handler._cleanup()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+import useq
+
+from napari_micromanager._frame_stats import (
+    FRAME_STATS_BINS,
+    FrameStats,
+)
+from napari_micromanager._gui_objects._min_max_widget import _frame_minmax
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from napari_micromanager.main_window import MainWindow
+
+
+@pytest.mark.parametrize("dtype", ["u1", "u2", "u4"])
+def test_frame_stats(dtype: str) -> None:
+    rng = np.random.default_rng(0)
+    stats = FrameStats((2, 3), dtype)
+    assert stats.minmax((0, 0)) is None
+    assert stats.histogram((0, 0)) is None
+
+    frame = rng.integers(10, 200, (64, 48)).astype(dtype)
+    stats.update((1, 2), frame)
+    assert stats.minmax((1, 2)) == (frame.min(), frame.max())
+    low, high = stats.percentiles((1, 2))  # type: ignore[misc]
+    assert low == pytest.approx(np.percentile(frame, 1), abs=2)
+    assert high == pytest.approx(np.percentile(frame, 99), abs=2)
+    hist = stats.histogram((1, 2))
+    assert hist is not None
+    assert hist.shape == (FRAME_STATS_BINS,)
+    assert hist.sum() == frame.size
+    expected, _ = np.histogram(frame, stats.bin_edges)
+    np.testing.assert_array_equal(hist, expected)
+
+    # a slab of frames, as written by the MDA handler
+    stack = rng.integers(0, 100, (3, 8, 8)).astype(dtype)
+    stats.update((0, slice(0, 3)), stack)
+    for i, frame in enumerate(stack):
+        assert stats.minmax((0, i)) == (frame.min(), frame.max())
+
+
+def test_frame_stats_rgb_and_sampling() -> None:
+    stats = FrameStats((1,), "u1")
+    frame = np.zeros((1024, 1024, 3), "u1")
+    frame[3, 5, 1] = 255
+    stats.update((0,), frame)
+    # min and max are exact even though the histogram is from a subsample
+    assert stats.minmax((0,)) == (0, 255)
+    assert stats.percentiles((0,)) == (0, 0)
+
+    with pytest.raises(ValueError, match="must be"):
+        FrameStats((1,), "f4")
+
+
+def test_frame_stats_bit_depth() -> None:
+    # a 12-bit camera: the bins cover 0-4095, not the whole uint16 range
+    stats = FrameStats((1,), "u2", bit_depth=12)
+    assert stats.bin_edges[-1] == 4096
+    frame = np.arange(4096, dtype="u2").reshape(64, 64)
+    stats.update((0,), frame)
+    hist = stats.histogram((0,))
+    assert hist is not None
+    np.testing.assert_array_equal(hist, 4096 // FRAME_STATS_BINS)
+    # out of range values are counted in the last bin
+    frame[0, 0] = 60000
+    stats.update((0,), frame)
+    hist = stats.histogram((0,))
+    assert hist is not None
+    assert hist.sum() == frame.size
+    assert hist[-1] == 4096 // FRAME_STATS_BINS + 1
+    # no (or an impossible) bit depth: the dtype range
+    assert FrameStats((1,), "u1").bin_edges[-1] == 256
+    assert FrameStats((1,), "u1", bit_depth=16).bin_edges[-1] == 256
+
+
+def test_mda_frame_stats(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0},
+        z_plan={"range": 3, "step": 1},
+        metadata={NMM_METADATA_KEY: {"write_batch_size": 4}},
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = main_window.viewer.layers[-1]
+    stats = layer.metadata[NMM_METADATA_KEY]["frame_stats"]
+    data = np.asarray(layer.data)
+    for index in np.ndindex(data.shape[:-2]):
+        assert stats.minmax(index) == (data[index].min(), data[index].max())
+
+    main_window.viewer.dims.current_step = (1, 2, 0, 0)
+    assert _frame_minmax(layer) == stats.minmax((1, 2))
+    main_window.minmax.update_from_layers([layer])
+    assert str(stats.minmax((1, 2))) in main_window.minmax._label.text()
+
+
+def test_mda_contrast_limits(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mmc = main_window._mmc
+    mmc.setProperty("Camera", "BitDepth", "12")
+    mda = useq.MDASequence(time_plan={"loops": 3, "interval": 0})
+    mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = main_window.viewer.layers[-1]
+    stats = layer.metadata[NMM_METADATA_KEY]["frame_stats"]
+    assert stats.bit_depth == 12
+    # set from the outer percentiles of the first shown frame
+    assert tuple(layer.contrast_limits_range) == (0, 4095)
+    low, high = layer.contrast_limits
+    data = np.asarray(layer.data)
+    assert data.min() <= low < high <= data.max()
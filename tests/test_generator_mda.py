@@ -2,18 +2,25 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+import zarr
 from useq import MDAEvent
 
+from napari_micromanager._storage import GrowingArray
+
 if TYPE_CHECKING:
-    from collections.abc import Iterator
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
 
     from pytestqt.qtbot import QtBot
 
     from napari_micromanager.main_window import MainWindow
 
 
-def test_generator_mda_does_not_crash(main_window: MainWindow, qtbot: QtBot) -> None:
-    """Running an MDA from a generator should not crash the handler."""
+def test_generator_mda_without_index(
+    main_window: MainWindow, qtbot: QtBot, wait_for_writer: Callable[..., None]
+) -> None:
+    """Frames of events without an index are appended along a "frame" axis."""
 
     def _events() -> Iterator[MDAEvent]:
         yield MDAEvent(exposure=5)
@@ -22,11 +29,58 @@ def test_generator_mda_does_not_crash(main_window: MainWindow, qtbot: QtBot) ->
     mmc = main_window._mmc
     with qtbot.waitSignal(mmc.mda.events.sequenceFinished, timeout=5000):
         mmc.run_mda(_events())
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layers = [lr for lr in main_window.viewer.layers if lr.name.startswith("Exp_")]
+    assert len(layers) == 1
+    assert layers[0].data.shape == (2, 512, 512)
+    assert layers[0].visible
+    assert main_window.viewer.dims.axis_labels[-3:] == ("frame", "y", "x")
+    assert np.asarray(layers[0].data).any(axis=(1, 2)).all()
+
+
+def test_generator_mda_grows(
+    main_window: MainWindow, qtbot: QtBot, wait_for_writer: Callable[..., None]
+) -> None:
+    """Arrays of generator MDAs grow along the axes of the event indices."""
+
+    def _events() -> Iterator[MDAEvent]:
+        for t in range(3):
+            for z in range(2):
+                yield MDAEvent(index={"z": z, "t": t}, exposure=1)
+
+    mmc = main_window._mmc
+    with qtbot.waitSignal(mmc.mda.events.sequenceFinished, timeout=5000):
+        mmc.run_mda(_events())
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = next(lr for lr in main_window.viewer.layers if lr.name.startswith("Exp_"))
+    data = layer.data
+    assert isinstance(data, GrowingArray)
+    assert data.shape == (3, 2, 512, 512)
+    # the store was trimmed to the acquired frames
+    assert data.array.shape == (3, 2, 512, 512)
+    assert main_window.viewer.dims.axis_labels == ("t", "z", "y", "x")
+    assert main_window.viewer.dims.nsteps[:2] == (3, 2)
+    assert np.asarray(data).any(axis=(2, 3)).all()
 
-    # No zarr-backed MDA layers should have been created.
-    layer_names = [layer.name for layer in main_window.viewer.layers]
-    assert all("Exp_" not in n for n in layer_names)
 
-    # The acquired frames should still be visible in the preview layer.
-    assert "preview" in layer_names
-    assert main_window.viewer.layers["preview"].data.shape == (512, 512)
+def test_growing_array(tmp_path: Path) -> None:
+    z = zarr.open(str(tmp_path / "a.zarr"), mode="w", shape=(1, 1, 4, 4), dtype="u2")
+    arr = GrowingArray(z, 2)
+    assert arr.shape == (0, 0, 4, 4)
+    arr[0, 0] = np.ones((4, 4))
+    assert arr.shape == (1, 1, 4, 4)
+    arr[2, 1] = np.full((4, 4), 2)
+    assert arr.shape == (3, 2, 4, 4)
+    # the capacity doubles, so few resizes are needed
+    assert z.shape == (3, 2, 4, 4)
+    arr[3, slice(0, 2)] = np.full((2, 4, 4), 3)
+    assert arr.shape == (4, 2, 4, 4)
+    assert z.shape == (6, 2, 4, 4)
+    assert np.asarray(arr).shape == (4, 2, 4, 4)
+    np.testing.assert_array_equal(arr[2, 1], 2)
+    np.testing.assert_array_equal(arr[0, 0], 1)
+    arr.trim()
+    assert z.shape == (4, 2, 4, 4)
+    np.testing.assert_array_equal(z[3], 3)
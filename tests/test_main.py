@@ -1,4 +1,10 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 from unittest.mock import patch
 
 import pytest
@@ -6,6 +12,9 @@ from pymmcore_plus import CMMCorePlus
 
 from napari_micromanager.__main__ import main
 
+if TYPE_CHECKING:
+    from pytestqt.qtbot import QtBot
+
 
 @pytest.mark.parametrize(
     "argv",
@@ -15,7 +24,7 @@ from napari_micromanager.__main__ import main
         ["-c", "nonexistent"],
     ],
 )
-def test_cli_main(argv: list) -> None:
+def test_cli_main(argv: list, qtbot: QtBot) -> None:
     import napari
     from napari.qt import QtViewer
 
@@ -31,8 +40,74 @@ def test_cli_main(argv: list) -> None:
     mock_show.assert_called_once()
 
     if argv and "test_config" in argv[-1]:
-        assert len(CMMCorePlus.instance().getLoadedDevices()) > 1
+        # loaded in a worker thread
+        qtbot.waitUntil(lambda: len(CMMCorePlus.instance().getLoadedDevices()) > 1)
 
     # this is to prevent a leaked widget error in the NEXT test
     napari.current_viewer().close()
     QtViewer._instances.clear()
+
+
+def test_cli_profile_startup(capsys: pytest.CaptureFixture) -> None:
+    import napari
+    from napari.qt import QtViewer
+
+    with patch("napari.run"), patch("qtpy.QtWidgets.QMainWindow.show"):
+        main(["--profile-startup"])
+
+    out = capsys.readouterr().out
+    for phase in ("import napari", "create MainWindow", "total"):
+        assert phase in out
+
+    napari.current_viewer().close()
+    QtViewer._instances.clear()
+
+
+COLD_START = """
+import sys
+import napari_micromanager
+assert "napari" not in sys.modules
+import napari
+from napari_micromanager import MainWindow
+viewer = napari.Viewer(show=False)
+MainWindow(viewer)
+print(sorted(m for m in sys.modules if m.startswith("pymmcore_widgets")))
+viewer.close()
+"""
+
+
+def test_cold_start_imports() -> None:
+    """Guard the startup time: creating the main window must stay import-light.
+
+    The pymmcore_widgets toolbar widgets are only imported and built when shown,
+    and importing the package doesn't import napari.
+    """
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen"}
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START], capture_output=True, text=True, env=env
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_cli_run_headless(
+    qtbot: QtBot, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    import useq
+
+    from napari_micromanager._storage import open_array
+
+    seq = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0}, z_plan={"range": 2, "step": 1}
+    )
+    seq_path = tmp_path / "seq.yaml"
+    seq_path.write_text(seq.yaml())
+    config = str(Path(__file__).parent / "test_config.cfg")
+    out = tmp_path / "out"
+    main(["run", "--config", config, "--sequence", str(seq_path), "--out", str(out)])
+
+    assert "Wrote 9/9 frames" in capsys.readouterr().out
+    (store,) = out.iterdir()
+    data = open_array(store)
+    assert data.shape[:2] == (3, 3)
+    assert data[-1, -1].any()
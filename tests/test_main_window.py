@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import threading
+from pathlib import Path
 from typing import TYPE_CHECKING
 from unittest.mock import MagicMock
 
+import numpy as np
+import pytest
 import useq
+from qtpy.QtWidgets import QWidget
 
+from napari_micromanager._config_loading import ConfigLoadReport, device_init_times
 from napari_micromanager.main_window import MainWindow
 
 if TYPE_CHECKING:
@@ -46,3 +52,91 @@ def test_preview_while_mda(main_window: MainWindow, qtbot: QtBot):
 
     layers = [layer.name for layer in viewer.layers]
     assert "preview" not in layers
+
+
+def test_preview_buffer_reused(main_window: MainWindow) -> None:
+    link = main_window._core_link
+    mmc = main_window._mmc
+    frame = np.ones((32, 32), dtype="uint16")
+
+    link._update_viewer(frame)
+    layer = main_window.viewer.layers["preview"]
+    buffer = layer.data
+    layer.scale = (7, 7)
+
+    # same shape and dtype: updated in place, the scale isn't touched
+    link._update_viewer(frame * 2)
+    assert layer.data is buffer
+    assert buffer[0, 0] == 2
+    assert tuple(layer.scale) == (7, 7)
+
+    # a change of ROI/binning needs a new buffer
+    link._update_viewer(np.zeros((16, 16), dtype="uint16"))
+    assert layer.data is not buffer
+    assert layer.data.shape == (16, 16)
+
+    # a pixel size change is applied with the next frame
+    mmc.setPixelSizeUm(mmc.getCurrentPixelSizeConfig(), 0.5)
+    link._update_viewer(np.zeros((16, 16), dtype="uint16"))
+    assert tuple(layer.scale) == (0.5, 0.5)
+
+
+def test_toolbars_built_when_shown(qtbot: QtBot, core: CMMCorePlus) -> None:
+    from pymmcore_widgets import SnapButton
+
+    from napari_micromanager._gui_objects._toolbar import MMToolBar
+
+    wdg = MainWindow(MagicMock())
+    qtbot.addWidget(wdg)
+    toolbars = wdg.findChildren(MMToolBar)
+    assert toolbars
+    assert not any(tb._populated for tb in toolbars)
+    assert wdg.findChild(SnapButton) is None
+
+    wdg.show()
+    assert all(tb._populated for tb in toolbars)
+    assert wdg.findChild(SnapButton) is not None
+
+
+def test_config_loaded_in_worker(
+    qtbot: QtBot, core: CMMCorePlus, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    threads = []
+
+    def _set_enabled(self: MainWindow, enabled: bool) -> None:
+        threads.append(threading.current_thread())
+        QWidget.setEnabled(self, enabled)
+
+    monkeypatch.setattr(MainWindow, "setEnabled", _set_enabled)
+    wdg = MainWindow(MagicMock(), config=Path(__file__).parent / "test_config.cfg")
+    qtbot.addWidget(wdg)
+    # disabled until the devices are initialized
+    assert not wdg.isEnabled()
+
+    with qtbot.waitSignal(wdg.configLoaded) as blocker:
+        pass
+    report = blocker.args[0]
+    assert isinstance(report, ConfigLoadReport)
+    assert report.summary().startswith("Loaded test_config.cfg")
+    assert set(report.devices) <= set(core.getLoadedDevices())
+    qtbot.waitUntil(wdg.isEnabled)
+    # the systemConfigurationLoaded slot ran in the main thread
+    assert threads and all(t is threading.main_thread() for t in threads)
+
+
+def test_device_init_times() -> None:
+    log = """\
+2024-01-01T10:00:00.000000 tid1 [IFO,Core] Will initialize 3 devices
+2024-01-01T10:00:00.100000 tid2 [IFO,Core] Will initialize device Camera
+2024-01-01T10:00:00.150000 tid3 [IFO,Core] Will initialize device Stage
+2024-01-01T10:00:00.200000 tid3 [IFO,Core] Did initialize device Stage
+2024-01-01T10:00:01.100000 tid2 [IFO,Core] Did initialize device Camera
+2024-01-01T10:00:01.200000 tid2 [IFO,Core] Will initialize device Other
+2024-01-01T10:00:01.300000 tid2 [IFO,Core] Did initialize device Other
+"""
+    times = device_init_times(log, ("Camera", "Stage"))
+    # slowest first
+    assert list(times) == ["Camera", "Stage"]
+    assert times["Camera"] == pytest.approx(1.0)
+    assert times["Stage"] == pytest.approx(0.05)
+    assert len(device_init_times(log)) == 3
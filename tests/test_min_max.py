@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from napari_micromanager._gui_objects._min_max_widget import _data_range
+
+if TYPE_CHECKING:
+    from pytestqt.qtbot import QtBot
+
+    from napari_micromanager.main_window import MainWindow
+
+
+def test_data_range_sampling() -> None:
+    data = np.zeros((100, 100), "u2")
+    data[1, 1] = 10
+    assert _data_range(data, rgb=False) == (0, 10)
+    # the sampled grid misses the only non-zero pixel
+    assert _data_range(data, rgb=False, sample_size=100) == (0, 0)
+    rgb = np.zeros((100, 100, 3), "u1")
+    rgb[0, 0, 2] = 7
+    assert _data_range(rgb, rgb=True, sample_size=100) == (0, 7)
+
+
+def test_minmax_background(main_window: MainWindow, qtbot: QtBot) -> None:
+    viewer = main_window.viewer
+    minmax = main_window.minmax
+    data = np.arange(5 * 64 * 64, dtype="u2").reshape(5, 64, 64)
+    layer = viewer.add_image(data)
+    label = minmax._label
+
+    viewer.dims.current_step = (3, 0, 0)
+    minmax.update_from_layers([layer])
+    expected = str((int(data[3].min()), int(data[3].max())))
+    qtbot.waitUntil(lambda: expected in label.text())
+    key = (minmax._tokens[layer], (3,))
+    assert key in minmax._cache
+
+    # only the latest slice is shown, even if an older result comes in later
+    viewer.dims.current_step = (1, 0, 0)
+    minmax.update_from_layers([layer])
+    viewer.dims.current_step = (2, 0, 0)
+    minmax.update_from_layers([layer])
+    expected = str((int(data[2].min()), int(data[2].max())))
+    qtbot.waitUntil(lambda: expected in label.text())
+    qtbot.wait(20)
+    assert expected in label.text()
+
+    # cached slices are shown right away
+    viewer.dims.current_step = (3, 0, 0)
+    minmax.update_from_layers([layer])
+    assert str((int(data[3].min()), int(data[3].max()))) in label.text()
+
+    # new data drops the cached ranges
+    layer.data = data + 1
+    assert key not in minmax._cache
+
+
+def test_minmax_forgets_removed_layers(main_window: MainWindow, qtbot: QtBot) -> None:
+    viewer = main_window.viewer
+    minmax = main_window.minmax
+    data = np.arange(3 * 32 * 32, dtype="u2").reshape(3, 32, 32)
+    layer = viewer.add_image(data)
+    minmax.update_from_layers([layer])
+    key = minmax._cache_key(layer)
+    qtbot.waitUntil(lambda: key in minmax._cache)
+
+    viewer.layers.remove(layer)
+    assert key not in minmax._cache
+    assert layer not in minmax._tokens
+    # a new layer never gets the cached ranges of an old one
+    new = viewer.add_image(data + 1)
+    minmax.update_from_layers([new])
+    assert minmax._tokens[new] != key[0]
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import useq
+
+from napari_micromanager._mosaic import (
+    CanvasView,
+    Mosaic,
+    TiledCanvas,
+    get_mosaic_option,
+    in_mosaic,
+)
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from napari_micromanager._mda_handler import _NapariMDAHandler
+    from napari_micromanager.main_window import MainWindow
+
+
+def test_tiled_canvas() -> None:
+    canvas = TiledCanvas("u2", tile_size=8)
+    image = np.arange(100, dtype="u2").reshape(10, 10)
+    canvas.paste(image, -3, 5)
+    # only the tiles under the image are allocated
+    assert canvas.n_tiles == 4
+    np.testing.assert_array_equal(canvas.read(-3, 7, 5, 15), image)
+    region = canvas.read(-5, 9, 0, 20)
+    assert region[:2].sum() == 0
+    np.testing.assert_array_equal(region[2:12, 5:15], image)
+
+    view = CanvasView(canvas, (-3, 5), (10, 10))
+    assert view.shape == (10, 10)
+    np.testing.assert_array_equal(np.asarray(view), image)
+    np.testing.assert_array_equal(view[2:8:2, 1], image[2:8:2, 1])
+    np.testing.assert_array_equal(view[-1], image[-1])
+    np.testing.assert_array_equal(view[::-1], image[::-1])
+
+
+def test_mosaic_levels() -> None:
+    mosaic = Mosaic(pixel_size=0.5, dtype="u1", levels=2)
+    assert mosaic.views() == []
+    tile = np.full((20, 20), 10, "u1")
+    mosaic.add(tile, x_pos=5, y_pos=5)  # centered on pixel (10, 10)
+    mosaic.add(tile + 10, x_pos=15, y_pos=5)
+    assert mosaic.version == 2
+    views = mosaic.views()
+    assert [v.shape for v in views] == [(20, 40), (10, 20), (5, 10)]
+    assert mosaic.translate() == (0, 0)
+    full = np.asarray(views[0])
+    assert (full[:, :20] == 10).all()
+    assert (full[:, 20:] == 20).all()
+    assert (np.asarray(views[2]) == np.asarray(views[0])[::4, ::4]).all()
+
+    # growing towards negative coordinates moves the origin
+    mosaic.add(tile, x_pos=-10, y_pos=5)
+    # (-30 px, rounded down to a multiple of 2**levels)
+    assert mosaic.translate() == (0, -16.0)
+    assert mosaic.views()[0].shape == (20, 72)
+
+
+def test_mosaic_memory_bound() -> None:
+    # room for 3 tiles (of 512 x 512 bytes); each frame lands in one tile per level
+    mosaic = Mosaic(pixel_size=1, dtype="u1", levels=2, max_mb=0.8)
+    tile = np.full((20, 20), 10, "u1")
+    mosaic.add(tile, x_pos=100, y_pos=100)
+    assert mosaic.base_level == 0
+    assert mosaic.nbytes == 3 * 512 * 512
+    # a frame far away: the two finest levels are dropped
+    mosaic.add(tile, x_pos=10100, y_pos=100)
+    assert mosaic.base_level == 2
+    assert mosaic.scale == 4
+    assert len(mosaic.views()) == 1
+    assert mosaic.views()[0].shape == (6, 2506)
+    mosaic.add(tile, x_pos=20100, y_pos=100)
+    assert not mosaic.full
+    mosaic.add(tile, x_pos=30100, y_pos=100)
+    assert mosaic.full
+    nbytes, bounds = mosaic.nbytes, mosaic.bounds
+    # full: frames only go where tiles are allocated
+    mosaic.add(tile, x_pos=40100, y_pos=100)
+    assert (mosaic.nbytes, mosaic.bounds) == (nbytes, bounds)
+    mosaic.add(tile + 10, x_pos=100, y_pos=100)
+    assert np.asarray(mosaic.views()[0])[0, 0] == 20
+
+
+def test_mosaic_option() -> None:
+    assert get_mosaic_option({}) is None
+    assert get_mosaic_option({"mosaic": True}) == {}
+    assert get_mosaic_option({"mosaic": {"c": 1}}) == {"c": 1}
+    for value in ("yes", {"p": 0}, {"c": -1}, {"z": True}):
+        with pytest.raises(ValueError, match="must be"):
+            get_mosaic_option({"mosaic": value})
+
+    # frames along t, p and g all go to the mosaic, others at the selected index
+    assert in_mosaic({"t": 3, "p": 1, "g": 2}, {})
+    assert in_mosaic({"c": 1, "z": 0, "g": 2}, {"c": 1})
+    assert not in_mosaic({"c": 0, "z": 0, "g": 2}, {"c": 1})
+    assert not in_mosaic({"c": 1, "z": 2}, {"c": 1})
+
+
+def test_mda_mosaic(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mmc = main_window._mmc
+    pix = mmc.getPixelSizeUm()
+    mda = useq.MDASequence(
+        stage_positions=[(0, 0, 0)],
+        grid_plan={"rows": 2, "columns": 2, "fov_width": 512, "fov_height": 512},
+        metadata={NMM_METADATA_KEY: {"mosaic": True}},
+    )
+    mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = main_window.viewer.layers[-1]
+    assert layer.name.endswith("_mosaic")
+    assert layer.multiscale
+    assert layer.data[0].shape == (1024 / pix, 1024 / pix)
+    assert tuple(layer.scale) == (pix, pix)
+    data = np.asarray(layer.data[0])
+    # every quadrant got a frame
+    for quadrant in (data[:512, :512], data[512:, :512], data[:512, 512:]):
+        assert quadrant.any()
+
+
+def test_invalid_mosaic_option(main_window: MainWindow) -> None:
+    handler: _NapariMDAHandler = main_window._core_link._mda_handler
+    mda = useq.MDASequence(metadata={NMM_METADATA_KEY: {"mosaic": "yes"}})
+    with pytest.raises(ValueError, match="must be"):
+        handler._on_mda_started(mda)
+
+
+def test_mda_mosaic_channel(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mosaics: list[Mosaic] = []
+
+    class _Mosaic(Mosaic):
+        def __init__(self, *args: Any) -> None:
+            super().__init__(*args)
+            mosaics.append(self)
+
+    mda = useq.MDASequence(
+        stage_positions=[(0, 0, 0)],
+        channels=["DAPI", "FITC"],
+        z_plan={"range": 2, "step": 1},
+        grid_plan={"rows": 2, "columns": 2, "fov_width": 512, "fov_height": 512},
+        metadata={NMM_METADATA_KEY: {"mosaic": {"c": 1, "z": 2}}},
+    )
+    with patch("napari_micromanager._mda_handler.Mosaic", _Mosaic):
+        main_window._mmc.mda.run(mda)
+        wait_for_writer(main_window._core_link._mda_handler)
+
+    # only the frames of the selected channel and z plane, one per grid position
+    assert mosaics[0].version == 4
@@ -9,6 +9,7 @@ from napari_micromanager._gui_objects._mda_widget import MultiDWidget
 from napari_micromanager._util import NMM_METADATA_KEY
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from pathlib import Path
 
     from pytestqt.qtbot import QtBot
@@ -16,7 +17,9 @@ if TYPE_CHECKING:
     from napari_micromanager.main_window import MainWindow
 
 
-def test_main_window_mda(main_window: MainWindow) -> None:
+def test_main_window_mda(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
     assert not main_window.viewer.layers
 
     mda = MDASequence(
@@ -26,6 +29,7 @@ def test_main_window_mda(main_window: MainWindow) -> None:
     )
 
     main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
     assert main_window.viewer.layers[-1].data.shape == (4, 2, 4, 512, 512)
     assert main_window.viewer.layers[-1].data.nchunks_initialized == 32
 
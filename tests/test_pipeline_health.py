@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+import useq
+from qtpy.QtGui import QHideEvent, QShowEvent
+
+from napari_micromanager._frame_queue import FrameQueue
+from napari_micromanager._gui_objects._pipeline_health_widget import (
+    PipelineHealthWidget,
+)
+from napari_micromanager._pipeline_health import (
+    PIPELINE_BACKLOG_WARNING,
+    PipelineHealth,
+    PipelineSample,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pytestqt.qtbot import QtBot
+
+    from napari_micromanager.main_window import MainWindow
+
+SAMPLE = PipelineSample(
+    time=10.0,
+    mda_running=True,
+    frames_acquired=100,
+    bytes_written=50_000_000,
+    frames_displayed=20,
+    queue_depth=0,
+    oldest_put=0.0,
+    live_display_fps=None,
+    storage_dir=Path("."),
+)
+
+
+def test_pipeline_health() -> None:
+    cur = dataclasses.replace(
+        SAMPLE,
+        time=12.0,
+        frames_acquired=300,
+        bytes_written=150_000_000,
+        frames_displayed=80,
+        queue_depth=40,
+        oldest_put=12.0 - 2 * PIPELINE_BACKLOG_WARNING,
+    )
+    health = PipelineHealth.from_samples(SAMPLE, cur)
+    assert health.acquisition_fps == pytest.approx(100)
+    assert health.write_mb_per_s == pytest.approx(50)
+    assert health.display_fps == pytest.approx(30)
+    assert health.queue_depth == 40
+    assert health.oldest_frame_age == pytest.approx(2 * PIPELINE_BACKLOG_WARNING)
+    assert health.falling_behind
+
+    # a new MDA restarted the counters; live mode reports its own display rate
+    cur = dataclasses.replace(
+        SAMPLE, time=11.0, frames_acquired=10, live_display_fps=25.0
+    )
+    health = PipelineHealth.from_samples(SAMPLE, cur)
+    assert health.acquisition_fps == pytest.approx(10)
+    assert health.display_fps == 25
+    assert not health.falling_behind
+
+
+def test_frame_queue_oldest_put() -> None:
+    q = FrameQueue()
+    assert q.stats().oldest_put == 0
+    t0 = time.perf_counter()
+    q.put(np.zeros((2, 2)), useq.MDAEvent())
+    q.put(np.zeros((2, 2)), useq.MDAEvent())
+    first = q.stats().oldest_put
+    assert first >= t0
+    q.get_nowait()
+    assert q.stats().oldest_put >= first
+    q.get_nowait()
+    assert q.stats().oldest_put == 0
+
+
+def test_pipeline_health_widget(
+    main_window: MainWindow, qtbot: QtBot, wait_for_writer: Callable[..., None]
+) -> None:
+    main_window._show_dock_widget("Pipeline Health")
+    wdg = main_window._dock_widgets["Pipeline Health"].widget()
+    assert isinstance(wdg, PipelineHealthWidget)
+    # the viewer window is hidden in tests: show the widget "by hand"
+    wdg.showEvent(QShowEvent())
+    assert wdg._timer.isActive()
+
+    main_window._mmc.mda.run(useq.MDASequence(time_plan={"loops": 5, "interval": 0}))
+    wait_for_writer(main_window._core_link._mda_handler)
+    wdg._sample()
+    labels = wdg._labels
+    assert labels["acquisition"].text().endswith("fps")
+    assert labels["queue"].text() == "0 frames"
+    # the disk space is read in a worker thread, and shown at the next sample
+    qtbot.waitUntil(lambda: wdg._disk_future is not None and wdg._disk_future.done())
+    wdg._sample()
+    assert labels["disk"].text().endswith("GB")
+
+    wdg.hideEvent(QHideEvent())
+    assert not wdg._timer.isActive()
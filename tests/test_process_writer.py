@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import useq
+from pymmcore_plus.mda._runner import GeneratorMDASequence
+
+from napari_micromanager._frame_stats import FrameStats
+from napari_micromanager._process_writer import (
+    ProcessWriter,
+    ProcessWriterError,
+    get_writer_options,
+)
+from napari_micromanager._storage import create_array, create_memmap, open_array
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from napari_micromanager.main_window import MainWindow
+
+FRAME = (16, 24)
+# a ring buffer of 4 frames
+BUFFER_MB = 4 * 16 * 24 * 2 / 1e6
+
+
+def test_process_writer(tmp_path: Path) -> None:
+    z = create_array(str(tmp_path / "a.zarr"), (6, *FRAME), "u2", (1, *FRAME))
+    create_memmap(tmp_path / "b.npy", (2, 3, *FRAME), "u2")
+    frames = [np.full(FRAME, i + 1, "u2") for i in range(6)]
+
+    writer = ProcessWriter(FRAME, "u2", BUFFER_MB)
+    assert writer.n_slots == 4
+    try:
+        writer.open("a", tmp_path / "a.zarr", (6,))
+        writer.open("b", tmp_path / "b.npy", (2, 3))
+        # more frames than slots: `submit` waits for the process to free some
+        for i, frame in enumerate(frames):
+            writer.submit("a", (i,), [frame], i)
+        writer.submit("b", (1, slice(0, 3)), frames[:3], "slab")
+        done = []
+        while writer.pending:
+            done += writer.results(1)
+    finally:
+        writer.close()
+
+    assert [r.tag for r in done] == [0, 1, 2, 3, 4, 5, "slab"]
+    np.testing.assert_array_equal(z[:, 0, 0], [1, 2, 3, 4, 5, 6])
+    b = open_array(tmp_path / "b.npy")
+    np.testing.assert_array_equal(b[:, :, 0, 0], [[0, 0, 0], [1, 2, 3]])
+    # the frame stats computed by the process
+    stats = FrameStats((2, 3), "u2")
+    stats.set_values((1, slice(0, 3)), done[-1].stats)
+    assert stats.minmax((1, 2)) == (3, 3)
+    assert stats.minmax((0, 0)) is None
+
+
+def test_process_writer_failure() -> None:
+    writer = ProcessWriter(FRAME, "u2", BUFFER_MB)
+    try:
+        for i in range(3):
+            writer.submit("a", (i,), [np.full(FRAME, i, "u2")], i)
+        writer._process.kill()
+        with pytest.raises(ProcessWriterError, match="writer process") as info:
+            writer.results(1)
+        # and the writer can't be used anymore
+        with pytest.raises(ProcessWriterError, match="exited"):
+            writer.submit("a", (3,), [np.zeros(FRAME, "u2")])
+    finally:
+        writer.close()
+    # the frames handed to the dead process can be written by someone else
+    assert [tag for tag, _ in info.value.unfinished] == [0, 1, 2]
+    assert info.value.unfinished[2][1][0, 0] == 2
+
+
+def test_writer_options() -> None:
+    assert get_writer_options({}) == ("thread", 256)
+    for meta in ({"writer": "subprocess"}, {"writer_buffer_mb": 0}):
+        with pytest.raises(ValueError, match="must be"):
+            get_writer_options(meta)
+
+
+def test_mda_process_writer(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 4, "interval": 0},
+        z_plan={"range": 2, "step": 1},
+        metadata={
+            NMM_METADATA_KEY: {
+                "writer": "process",
+                "writer_buffer_mb": 1,
+                "save_dir": str(tmp_path),
+            }
+        },
+    )
+    handler = main_window._core_link._mda_handler
+    main_window._mmc.mda.run(mda)
+    # the process writes the last frames after the MDA
+    wait_for_writer(handler)
+
+    assert handler.writer_stats().frames == 12
+    layer = main_window.viewer.layers[-1]
+    data = np.asarray(layer.data)
+    assert data.shape[:2] == (4, 3)
+    stats = layer.metadata[NMM_METADATA_KEY]["frame_stats"]
+    for index in np.ndindex(data.shape[:2]):
+        assert stats.minmax(index) == (data[index].min(), data[index].max())
+
+
+def test_process_writer_unsupported_options(main_window: MainWindow) -> None:
+    handler = main_window._core_link._mda_handler
+    for meta in ({"mosaic": True}, {"codec": "auto"}, {"pyramid_levels": 2}):
+        mda = useq.MDASequence(
+            metadata={NMM_METADATA_KEY: {"writer": "process", **meta}}
+        )
+        with pytest.raises(ValueError, match="must be"):
+            handler._on_mda_started(mda)
+    # generator MDAs are written by the writer thread only
+    gen = GeneratorMDASequence(metadata={NMM_METADATA_KEY: {"writer": "process"}})
+    with pytest.raises(ValueError, match="must be"):
+        handler._on_mda_started(gen)
+
+
+class _DeadWriter(ProcessWriter):
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self._process.kill()
+        self._process.join()
+
+
+def test_mda_process_writer_fallback(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        metadata={NMM_METADATA_KEY: {"writer": "process", "save_dir": str(tmp_path)}},
+    )
+    handler = main_window._core_link._mda_handler
+    with patch("napari_micromanager._mda_handler.ProcessWriter", _DeadWriter):
+        with pytest.warns(UserWarning, match="in the GUI process"):
+            main_window._mmc.mda.run(mda)
+            wait_for_writer(handler)
+
+    # the frames were written by the writer thread instead
+    assert handler.writer_stats().frames == 3
+    data = np.asarray(main_window.viewer.layers[-1].data)
+    assert all(frame.any() for frame in data)
+
+
+def test_mda_process_writer_keep_and_cleanup(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        metadata={NMM_METADATA_KEY: {"writer": "process"}},
+    )
+    handler = main_window._core_link._mda_handler
+    main_window._mmc.mda.run(mda)
+    writer = handler._process_writer
+    assert writer is not None
+    layer = main_window.viewer.layers[-1]
+    # the store can't be moved while the process may still be writing to it
+    assert handler._writing
+    with pytest.raises(RuntimeError, match="Cannot keep"):
+        handler.keep(layer, tmp_path / "kept.zarr")
+
+    # the process is stopped before the arrays are closed
+    handler._cleanup()
+    assert not writer._process.is_alive()
+    wait_for_writer(handler)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+import useq
+
+from napari_micromanager._pyramid import (
+    downsample,
+    get_pyramid_levels,
+    pyramid_shapes,
+)
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from napari_micromanager.main_window import MainWindow
+
+
+def test_pyramid_shapes() -> None:
+    assert pyramid_shapes([3, 4, 512, 300], 2) == [(3, 4, 256, 150), (3, 4, 128, 75)]
+    assert pyramid_shapes([2, 5, 7, 3], 1, rgb=True) == [(2, 3, 4, 3)]
+
+
+def test_downsample() -> None:
+    image = np.arange(16, dtype="u2").reshape(4, 4)
+    np.testing.assert_array_equal(downsample(image), [[2, 4], [10, 12]])
+    # a stack of odd-sized frames: the last row/column is repeated
+    stack = np.ones((2, 5, 3), dtype="u2")
+    assert downsample(stack).shape == (2, 3, 2)
+    assert downsample(np.ones((5, 7, 3), "u1"), rgb=True).shape == (3, 4, 3)
+
+
+def test_invalid_pyramid_levels() -> None:
+    with pytest.raises(ValueError, match="must be"):
+        get_pyramid_levels({"pyramid_levels": -1})
+
+
+def test_mda_pyramid(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0},
+        z_plan={"range": 2, "step": 1},
+        metadata={NMM_METADATA_KEY: {"pyramid_levels": 2}},
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = main_window.viewer.layers[-1]
+    assert layer.multiscale
+    full, level1, level2 = layer.data
+    assert level1.shape == (2, 3, 256, 256)
+    assert level2.shape == (2, 3, 128, 128)
+    for t in range(2):
+        for z in range(3):
+            expected = downsample(np.asarray(full[t, z]))
+            np.testing.assert_array_equal(level1[t, z], expected)
+            np.testing.assert_array_equal(level2[t, z], downsample(expected))
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import errno
+import os
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+from uuid import uuid4
+
+import numpy as np
+import pytest
+import useq
+
+from napari_micromanager._storage import (
+    AUTO_CODECS,
+    ZARR_V3,
+    RaggedArray,
+    choose_codec,
+    chunk_layout,
+    create_array,
+    get_chunk_options,
+    get_codec_option,
+    measure_codecs,
+    open_array,
+)
+from napari_micromanager._util import NMM_METADATA_KEY, PYMMCW_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from napari_micromanager.main_window import MainWindow
+
+
+@pytest.mark.parametrize(
+    "policy, chunks, shards",
+    [
+        ("frame", (1, 1, 1, 512, 512), None),
+        ("stack", (1, 2, 5, 512, 512), None),
+        ("tiles", (1, 1, 1, 256, 256), None),
+        ("sharded", (1, 1, 1, 512, 512), (1, 2, 5, 512, 512)),
+    ],
+)
+def test_chunk_layout(policy: str, chunks: tuple, shards: tuple | None) -> None:
+    layout = chunk_layout(policy, "tcz", [3, 2, 5], [512, 512], tile_size=256)  # type: ignore
+    assert layout == (chunks, shards)
+
+
+def test_chunk_layout_rgb_tiles() -> None:
+    chunks, _ = chunk_layout("tiles", "t", [3], [1000, 300, 3], tile_size=512)
+    assert chunks == (1, 512, 300, 3)
+
+
+@pytest.mark.parametrize(
+    "meta", [{"chunking": "files"}, {"chunking": "tiles", "tile_size": 0}]
+)
+def test_invalid_chunk_options(meta: dict) -> None:
+    with pytest.raises(ValueError, match="must be"):
+        get_chunk_options(meta)
+
+
+@pytest.mark.skipif(not ZARR_V3, reason="sharding requires zarr>=3")
+def test_sharded_array(tmp_path: Path) -> None:
+    chunks, shards = chunk_layout("sharded", "tz", [2, 4], [16, 16])
+    arr = create_array(str(tmp_path), [2, 4, 16, 16], "u2", chunks, shards)
+    arr[0, :] = np.ones((4, 16, 16), "u2")
+    assert arr[0, 3].sum() == 256
+    # one shard file for the whole first stack
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 2
+
+
+def test_mda_stack_chunking(
+    main_window: MainWindow, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        z_plan={"range": 3, "step": 1},
+        channels=["DAPI", "FITC"],
+        metadata={NMM_METADATA_KEY: {"chunking": "stack"}},
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    data = main_window.viewer.layers[-1].data
+    assert data.shape == (3, 2, 4, 512, 512)
+    assert data.chunks == (1, 2, 4, 512, 512)
+    # one chunk per timepoint instead of one per frame
+    assert data.nchunks_initialized == 3
+
+
+def test_measure_and_choose_codec() -> None:
+    rng = np.random.default_rng(0)
+    frames = [(rng.poisson(100, (64, 64)) + 500).astype("u2") for _ in range(2)]
+    measurements = measure_codecs(frames, ["none", "blosc-lz4", "zstd"])
+    assert set(measurements) == {"blosc-lz4", "zstd"}
+    assert all(ratio > 1 for ratio, _ in measurements.values())
+
+    fake = {"blosc-lz4": (2.0, 1000.0), "blosc-zstd": (3.0, 100.0)}
+    assert choose_codec(fake, required_mbps=50) == "blosc-zstd"
+    assert choose_codec(fake, required_mbps=500) == "blosc-lz4"
+    # nothing keeps up: the fastest one
+    assert choose_codec(fake, required_mbps=5000) == "blosc-lz4"
+
+
+def test_invalid_codec_option() -> None:
+    with pytest.raises(ValueError, match="must be"):
+        get_codec_option({"codec": "gzip"})
+
+
+@pytest.mark.parametrize("codec", ["none", "auto"])
+def test_mda_codec(
+    main_window: MainWindow, codec: str, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        channels=["DAPI"],
+        metadata={NMM_METADATA_KEY: {"codec": codec}},
+    )
+    frames: list[np.ndarray] = []
+    main_window._mmc.mda.events.frameReady.connect(lambda img, _: frames.append(img))
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    data = main_window.viewer.layers[-1].data
+    for t, img in enumerate(frames):
+        np.testing.assert_array_equal(data[t, 0], img)
+
+    stats = main_window._core_link._mda_handler.writer_stats()
+    assert stats.frames == 3
+    if codec == "auto":
+        assert stats.codec in AUTO_CODECS
+        assert stats.codec_ratio is not None
+    else:
+        assert stats.codec == "none"
+
+
+def test_mda_save_dir(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0},
+        metadata={
+            NMM_METADATA_KEY: {"save_dir": str(tmp_path / "data")},
+            PYMMCW_METADATA_KEY: {"save_name": "exp"},
+        },
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+    main_window._mmc.mda.run(mda)
+
+    assert sorted(p.name for p in (tmp_path / "data").iterdir()) == [
+        "exp_000.zarr",
+        "exp_001.zarr",
+    ]
+    # the stores are not deleted on exit
+    main_window._core_link.cleanup()
+    assert open_array(tmp_path / "data" / "exp_000.zarr").shape == (2, 512, 512)
+
+
+def test_mda_save_dir_split_channels(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        channels=["DAPI", "FITC"],
+        metadata={
+            NMM_METADATA_KEY: {"save_dir": str(tmp_path), "split_channels": True},
+            PYMMCW_METADATA_KEY: {"save_name": "exp"},
+        },
+    )
+    for _ in range(2):
+        main_window._mmc.mda.run(mda.replace(uid=uuid4()))
+        wait_for_writer(main_window._core_link._mda_handler)
+
+    # the channels of an acquisition share its number
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "exp_000_DAPI_000.zarr",
+        "exp_000_FITC_001.zarr",
+        "exp_001_DAPI_000.zarr",
+        "exp_001_FITC_001.zarr",
+    ]
+
+
+def test_keep_store(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(time_plan={"loops": 2, "interval": 0})
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+    layer = main_window.viewer.layers[-1]
+    expected = np.asarray(layer.data)
+
+    handler = main_window._core_link._mda_handler
+    (tmp_src,) = [tmp for _, tmp in handler._tmp_arrays.values()]
+    assert tmp_src is not None
+
+    dest = handler.keep(layer, tmp_path / "kept.zarr")
+    assert dest == tmp_path / "kept.zarr"
+    assert not os.path.exists(tmp_src.name)
+    np.testing.assert_array_equal(layer.data, expected)
+    with pytest.raises(FileExistsError):
+        handler.keep(layer, dest)
+
+    main_window._core_link.cleanup()
+    np.testing.assert_array_equal(open_array(dest), expected)
+
+
+def test_keep_store_errors(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    main_window._mmc.mda.run(useq.MDASequence(time_plan={"loops": 2, "interval": 0}))
+    wait_for_writer(main_window._core_link._mda_handler)
+    layer = main_window.viewer.layers[-1]
+    expected = np.asarray(layer.data)
+    handler = main_window._core_link._mda_handler
+
+    # only a rename across filesystems falls back to a copy
+    error = PermissionError(errno.EACCES, "denied")
+    with patch("os.replace", side_effect=error):
+        with pytest.raises(PermissionError):
+            handler.keep(layer, tmp_path / "kept.zarr")
+    assert not (tmp_path / "kept.zarr").exists()
+    np.testing.assert_array_equal(layer.data, expected)
+
+    error = OSError(errno.EXDEV, "cross-device link")
+    with patch("os.replace", side_effect=error):
+        with pytest.warns(UserWarning, match="different filesystem"):
+            # the parent directory is created
+            dest = handler.keep(layer, tmp_path / "new" / "kept.zarr")
+    np.testing.assert_array_equal(open_array(dest), expected)
+
+
+def test_mda_ram_budget(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    # 3 frames of 512x512 uint16 are ~1.6 MB: one acquisition fits, not two
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        metadata={NMM_METADATA_KEY: {"ram_budget_mb": 2}},
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+    first = main_window.viewer.layers[-1]
+    assert isinstance(first.data, np.ndarray)
+    expected = first.data.copy()
+    assert expected.any()
+
+    main_window._mmc.mda.run(mda.replace(uid=uuid4()))
+    wait_for_writer(main_window._core_link._mda_handler)
+    second = main_window.viewer.layers[-1]
+    assert isinstance(second.data, np.ndarray)
+    # the first acquisition was moved to disk to make room
+    assert not isinstance(first.data, np.ndarray)
+    np.testing.assert_array_equal(first.data, expected)
+
+    handler = main_window._core_link._mda_handler
+    dest = handler.keep(second, tmp_path / "kept.zarr")
+    np.testing.assert_array_equal(open_array(dest), second.data)
+    assert not handler._ram_arrays
+
+
+def test_invalid_ram_budget(main_window: MainWindow) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0},
+        metadata={NMM_METADATA_KEY: {"ram_budget_mb": -1}},
+    )
+    handler = main_window._core_link._mda_handler
+    with pytest.raises(ValueError, match="must be"):
+        handler._on_mda_started(mda)
+
+
+def test_mda_memmap_storage(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        channels=["DAPI", "FITC"],
+        metadata={NMM_METADATA_KEY: {"storage": "memmap"}},
+    )
+    acquired: list[tuple[dict, np.ndarray]] = []
+    main_window._mmc.mda.events.frameReady.connect(
+        lambda img, event: acquired.append((dict(event.index), img))
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = main_window.viewer.layers[-1]
+    assert isinstance(layer.data, np.memmap)
+    assert layer.data.shape == (3, 2, 512, 512)
+    for idx, img in acquired:
+        np.testing.assert_array_equal(layer.data[idx["t"], idx["c"]], img)
+
+    handler = main_window._core_link._mda_handler
+    with pytest.raises(ValueError, match="npy"):
+        handler.keep(layer, tmp_path / "kept.zarr")
+    dest = handler.keep(layer, tmp_path / "kept.npy")
+    main_window._core_link.cleanup()
+    np.testing.assert_array_equal(np.load(dest)[2, 1], acquired[-1][1])
+
+
+def test_invalid_storage_option(main_window: MainWindow) -> None:
+    mda = useq.MDASequence(
+        time_plan={"loops": 2, "interval": 0},
+        metadata={NMM_METADATA_KEY: {"storage": "tiff"}},
+    )
+    with pytest.raises(ValueError, match="must be"):
+        main_window._core_link._mda_handler._on_mda_started(mda)
+
+
+def test_ragged_array(tmp_path: Path) -> None:
+    # positions along axis 1, with 1 and 3 planes along axis 2
+    arr = RaggedArray.create(
+        tmp_path / "data.zarr",
+        1,
+        [(2, 1, 4, 4), (2, 3, 4, 4)],
+        "u2",
+        [(1, 1, 4, 4)] * 2,
+    )
+    assert arr.shape == (2, 2, 3, 4, 4)
+    assert arr.arrays[0].shape == (2, 1, 4, 4)
+    arr[1, 0, 0] = np.full((4, 4), 1)
+    arr[1, 1, slice(0, 3)] = np.full((3, 4, 4), 2)
+    # a slab across positions
+    arr[0, slice(0, 2), 0] = np.stack([np.full((4, 4), 3), np.full((4, 4), 4)])
+
+    np.testing.assert_array_equal(arr[1, 0, 0], 1)
+    # the padding reads as zeros
+    np.testing.assert_array_equal(arr[1, 0, 2], 0)
+    assert arr[1, 0, :, 0, 0].tolist() == [1, 0, 0]
+    assert arr[1, 1, :, 0, 0].tolist() == [2, 2, 2]
+    assert arr[0, :, 0, 0, 0].tolist() == [3, 4]
+    full = np.asarray(arr)
+    assert full.shape == arr.shape
+    assert full[:, :, :, 0, 0].tolist() == [
+        [[3, 0, 0], [4, 0, 0]],
+        [[1, 0, 0], [2, 2, 2]],
+    ]
+
+    arr.close()
+    moved = arr.reopen(tmp_path / "data.zarr")
+    np.testing.assert_array_equal(np.asarray(moved), full)
+
+
+def test_mda_ragged_positions(
+    main_window: MainWindow, tmp_path: Path, wait_for_writer: Callable[..., None]
+) -> None:
+    mda = useq.MDASequence(
+        z_plan={"range": 2, "step": 1},
+        stage_positions=[
+            (0, 0, 0),
+            {
+                "x": 1,
+                "y": 1,
+                "z": 0,
+                "sequence": {"grid_plan": {"rows": 2, "columns": 2}},
+            },
+        ],
+        metadata={NMM_METADATA_KEY: {"ragged_positions": True, "codec": "auto"}},
+    )
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(main_window._core_link._mda_handler)
+
+    layer = main_window.viewer.layers[-1]
+    data = layer.data
+    assert isinstance(data, RaggedArray)
+    # same (padded) shape as without the option: p, z, g, y, x
+    assert data.shape == (2, 3, 4, 512, 512)
+    # but position 0 has no grid on disk
+    assert data.arrays[0].shape == (3, 1, 512, 512)
+    assert data.arrays[1].shape == (3, 4, 512, 512)
+    assert data.arrays[0].nchunks_initialized == 3
+    frames = np.asarray(data).any(axis=(3, 4))
+    assert frames[0].tolist() == [[True, False, False, False]] * 3
+    assert frames[1].all()
+
+    dest = main_window._core_link._mda_handler.keep(layer, tmp_path / "kept.zarr")
+    assert isinstance(layer.data, RaggedArray)
+    assert np.asarray(layer.data).any(axis=(3, 4)).tolist() == frames.tolist()
+    assert (dest / "p1").exists()
+
+
+def test_invalid_ragged_option(main_window: MainWindow) -> None:
+    handler = main_window._core_link._mda_handler
+    for meta in (
+        {"ragged_positions": 1},
+        {"ragged_positions": True, "storage": "memmap"},
+    ):
+        mda = useq.MDASequence(metadata={NMM_METADATA_KEY: meta})
+        with pytest.raises(ValueError, match="must be"):
+            handler._on_mda_started(mda)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import csv
+import json
+from typing import TYPE_CHECKING
+
+import pytest
+import useq
+
+from napari_micromanager._trace import FrameTracer, get_trace_option
+from napari_micromanager._util import NMM_METADATA_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from napari_micromanager.main_window import MainWindow
+
+
+def test_frame_tracer(tmp_path: Path) -> None:
+    now = [0.0]
+    tracer = FrameTracer(clock=lambda: now[0])
+    for t in (0.001, 0.002, 0.003):
+        now[0] = t
+        tracer.received()
+    now[0] = 0.010
+    tracer.dequeued(2)
+    now[0] = 0.015
+    tracer.written([("a", (0,)), ("a", (1,))])
+    now[0] = 0.020
+    tracer.displayed("a", (1,))
+    tracer.displayed("b", (0,))  # never written: ignored
+
+    assert len(tracer) == 3
+    rows = tracer.rows()
+    assert rows[0] == {
+        "frame": 0,
+        "layer": "a",
+        "index": (0,),
+        "received": pytest.approx(1),
+        "dequeued": pytest.approx(10),
+        "written": pytest.approx(15),
+        "displayed": None,
+    }
+    assert rows[1]["displayed"] == pytest.approx(20)
+    assert rows[2]["dequeued"] is None
+    assert rows[2]["layer"] is None
+
+    tracer.save(tmp_path / "trace.csv")
+    with open(tmp_path / "trace.csv") as f:
+        lines = list(csv.DictReader(f))
+    assert len(lines) == 3
+    assert float(lines[1]["displayed"]) == pytest.approx(20)
+
+    tracer.save(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    # frame 0: queue + write, frame 1: queue + write + display, frame 2: nothing
+    assert len(events) == 2 * 5
+    assert {e["name"] for e in events} == {"queue", "write", "display"}
+    display = [e for e in events if e["name"] == "display"]
+    assert [e["ts"] for e in display] == pytest.approx([15000, 20000])
+
+
+def test_invalid_trace_option() -> None:
+    assert get_trace_option({}) is False
+    with pytest.raises(ValueError, match="must be"):
+        get_trace_option({"trace": "trace.txt"})
+    with pytest.raises(ValueError, match="must be"):
+        get_trace_option({"trace": 1})
+
+
+@pytest.mark.parametrize("ext", [".json", ".csv"])
+def test_mda_trace(
+    main_window: MainWindow,
+    tmp_path: Path,
+    wait_for_writer: Callable[..., None],
+    ext: str,
+) -> None:
+    path = tmp_path / f"trace{ext}"
+    mda = useq.MDASequence(
+        time_plan={"loops": 3, "interval": 0},
+        z_plan={"range": 2, "step": 1},
+        metadata={NMM_METADATA_KEY: {"trace": str(path), "display_rate": 0}},
+    )
+    handler = main_window._core_link._mda_handler
+    main_window._mmc.mda.run(mda)
+    wait_for_writer(handler)
+    assert path.exists()
+
+    tracer = handler.trace()
+    assert tracer is not None
+    rows = tracer.rows()
+    assert len(rows) == 9
+    for row in rows:
+        assert row["received"] <= row["dequeued"] <= row["written"]
+        # frames whose viewer update was coalesced with a newer one aren't displayed
+        if row["displayed"] is not None:
+            assert row["displayed"] >= row["written"]
+    # at least the last frame is shown
+    assert any(row["displayed"] is not None for row in rows)
+
+
+def test_mda_not_traced(main_window: MainWindow) -> None:
+    main_window._mmc.mda.run(useq.MDASequence(time_plan={"loops": 2, "interval": 0}))
+    assert main_window._core_link._mda_handler.trace() is None